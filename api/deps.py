@@ -1,9 +1,12 @@
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from . import models, security
 from .database import get_db
+from .services import principals
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -16,7 +19,23 @@ def _credentials_exception():
     return credentials_exception
 
 
+def _stateless(payload: dict, id_claim: str) -> bool:
+    # Tokens issued before user_id/child_id and pwv were signed in still take the query path
+    return principals.AUTH_STATELESS and bool(payload.get(id_claim)) and bool(payload.get("pwv"))
+
+
+def _parent_principal(db: Session, payload: dict) -> Optional[principals.ParentPrincipal]:
+    principal = principals.principal_cache.parent(db, payload["user_id"])
+    if principal is None or not principals.is_current(payload, principal.id, principal.password_version):
+        return None
+    return principal
+
+
 def get_current_parent(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """
+    The authenticated parent. With AUTH_STATELESS a cached ParentPrincipal (id, phone, username,
+    avatar_url, child_id) instead of a Parent row; routes that modify the parent load the row.
+    """
     credentials_exception = _credentials_exception()
     try:
         payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
@@ -28,6 +47,11 @@ def get_current_parent(token: str = Depends(oauth2_scheme), db: Session = Depend
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    if _stateless(payload, "user_id"):
+        principal = _parent_principal(db, payload)
+        if principal is None:
+            raise credentials_exception
+        return principal
     user = db.query(models.Parent).filter(models.Parent.phone == phone).first()
     if user is None:
         raise credentials_exception
@@ -47,11 +71,91 @@ def get_current_child(token: str = Depends(oauth2_scheme), db: Session = Depends
     except JWTError:
         raise credentials_exception
 
+    if _stateless(payload, "child_id"):
+        principal = _child_principal(db, payload)
+        if principal is None:
+            raise credentials_exception
+        return principal
     child = db.query(models.Child).filter(models.Child.id == child_id).first()
     if not child:
         raise credentials_exception
     return child
 
 
+def _child_principal(db: Session, payload: dict) -> Optional[principals.ChildPrincipal]:
+    principal = principals.principal_cache.child(db, payload["child_id"])
+    if principal is None or not principals.is_current(payload, principal.parent_id, principal.password_version):
+        return None
+    return principal
+
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     return get_current_parent(token=token, db=db)
+
+
+def get_default_child_id(db: Session, parent, missing_status: int = 404) -> str:
+    """The parent's first child; read from the principal when available, else one query."""
+    child_id = getattr(parent, "child_id", None)
+    if child_id is None:
+        row = db.query(models.Child.id).filter(models.Child.parent_id == parent.id).first()
+        child_id = row[0] if row else None
+    if not child_id:
+        detail = "No child profile found" if missing_status == 400 else "Child profile not found"
+        raise HTTPException(status_code=missing_status, detail=detail)
+    return child_id
+
+
+def get_current_learner(
+    child_id: Optional[str] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
+    """
+    The child whose learning is being recorded: the child itself for a child token, or one of
+    the parent's children (`child_id`, default the first) for a parent token. One query either way,
+    none while the principals are cached.
+    """
+    credentials_exception = _credentials_exception()
+    try:
+        payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    role: str = payload.get("role") or "parent"
+
+    if role == "child":
+        token_child_id = payload.get("child_id")
+        if not token_child_id or (child_id and child_id != token_child_id):
+            raise credentials_exception
+        if _stateless(payload, "child_id"):
+            principal = _child_principal(db, payload)
+            if principal is None:
+                raise credentials_exception
+            return principal
+        child = db.query(models.Child).filter(models.Child.id == token_child_id).first()
+        if not child:
+            raise credentials_exception
+        return child
+
+    phone: str = payload.get("sub")
+    if role != "parent" or not phone:
+        raise credentials_exception
+    if _stateless(payload, "user_id"):
+        parent = _parent_principal(db, payload)
+        if parent is None:
+            raise credentials_exception
+        if not child_id or child_id == parent.child_id:
+            principal = principals.principal_cache.child(db, get_default_child_id(db, parent))
+            if principal is None:
+                raise HTTPException(status_code=404, detail="Child profile not found")
+            return principal
+        principal = principals.principal_cache.child(db, child_id)
+        if principal is None or principal.parent_id != parent.id:
+            raise HTTPException(status_code=404, detail="Child profile not found")
+        return principal
+    query = db.query(models.Child).join(models.Parent, models.Parent.id == models.Child.parent_id).filter(models.Parent.phone == phone)
+    if child_id:
+        query = query.filter(models.Child.id == child_id)
+    child = query.first()
+    if not child:
+        raise HTTPException(status_code=404, detail="Child profile not found")
+    return child
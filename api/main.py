@@ -1,13 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 from .database import engine, Base
 from .routers import auth, words, learning, media
+from .services import enrichment_queue, dictionary_cache, daily_deck, image_pipeline, suggest_index, upstream, deadline, word_filter
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Upper bound on how long any request may spend waiting on external upstreams
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", 8))
+
 app = FastAPI(title="David's Mom API")
 
 # Mount static files
@@ -40,12 +44,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    with deadline.budget(REQUEST_BUDGET_SECONDS):
+        return await call_next(request)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(words.router)
 app.include_router(learning.router)
 app.include_router(media.router)
 
+@app.on_event("startup")
+def start_background_workers():
+    enrichment_queue.start_worker()
+    dictionary_cache.start_listener()
+    suggest_index.start()
+    word_filter.start()
+    daily_deck.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    enrichment_queue.stop_worker()
+    dictionary_cache.stop_listener()
+    suggest_index.stop()
+    word_filter.stop()
+    daily_deck.stop()
+    upstream.close_all()
+    image_pipeline.shutdown()
+
+@app.on_event("shutdown")
+async def close_async_clients():
+    await upstream.aclose_all()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to David's Mom API"}
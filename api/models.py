@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, Date, JSON, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, Date, JSON, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -41,6 +41,9 @@ class Child(Base):
     media_plan_items = relationship("ChildMediaPlanItem", back_populates="child", cascade="all, delete-orphan")
     media_learning_sessions = relationship("MediaLearningSession", back_populates="child", cascade="all, delete-orphan")
     media_progress = relationship("ChildMediaProgress", back_populates="child", cascade="all, delete-orphan")
+    word_mastery = relationship("WordMastery", back_populates="child", cascade="all, delete-orphan")
+    daily_decks = relationship("DailyDeck", back_populates="child", cascade="all, delete-orphan")
+    daily_activity = relationship("ChildDailyActivity", back_populates="child", cascade="all, delete-orphan")
 
     __table_args__ = {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
 
@@ -78,6 +81,7 @@ class Word(Base):
     parent = relationship("Parent", back_populates="words")
     dictionary = relationship("Dictionary", back_populates="words")
     learning_records = relationship("LearningRecord", back_populates="word", cascade="all, delete-orphan")
+    mastery = relationship("WordMastery", back_populates="word", cascade="all, delete-orphan")
 
     __table_args__ = {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
 
@@ -99,6 +103,54 @@ class LearningSession(Base):
 
     __table_args__ = {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
 
+class WordMastery(Base):
+    """Spaced-repetition state of one word for one child; due_at drives the daily deck."""
+    __tablename__ = "word_mastery"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    child_id = Column(String(36), ForeignKey("children.id"), nullable=False)
+    word_id = Column(String(36), ForeignKey("words.id"), nullable=False)
+    ease = Column(Float, nullable=False, default=2.5)
+    interval_days = Column(Float, nullable=False, default=0)
+    repetitions = Column(Integer, nullable=False, default=0)  # consecutive "remembered"
+    attempts = Column(Integer, nullable=False, default=0)
+    lapses = Column(Integer, nullable=False, default=0)
+    last_result = Column(String(20), nullable=True)
+    last_reviewed_at = Column(DateTime(timezone=True), nullable=True)
+    due_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    child = relationship("Child", back_populates="word_mastery")
+    word = relationship("Word", back_populates="mastery")
+
+    __table_args__ = (
+        UniqueConstraint("child_id", "word_id", name="uq_word_mastery_child_word"),
+        Index("ix_word_mastery_child_due", "child_id", "due_at"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
+class DailyDeck(Base):
+    """Today's flashcards for a child, fully resolved so /api/learning/today is a single read."""
+    __tablename__ = "daily_decks"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    child_id = Column(String(36), ForeignKey("children.id"), nullable=False)
+    deck_date = Column(Date, nullable=False)
+    word_ids = Column(JSON, nullable=False)
+    words = Column(JSON, nullable=False)  # WordResponse payloads plus image renditions
+    daily_words = Column(Integer, nullable=False)
+    has_pending = Column(Boolean, nullable=False, default=False)  # some words still being enriched
+    stale = Column(Boolean, nullable=False, default=False)  # library or settings changed since generation
+    generated_at = Column(DateTime(timezone=True), nullable=False)
+
+    child = relationship("Child", back_populates="daily_decks")
+
+    __table_args__ = (
+        UniqueConstraint("child_id", "deck_date", name="uq_daily_deck_child_date"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
 class LearningRecord(Base):
     __tablename__ = "learning_records"
 
@@ -114,7 +166,11 @@ class LearningRecord(Base):
     word = relationship("Word", back_populates="learning_records")
     session = relationship("LearningSession", back_populates="learning_records")
 
-    __table_args__ = {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    __table_args__ = (
+        # History reads are "one child, one time range"; see services/time_ranges.py
+        Index("ix_learning_records_child_created", "child_id", "created_at"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
 
 class MediaResource(Base):
     __tablename__ = "media_resources"
@@ -157,6 +213,66 @@ class ChildMediaPlanItem(Base):
 
     __table_args__ = {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
 
+class ChildDailyActivity(Base):
+    """Per-child, per-day totals kept up to date by the write paths, so history reads are one range scan."""
+    __tablename__ = "child_daily_activity"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    child_id = Column(String(36), ForeignKey("children.id"), nullable=False)
+    activity_date = Column(Date, nullable=False)
+    words_total = Column(Integer, nullable=False, default=0)
+    words_remembered = Column(Integer, nullable=False, default=0)
+    word_seconds = Column(Float, nullable=False, default=0)
+    video_sessions = Column(Integer, nullable=False, default=0)
+    video_seconds = Column(Integer, nullable=False, default=0)
+    audio_sessions = Column(Integer, nullable=False, default=0)
+    audio_seconds = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    child = relationship("Child", back_populates="daily_activity")
+
+    __table_args__ = (
+        UniqueConstraint("child_id", "activity_date", name="uq_child_daily_activity"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
+class MediaDailyRollup(Base):
+    """Per child, module, local day and resource: what the media reports aggregate over any period."""
+    __tablename__ = "media_daily_rollup"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    child_id = Column(String(36), ForeignKey("children.id"), nullable=False)
+    module = Column(String(20), nullable=False)  # video | audio
+    activity_date = Column(Date, nullable=False)
+    resource_id = Column(String(36), ForeignKey("media_resources.id"), nullable=False)
+    session_count = Column(Integer, nullable=False, default=0)
+    total_seconds = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    completion_percent_sum = Column(Float, nullable=False, default=0)
+    # Earliest session of the day, for the difficulty level a report period starts at
+    first_started_at = Column(DateTime(timezone=True), nullable=True)
+    first_difficulty_level = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("child_id", "module", "activity_date", "resource_id", name="uq_media_daily_rollup"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
+class LearningEventReceipt(Base):
+    """Idempotency keys of ingested client events; a replayed batch skips keys already seen."""
+    __tablename__ = "learning_event_receipts"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    child_id = Column(String(36), ForeignKey("children.id"), nullable=False)
+    event_id = Column(String(64), nullable=False)
+    kind = Column(String(20), nullable=False)  # word_result | media_session
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("child_id", "event_id", name="uq_learning_event_receipt"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
 class MediaLearningSession(Base):
     __tablename__ = "media_learning_sessions"
 
@@ -176,7 +292,10 @@ class MediaLearningSession(Base):
     child = relationship("Child", back_populates="media_learning_sessions")
     resource = relationship("MediaResource", back_populates="learning_sessions")
 
-    __table_args__ = {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    __table_args__ = (
+        Index("ix_media_sessions_child_module_started", "child_id", "module", "started_at"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
 
 class ChildMediaProgress(Base):
     __tablename__ = "child_media_progress"
@@ -185,10 +304,106 @@ class ChildMediaProgress(Base):
     child_id = Column(String(36), ForeignKey("children.id"), nullable=False, index=True)
     module = Column(String(20), nullable=False, index=True)  # video | audio
     current_difficulty_level = Column(Integer, nullable=False, default=1)
-    stats = Column(JSON, nullable=False, default=dict)
+    stats = Column(JSON, nullable=False, default=dict)  # legacy; totals now live in the columns below
+    # Updated in place with `x = x + :delta` (services/media_progress.py), never read-modify-write
+    total_seconds = Column(Integer, nullable=False, default=0, server_default="0")
+    total_completed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_session_count = Column(Integer, nullable=False, default=0, server_default="0")
+    completion_percent_sum = Column(Float, nullable=False, default=0, server_default="0")
+    eligible_completion_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     child = relationship("Child", back_populates="media_progress")
 
+    __table_args__ = (
+        UniqueConstraint("child_id", "module", name="uq_child_media_progress_module"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
+class WordEnrichmentJob(Base):
+    __tablename__ = "word_enrichment_jobs"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    vc_id = Column(String(32), unique=True, index=True, nullable=False)
+    word = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued | running | done | failed
+    priority = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # when a worker last took the job (UTC)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+
+
+class TranscriptionJob(Base):
+    """SRT generation work for media resources and ad-hoc uploads, run by api.tools.transcription_worker."""
+    __tablename__ = "transcription_jobs"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    media_id = Column(String(36), ForeignKey("media_resources.id"), nullable=True, index=True)
+    # The parent who uploaded the file; only they may see or cancel the job. NULL for media jobs
+    parent_id = Column(String(36), ForeignKey("parents.id"), nullable=True, index=True)
+    source_path = Column(String(1000), nullable=False)  # file:// or http(s) URL, or a local upload path
+    # Set while queued/running (media:<id>), NULL once finished: at most one active job per media
+    active_key = Column(String(64), unique=True, nullable=True)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued | running | done | failed | cancelled
+    priority = Column(Integer, nullable=False, default=0)
+    progress = Column(Integer, nullable=False, default=0)  # 0-100
+    stage = Column(String(20), nullable=True)  # downloading | transcribing | writing
+    attempts = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    force = Column(Boolean, nullable=False, default=False)  # re-transcribe even when the transcript store has it
+    last_error = Column(Text, nullable=True)
+    srt_path = Column(String(1000), nullable=True)
+    srt_url = Column(String(500), nullable=True)
+    worker = Column(String(100), nullable=True)  # host:pid of the worker process running it
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_transcription_jobs_claim", "status", "priority", "created_at"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
+
+class Transcript(Base):
+    """Finished SRTs keyed by what was transcribed, so duplicate media reuse them instead of re-running Whisper."""
+    __tablename__ = "transcripts"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    # sha256:<hex> of the media file bytes, or pair:<pair_key> shared by a video and its audio twin
+    fingerprint = Column(String(300), nullable=False)
+    # Engine, model and SRT format that produced it (transcription.config_version)
+    config_version = Column(String(100), nullable=False)
+    srt = Column(Text(16777215), nullable=False)  # MEDIUMTEXT on MySQL
+    media_id = Column(String(36), nullable=True)  # media it was produced for
+    # sha256:<hex> of the file it was stored from; lets a pair row notice its own media was replaced
+    source_fingerprint = Column(String(300), nullable=True)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("fingerprint", "config_version", name="uq_transcripts_fingerprint_version"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
+
+class DictionaryMiss(Base):
+    """Words parents looked up that the base dictionary does not have, with lookup counts."""
+    __tablename__ = "dictionary_misses"
+
+    word = Column(String(100), primary_key=True)
+    miss_count = Column(Integer, nullable=False, default=0, index=True)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+
     __table_args__ = {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
@@ -6,6 +6,7 @@ import shutil
 import uuid
 from .. import models, schemas, security, deps
 from ..database import get_db
+from ..services import principals
 
 router = APIRouter(
     prefix="/api/auth",
@@ -69,7 +70,7 @@ def register(user: schemas.ParentCreate, db: Session = Depends(get_db)):
 
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": db_user.phone, "user_id": db_user.id, "role": "parent"}, expires_delta=access_token_expires
+        data={"sub": db_user.phone, "user_id": db_user.id, "role": "parent", "pwv": security.password_version(db_user.password_hash)}, expires_delta=access_token_expires
     )
     return {
         "access_token": access_token, 
@@ -84,16 +85,21 @@ def update_profile(
     current_user: models.Parent = Depends(deps.get_current_user),
     db: Session = Depends(get_db)
 ):
+    # The dependency may be a cached principal; edit the row itself
+    parent = db.query(models.Parent).filter(models.Parent.id == current_user.id).first()
+    if not parent:
+        raise HTTPException(status_code=404, detail="Parent not found")
+
     # Update Parent Info
     if profile_update.parent_username:
-        current_user.username = profile_update.parent_username
+        parent.username = profile_update.parent_username
     if profile_update.parent_avatar_url:
-        current_user.avatar_url = profile_update.parent_avatar_url
+        parent.avatar_url = profile_update.parent_avatar_url
     
-    db.add(current_user)
+    db.add(parent)
     
     # Update Child Info (Default child for now)
-    child = db.query(models.Child).filter(models.Child.parent_id == current_user.id).first()
+    child = db.query(models.Child).filter(models.Child.parent_id == parent.id).first()
     if child:
         if profile_update.child_nickname:
             child.nickname = profile_update.child_nickname
@@ -104,7 +110,8 @@ def update_profile(
         db.add(child)
     
     db.commit()
-    db.refresh(current_user)
+    db.refresh(parent)
+    principals.principal_cache.forget(parent_id=parent.id)
     
     # Return new token/user info? Or just success?
     # Returning Token schema to refresh user state in frontend
@@ -112,14 +119,15 @@ def update_profile(
     
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": current_user.phone, "user_id": current_user.id, "role": "parent"}, expires_delta=access_token_expires
+        data={"sub": parent.phone, "user_id": parent.id, "role": "parent", "pwv": security.password_version(parent.password_hash)},
+        expires_delta=access_token_expires,
     )
     
     return {
         "access_token": access_token, 
         "token_type": "bearer",
-        "user_id": current_user.id,
-        "username": current_user.username
+        "user_id": parent.id,
+        "username": parent.username
     }
 
 @router.get("/me")
@@ -156,7 +164,7 @@ def login(user: schemas.ParentLogin, db: Session = Depends(get_db)):
     
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": db_user.phone, "user_id": db_user.id, "role": "parent"}, expires_delta=access_token_expires
+        data={"sub": db_user.phone, "user_id": db_user.id, "role": "parent", "pwv": security.password_version(db_user.password_hash)}, expires_delta=access_token_expires
     )
     return {
         "access_token": access_token, 
@@ -172,18 +180,18 @@ def create_child_token(
     current_user: models.Parent = Depends(deps.get_current_parent),
     db: Session = Depends(get_db),
 ):
-    child = db.query(models.Child).filter(models.Child.parent_id == current_user.id).first()
-    if not child:
-        raise HTTPException(status_code=404, detail="Child profile not found")
+    child_id = deps.get_default_child_id(db, current_user)
+    password_version = getattr(current_user, "password_version", None) or security.password_version(current_user.password_hash)
 
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
         data={
-            "sub": f"child:{child.id}",
+            "sub": f"child:{child_id}",
             "role": "child",
-            "child_id": child.id,
+            "child_id": child_id,
             "parent_id": current_user.id,
+            "pwv": password_version,
         },
         expires_delta=access_token_expires,
     )
-    return {"access_token": access_token, "token_type": "bearer", "child_id": child.id}
+    return {"access_token": access_token, "token_type": "bearer", "child_id": child_id}
@@ -1,11 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy.sql.expression import func
-from sqlalchemy import text, bindparam
 from typing import List, Optional
 from .. import models, schemas, security, deps
 from ..database import get_db, get_dictionary_db
-from ..services import word_service
+from ..services import activity_rollup, daily_deck, image_pipeline, learning_events, learning_history, principals, response_cache, spaced_repetition, time_ranges
 
 router = APIRouter(
     prefix="/api/learning",
@@ -16,6 +14,8 @@ router = APIRouter(
 def get_today_task(
     child_id: Optional[str] = None,
     limit: Optional[int] = None,
+    image_width: Optional[int] = Query(None, ge=1),
+    image_format: Optional[str] = None,
     current_user: models.Parent = Depends(deps.get_current_user),
     db: Session = Depends(get_db),
     dict_db: Session = Depends(get_dictionary_db),
@@ -24,100 +24,49 @@ def get_today_task(
     target_child_id = child_id
     if not target_child_id:
         # Default to the first child of the current parent
-        child = db.query(models.Child).filter(models.Child.parent_id == current_user.id).first()
-        if child:
-            target_child_id = child.id
+        target_child_id = getattr(current_user, "child_id", None)
+        if not target_child_id:
+            child = db.query(models.Child).filter(models.Child.parent_id == current_user.id).first()
+            if child:
+                target_child_id = child.id
     
     # If no child found (rare case if registered properly), we might return empty or error
     if not target_child_id:
         # Fallback or empty
         pass
 
-    effective_limit = limit
-    if effective_limit is None:
-        child = db.query(models.Child).filter(models.Child.id == target_child_id).first()
-        if child and isinstance(child.settings, dict):
-            effective_limit = int(child.settings.get("daily_words") or 20)
-        else:
-            effective_limit = 20
-
-    # Fetch words belonging to this parent
-    # In real app, we would use spaced repetition algorithm based on target_child_id
-    words = (
-        db.query(models.Word)
-        .filter(
-            models.Word.parent_id == current_user.id,
-            models.Word.dict_vc_id.isnot(None),
-            models.Word.dict_vc_id != "",
+    child = None
+    if target_child_id:
+        child = (
+            db.query(models.Child)
+            .filter(models.Child.id == target_child_id, models.Child.parent_id == current_user.id)
+            .first()
         )
-        .order_by(func.random())
-        .limit(effective_limit)
-        .all()
-    )
 
-    vc_ids = [w.dict_vc_id for w in words if w.dict_vc_id]
-    dict_map = {}
-    if vc_ids:
-        stmt = (
-            text(
-                """
-                SELECT
-                    w.vc_id,
-                    w.vc_vocabulary,
-                    w.vc_phonetic_us,
-                    w.vc_phonetic_uk,
-                    COALESCE(NULLIF(t.translation, ''), e.youdao_translation) AS translation,
-                    e.image_url,
-                    e.audio_us_url,
-                    e.audio_uk_url,
-                    e.example
-                FROM word w
-                LEFT JOIN word_translation t ON t.vc_id = w.vc_id
-                LEFT JOIN word_ext e ON e.vc_id = w.vc_id
-                WHERE w.vc_id IN :vc_ids
-                """
-            )
-            .bindparams(bindparam("vc_ids", expanding=True))
-        )
-        rows = dict_db.execute(stmt, {"vc_ids": vc_ids}).mappings().all()
-        dict_map = {r["vc_id"]: dict(r) for r in rows}
-    
-    # Flatten response for words
-    flattened_words = []
-    for w in words:
-        payload = None
-        if w.dict_vc_id:
-            payload = dict_map.get(w.dict_vc_id)
-            if payload and (not payload.get("image_url") or not payload.get("audio_us_url") or not payload.get("example") or not payload.get("translation")):
-                ext = word_service.ensure_word_ext(dict_db=dict_db, vc_id=w.dict_vc_id, word=payload.get("vc_vocabulary") or "")
-                payload.update(ext)
-                if not payload.get("translation"):
-                    payload["translation"] = ext.get("youdao_translation") or ""
+    if not child:
+        return {"total_words": limit or 20, "learned_words": 0, "remaining_words": 0, "words": []}
+
+    # Today's deck is precomputed per child (Redis, then daily_decks); an explicit
+    # limit other than the child's daily_words is served live and not stored.
+    if limit is None or limit == daily_deck.daily_words(child):
+        deck = daily_deck.get_deck(db, dict_db, child)
+        effective_limit = deck["daily_words"]
+        cards = deck["words"]
+    else:
+        effective_limit = limit
+        cards = daily_deck.resolve_cards(db, dict_db, daily_deck.pick_words(db, child, limit))
 
-        if payload:
-            flattened_words.append(
-                {
-                    "id": w.id,
-                    "parent_id": w.parent_id,
-                    "word": payload.get("vc_vocabulary") or "",
-                    "meaning": payload.get("translation") or "",
-                    "phonetic_us": payload.get("vc_phonetic_us") or None,
-                    "phonetic_uk": payload.get("vc_phonetic_uk") or None,
-                    "example": payload.get("example") or None,
-                    "image_url": payload.get("image_url") or None,
-                    "audio_us_url": payload.get("audio_us_url") or None,
-                    "audio_uk_url": payload.get("audio_uk_url") or None,
-                    "category": w.category,
-                    "difficulty": w.difficulty,
-                    "created_at": w.created_at,
-                }
-            )
-            continue
+    flattened_words = []
+    for card in cards:
+        card = dict(card)
+        card["image_url"] = image_pipeline.image_url_for(card, image_width, image_format == "webp")
+        card.pop("image_renditions", None)
+        flattened_words.append(card)
 
     return {
         "total_words": effective_limit,
         "learned_words": 0,
-        "remaining_words": len(words),
+        "remaining_words": len(flattened_words),
         "words": flattened_words
     }
 
@@ -149,6 +98,9 @@ def update_learning_settings(
     child.settings = settings.model_dump()
     db.commit()
     db.refresh(child)
+    daily_deck.invalidate_children(db, [child.id])
+    response_cache.invalidate(child.id)
+    principals.principal_cache.forget(child_id=child.id)
     return child.settings
 
 @router.post("/record")
@@ -158,11 +110,7 @@ def record_learning_result(
     db: Session = Depends(get_db)
 ):
     # Determine child
-    child = db.query(models.Child).filter(models.Child.parent_id == current_user.id).first()
-    if not child:
-        raise HTTPException(status_code=400, detail="No child profile found")
-    
-    target_child_id = child.id
+    target_child_id = deps.get_default_child_id(db, current_user, missing_status=400)
     
     # Record the result
     db_record = models.LearningRecord(
@@ -172,108 +120,77 @@ def record_learning_result(
         time_spent=record.time_spent
     )
     db.add(db_record)
+    spaced_repetition.record_result(db, target_child_id, record.word_id, record.result)
+    activity_rollup.record_word(db, target_child_id, record.result, record.time_spent)
     db.commit()
+    response_cache.invalidate(target_child_id, response_cache.HISTORY)
     return {"status": "success"}
 
+@router.post("/events", response_model=schemas.LearningEventBatchResult)
+def ingest_learning_events(
+    batch: schemas.LearningEventBatch,
+    child: models.Child = Depends(deps.get_current_learner),
+    db: Session = Depends(get_db)
+):
+    # Flashcard results and finished media sessions queued by the app, stored in one transaction
+    try:
+        result = learning_events.ingest(db, child, batch)
+    except learning_events.BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if result.accepted:
+        response_cache.invalidate(child.id)
+    return result
+
+def history_cache_key(current_user: models.Parent, db: Session, **_):
+    return deps.get_default_child_id(db, current_user), response_cache.HISTORY, "all"
+
 @router.get("/history/dates", response_model=List[schemas.LearningHistoryItem])
+@response_cache.cached("learning_history_dates", List[schemas.LearningHistoryItem], history_cache_key)
 def get_learning_history_dates(
     current_user: models.Parent = Depends(deps.get_current_user),
     db: Session = Depends(get_db)
 ):
-    child = db.query(models.Child).filter(models.Child.parent_id == current_user.id).first()
-    if not child:
-        raise HTTPException(status_code=404, detail="Child profile not found")
-    
-    # Group by date and count
-    # Note: SQLite and MySQL date functions differ. Using Python aggregation for simplicity/compatibility or specific SQL func
-    # For MySQL: func.date(models.LearningRecord.created_at)
-    
-    # 1. Word records
-    word_records = db.query(
-        func.date(models.LearningRecord.created_at).label('date'),
-        func.count(models.LearningRecord.id).label('total_words'),
-        func.sum(models.LearningRecord.time_spent).label('duration')
-    ).filter(
-        models.LearningRecord.child_id == child.id
-    ).group_by(
-        func.date(models.LearningRecord.created_at)
-    ).all()
-    
-    # 2. Video sessions
-    video_dates = db.query(
-        func.date(models.MediaLearningSession.started_at).label('date')
-    ).filter(
-        models.MediaLearningSession.child_id == child.id,
-        models.MediaLearningSession.module == 'video'
-    ).group_by(
-        func.date(models.MediaLearningSession.started_at)
-    ).all()
-    video_date_set = {str(r.date) for r in video_dates}
+    child_id = deps.get_default_child_id(db, current_user)
 
-    # 3. Audio sessions
-    audio_dates = db.query(
-        func.date(models.MediaLearningSession.started_at).label('date')
-    ).filter(
-        models.MediaLearningSession.child_id == child.id,
-        models.MediaLearningSession.module == 'audio'
-    ).group_by(
-        func.date(models.MediaLearningSession.started_at)
-    ).all()
-    audio_date_set = {str(r.date) for r in audio_dates}
-
-    # Collect all unique dates
-    all_dates = set()
-    word_map = {}
-    
-    for r in word_records:
-        date_str = str(r.date)
-        all_dates.add(date_str)
-        
-        # Calculate completed (remembered) words count for this date
-        completed = db.query(models.LearningRecord).filter(
-            models.LearningRecord.child_id == child.id,
-            func.date(models.LearningRecord.created_at) == r.date,
-            models.LearningRecord.result == 'remembered'
-        ).count()
-        
-        word_map[date_str] = {
-            "total_words": r.total_words,
-            "completed_words": completed,
-            "duration_minutes": round((r.duration or 0) / 60, 1)
-        }
-
-    all_dates.update(video_date_set)
-    all_dates.update(audio_date_set)
-    
+    # One row per active day, maintained by the record and media session write paths
     result = []
-    for date_str in sorted(list(all_dates), reverse=True):
-        w_data = word_map.get(date_str, {"total_words": 0, "completed_words": 0, "duration_minutes": 0})
-        
+    for day in activity_rollup.history(db, child_id):
         result.append({
-            "date": date_str,
-            "total_words": w_data["total_words"],
-            "completed_words": w_data["completed_words"],
-            "duration_minutes": w_data["duration_minutes"],
-            "has_words": date_str in word_map,
-            "has_video": date_str in video_date_set,
-            "has_audio": date_str in audio_date_set
+            "date": day.activity_date,
+            "total_words": day.words_total,
+            "completed_words": day.words_remembered,
+            "duration_minutes": round((day.word_seconds or 0) / 60, 1),
+            "has_words": day.words_total > 0,
+            "has_video": day.video_sessions > 0,
+            "has_audio": day.audio_sessions > 0
         })
-        
+
     return result
 
+@router.get("/cache/stats", response_model=schemas.ResponseCacheStats)
+def get_response_cache_stats(
+    current_user: models.Parent = Depends(deps.get_current_user),
+):
+    # Hit ratios of the cached report routes, per route and overall
+    return response_cache.response_cache.stats()
+
 @router.get("/history/{date}", response_model=schemas.LearningDayDetail)
 def get_learning_history_detail(
     date: str,
     current_user: models.Parent = Depends(deps.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    dict_db: Session = Depends(get_dictionary_db),
 ):
-    child = db.query(models.Child).filter(models.Child.parent_id == current_user.id).first()
-    if not child:
-        raise HTTPException(status_code=404, detail="Child profile not found")
-        
+    child_id = deps.get_default_child_id(db, current_user)
+
+    try:
+        bounds = time_ranges.day_range(date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
+
     records = db.query(models.LearningRecord).filter(
-        models.LearningRecord.child_id == child.id,
-        func.date(models.LearningRecord.created_at) == date
+        models.LearningRecord.child_id == child_id,
+        time_ranges.between(models.LearningRecord.created_at, bounds)
     ).all()
     
     if not records:
@@ -284,8 +201,9 @@ def get_learning_history_detail(
         
     # Fetch Media Sessions
     media_sessions = db.query(models.MediaLearningSession).filter(
-        models.MediaLearningSession.child_id == child.id,
-        func.date(models.MediaLearningSession.started_at) == date
+        models.MediaLearningSession.child_id == child_id,
+        models.MediaLearningSession.module.in_(("video", "audio")),
+        time_ranges.between(models.MediaLearningSession.started_at, bounds)
     ).all()
 
     video_sessions = [s for s in media_sessions if s.module == 'video']
@@ -319,48 +237,22 @@ def get_learning_history_detail(
         "has_audio": len(audio_sessions) > 0
     }
     
-    # Prepare details
-    details = []
-    for r in records:
-        # Fetch word text (inefficient N+1, but okay for MVP daily limit < 50)
-        # Optimized: Eager load word relationship
-        word_obj = db.query(models.Word).join(models.Dictionary).filter(models.Word.id == r.word_id).first()
-        word_text = word_obj.dictionary.word if word_obj else "Unknown"
-        
-        details.append({
-            "word": word_text,
+    # Resolve word texts and media titles in batches, so the query count does not grow with the day
+    word_texts = learning_history.resolve_word_texts(db, dict_db, [r.word_id for r in records])
+    details = [
+        {
+            "word": word_texts.get(r.word_id) or "Unknown",
             "result": r.result,
             "time_spent": r.time_spent or 0,
             "created_at": r.created_at
-        })
+        }
+        for r in records
+    ]
 
-    # Prepare Media Details
-    video_details = []
-    for s in video_sessions:
-        # Fetch resource title
-        res = db.query(models.MediaResource).filter(models.MediaResource.id == s.resource_id).first()
-        title = res.filename if res else "Unknown Video"
-        video_details.append({
-            "resource_title": title,
-            "module": "video",
-            "duration_seconds": s.duration_seconds,
-            "completion_percent": s.completion_percent,
-            "started_at": s.started_at
-        })
+    titles = learning_history.resolve_media_titles(db, [s.resource_id for s in media_sessions])
+    video_details = learning_history.session_details(media_sessions, titles, "video", "Unknown Video")
+    audio_details = learning_history.session_details(media_sessions, titles, "audio", "Unknown Audio")
 
-    audio_details = []
-    for s in audio_sessions:
-        # Fetch resource title
-        res = db.query(models.MediaResource).filter(models.MediaResource.id == s.resource_id).first()
-        title = res.filename if res else "Unknown Audio"
-        audio_details.append({
-            "resource_title": title,
-            "module": "audio",
-            "duration_seconds": s.duration_seconds,
-            "completion_percent": s.completion_percent,
-            "started_at": s.started_at
-        })
-        
     return {
         "date": date,
         "summary": summary,
@@ -1,13 +1,16 @@
-from datetime import datetime, timedelta, date
+import asyncio
+from datetime import datetime, date
 from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.sql.expression import func
 
 from .. import deps, models, schemas
-from ..database import get_db
-from ..services import transcription
+from ..database import SessionLocal, get_db
+from ..services import activity_rollup, media_progress, media_rollup, response_cache, time_ranges, transcription_queue
 import shutil
 import tempfile
 import os
@@ -18,6 +21,9 @@ router = APIRouter(
     tags=["media"],
 )
 
+# How often the job event stream re-reads the job row
+TRANSCRIBE_EVENTS_POLL_SECONDS = float(os.getenv("TRANSCRIBE_EVENTS_POLL_SECONDS", 1))
+
 
 def get_default_child(db: Session, parent_id: str) -> models.Child:
     child = db.query(models.Child).filter(models.Child.parent_id == parent_id).first()
@@ -26,60 +32,105 @@ def get_default_child(db: Session, parent_id: str) -> models.Child:
     return child
 
 
-def get_or_create_media_progress(db: Session, *, child_id: str, module: str) -> models.ChildMediaProgress:
-    progress = (
-        db.query(models.ChildMediaProgress)
-        .filter(models.ChildMediaProgress.child_id == child_id, models.ChildMediaProgress.module == module)
-        .first()
-    )
-    if progress:
-        return progress
+def normalize_period(period: str) -> Tuple[date, date]:
+    value = (period or "").strip().lower()
+    if value not in time_ranges.PERIOD_DAYS:
+        raise HTTPException(status_code=400, detail="Invalid period. Use week, month or year.")
+    return time_ranges.period_days(value)
 
-    progress = models.ChildMediaProgress(
-        child_id=child_id,
-        module=module,
-        current_difficulty_level=1,
-        stats={},
-    )
-    db.add(progress)
-    db.flush()
-    return progress
 
+def report_cache_key(period: str, module: str, current_user: models.Parent, db: Session, **_) -> Tuple[str, str, str]:
+    # 周期按当天日期展开，跨过午夜自然换成新的缓存项
+    child_id = deps.get_default_child_id(db, current_user)
+    first_day, last_day = normalize_period(period)
+    return child_id, response_cache.media_scope(module), f"{first_day}:{last_day}"
+
+
+def _save_upload(source, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=transcription_queue.spool_dir()) as tmp:
+        shutil.copyfileobj(source, tmp)
+        return tmp.name
+
+
+def _enqueue_upload(db: Session, source, suffix: str, parent_id: str) -> models.TranscriptionJob:
+    return transcription_queue.enqueue_upload(db, _save_upload(source, suffix), parent_id=parent_id)
+
+
+def _load_transcription_job(job_id: str, parent_id: str) -> Optional[models.TranscriptionJob]:
+    with SessionLocal() as db:
+        return transcription_queue.get_upload(db, job_id, parent_id)
 
-def normalize_period(period: str) -> Tuple[datetime, datetime]:
-    now = datetime.utcnow()
-    value = (period or "").strip().lower()
-    if value == "week":
-        start = now - timedelta(days=7)
-        return start, now
-    if value == "month":
-        start = now - timedelta(days=30)
-        return start, now
-    raise HTTPException(status_code=400, detail="Invalid period. Use week or month.")
 
+def _own_transcription_job(db: Session, job_id: str, current_user) -> models.TranscriptionJob:
+    # 只能查看/取消自己上传的任务；媒体库任务由后台管理，不在此暴露
+    job = transcription_queue.get_upload(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+    return job
 
-@router.post("/transcribe", response_model=str)
-async def transcribe_media_file(file: UploadFile = File(...)):
+
+@router.post("/transcribe", response_model=schemas.TranscriptionJobResponse, status_code=202)
+async def transcribe_media_file(
+    file: UploadFile = File(...),
+    current_user: models.Parent = Depends(deps.get_current_user),
+    db: Session = Depends(get_db),
+):
     # 验证文件类型
     if not file.content_type.startswith(("audio/", "video/")):
         raise HTTPException(status_code=400, detail="Invalid file type")
 
-    # 保存上传的文件到临时目录
+    # 保存上传文件并排入转录队列，由 api.tools.transcription_worker 进程执行
     suffix = os.path.splitext(file.filename)[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
-
-    try:
-        # 执行转录
-        srt_content = transcription.transcribe_audio(tmp_path)
-        return srt_content
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # 清理临时文件
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+    return await run_in_threadpool(_enqueue_upload, db, file.file, suffix, current_user.id)
+
+
+@router.get("/transcribe/jobs/{job_id}", response_model=schemas.TranscriptionJobResponse)
+def get_transcription_job(
+    job_id: str,
+    current_user: models.Parent = Depends(deps.get_current_user),
+    db: Session = Depends(get_db),
+):
+    return _own_transcription_job(db, job_id, current_user)
+
+
+@router.get("/transcribe/jobs/{job_id}/events")
+async def stream_transcription_job(
+    job_id: str,
+    request: Request,
+    current_user: models.Parent = Depends(deps.get_current_user),
+):
+    """Server-sent events: the job's state on every change, until it finishes."""
+    parent_id = current_user.id
+    job = await run_in_threadpool(_load_transcription_job, job_id, parent_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+
+    async def events():
+        nonlocal job
+        last = None
+        while True:
+            payload = schemas.TranscriptionJobResponse.model_validate(job).model_dump_json()
+            if payload != last:
+                last = payload
+                yield f"data: {payload}\n\n"
+            if job.status in transcription_queue.TERMINAL_STATUSES or await request.is_disconnected():
+                return
+            await asyncio.sleep(TRANSCRIBE_EVENTS_POLL_SECONDS)
+            job = await run_in_threadpool(_load_transcription_job, job_id, parent_id)
+            if job is None:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/transcribe/jobs/{job_id}/cancel", response_model=schemas.TranscriptionJobResponse)
+def cancel_transcription_job(
+    job_id: str,
+    current_user: models.Parent = Depends(deps.get_current_user),
+    db: Session = Depends(get_db),
+):
+    job = _own_transcription_job(db, job_id, current_user)
+    return transcription_queue.cancel(db, job.id)
 
 @router.get("/resources", response_model=List[schemas.MediaResourceResponse])
 def list_media_resources(
@@ -291,7 +342,7 @@ def start_media_session(
     if not plan_ok:
         raise HTTPException(status_code=403, detail="Resource not in active plan")
 
-    progress = get_or_create_media_progress(db, child_id=current_child.id, module=req.module)
+    progress = media_progress.get_or_create(db, child_id=current_child.id, module=req.module)
     session = models.MediaLearningSession(
         child_id=current_child.id,
         module=req.module,
@@ -302,7 +353,10 @@ def start_media_session(
         difficulty_level_at_time=progress.current_difficulty_level,
     )
     db.add(session)
+    activity_rollup.record_media_start(db, current_child.id, req.module)
+    media_rollup.session_started(db, session)
     db.commit()
+    response_cache.invalidate(current_child.id, response_cache.media_scope(req.module), response_cache.HISTORY)
     db.refresh(session)
     return session
 
@@ -326,107 +380,79 @@ def finish_media_session(
     duration_seconds = max(0, int(req.duration_seconds))
     completed_count = max(0, int(req.completed_count or 0))
 
+    activity_rollup.record_media_seconds(
+        db, current_child.id, session.module, session.started_at, duration_seconds - (session.duration_seconds or 0)
+    )
+    media_rollup.session_finished(
+        db,
+        session,
+        delta_seconds=duration_seconds - (session.duration_seconds or 0),
+        delta_completed=completed_count - (session.completed_count or 0),
+        delta_completion=completion_percent - float(session.completion_percent or 0),
+    )
     session.ended_at = datetime.utcnow()
     session.duration_seconds = duration_seconds
     session.completion_percent = completion_percent
     session.completed_count = completed_count
     db.add(session)
 
-    progress = get_or_create_media_progress(db, child_id=current_child.id, module=session.module)
-    stats = dict(progress.stats or {})
-    stats["total_seconds"] = int(stats.get("total_seconds", 0)) + duration_seconds
-    stats["total_completed_count"] = int(stats.get("total_completed_count", 0)) + completed_count
-    stats["total_session_count"] = int(stats.get("total_session_count", 0)) + 1
-    stats["completion_percent_sum"] = float(stats.get("completion_percent_sum", 0.0)) + completion_percent
-
-    eligible = completion_percent >= 80 and completed_count > 0
-    if eligible:
-        stats["eligible_completion_count"] = int(stats.get("eligible_completion_count", 0)) + 1
-
-    settings = current_child.settings or {}
-    auto_upgrade = bool(settings.get("auto_upgrade_media_difficulty", True))
-    if auto_upgrade and int(stats.get("eligible_completion_count", 0)) >= 10 and progress.current_difficulty_level < 4:
-        progress.current_difficulty_level += 1
-        stats["eligible_completion_count"] = 0
-
-    progress.stats = stats
-    db.add(progress)
+    progress = media_progress.get_or_create(db, child_id=current_child.id, module=session.module)
+    media_progress.apply_session(
+        db,
+        progress,
+        current_child,
+        duration_seconds=duration_seconds,
+        completion_percent=completion_percent,
+        completed_count=completed_count,
+    )
 
     db.commit()
+    response_cache.invalidate(current_child.id, response_cache.media_scope(session.module), response_cache.HISTORY)
     db.refresh(session)
     return session
 
 
 @router.get("/report/summary", response_model=schemas.MediaReportSummary)
+@response_cache.cached("media_report_summary", schemas.MediaReportSummary, report_cache_key)
 def get_media_report_summary(
     period: str,
     module: str,
     current_user: models.Parent = Depends(deps.get_current_parent),
     db: Session = Depends(get_db),
 ):
-    child = get_default_child(db, current_user.id)
-    start_dt, end_dt = normalize_period(period)
+    child_id = deps.get_default_child_id(db, current_user)
+    first_day, last_day = normalize_period(period)
 
-    sessions = (
-        db.query(models.MediaLearningSession)
-        .filter(
-            models.MediaLearningSession.child_id == child.id,
-            models.MediaLearningSession.module == module,
-            models.MediaLearningSession.started_at >= start_dt,
-            models.MediaLearningSession.started_at <= end_dt,
-        )
-        .all()
-    )
-
-    total_seconds = sum(int(s.duration_seconds or 0) for s in sessions)
-    total_completed_count = sum(int(s.completed_count or 0) for s in sessions)
-    completion_values = [float(s.completion_percent or 0) for s in sessions]
-    average_completion_percent = sum(completion_values) / len(completion_values) if completion_values else 0.0
-
-    top = (
-        db.query(
-            models.MediaLearningSession.resource_id.label("resource_id"),
-            func.sum(models.MediaLearningSession.duration_seconds).label("total_seconds"),
-            func.sum(models.MediaLearningSession.completed_count).label("completed_count"),
-        )
-        .filter(
-            models.MediaLearningSession.child_id == child.id,
-            models.MediaLearningSession.module == module,
-            models.MediaLearningSession.started_at >= start_dt,
-            models.MediaLearningSession.started_at <= end_dt,
-        )
-        .group_by(models.MediaLearningSession.resource_id)
-        .order_by(func.sum(models.MediaLearningSession.duration_seconds).desc())
-        .limit(5)
-        .all()
-    )
-    resource_ids = [row.resource_id for row in top]
+    # 从按天汇总表读取，year 与 week 的开销只差天数
+    totals = media_rollup.summary(db, child_id, module, first_day, last_day)
+    resource_ids = [resource_id for resource_id, _, _ in totals["top"]]
     resources = db.query(models.MediaResource).filter(models.MediaResource.id.in_(resource_ids)).all() if resource_ids else []
     resource_map = {r.id: r for r in resources}
 
     top_items: List[schemas.MediaReportTopItem] = []
-    for row in top:
-        r = resource_map.get(row.resource_id)
+    for resource_id, seconds, completed in totals["top"]:
+        r = resource_map.get(resource_id)
         title = r.filename if r else "Unknown"
         top_items.append(
             schemas.MediaReportTopItem(
-                resource_id=row.resource_id,
+                resource_id=resource_id,
                 title=title,
-                total_minutes=round((float(row.total_seconds or 0) / 60), 1),
-                completed_count=int(row.completed_count or 0),
+                total_minutes=round(seconds / 60, 1),
+                completed_count=completed,
             )
         )
 
-    progress = get_or_create_media_progress(db, child_id=child.id, module=module)
+    progress = media_progress.get_or_create(db, child_id=child_id, module=module)
     difficulty_end = progress.current_difficulty_level
-    difficulty_start = max(1, min(4, int(sessions[0].difficulty_level_at_time or difficulty_end))) if sessions else difficulty_end
+    first_level = totals["first_difficulty_level"]
+    difficulty_start = max(1, min(4, int(first_level or difficulty_end))) if totals["session_count"] else difficulty_end
 
     return schemas.MediaReportSummary(
         period=period,
         module=module,
-        total_minutes=round(total_seconds / 60, 1),
-        total_completed_count=total_completed_count,
-        average_completion_percent=round(average_completion_percent, 1),
+        total_minutes=round(totals["total_seconds"] / 60, 1),
+        total_completed_count=totals["total_completed_count"],
+        average_completion_percent=round(totals["average_completion_percent"], 1),
         top_items=top_items,
         difficulty_level_start=difficulty_start,
         difficulty_level_end=difficulty_end,
@@ -434,44 +460,25 @@ def get_media_report_summary(
 
 
 @router.get("/report/days", response_model=List[schemas.MediaReportDayItem])
+@response_cache.cached("media_report_days", List[schemas.MediaReportDayItem], report_cache_key)
 def get_media_report_days(
     module: str,
     period: str = "week",
     current_user: models.Parent = Depends(deps.get_current_parent),
     db: Session = Depends(get_db),
 ):
-    child = get_default_child(db, current_user.id)
-    start_dt, end_dt = normalize_period(period)
-
-    rows = (
-        db.query(
-            func.date(models.MediaLearningSession.started_at).label("date"),
-            func.sum(models.MediaLearningSession.duration_seconds).label("total_seconds"),
-            func.sum(models.MediaLearningSession.completed_count).label("completed_count"),
-            func.avg(models.MediaLearningSession.completion_percent).label("avg_completion"),
-        )
-        .filter(
-            models.MediaLearningSession.child_id == child.id,
-            models.MediaLearningSession.module == module,
-            models.MediaLearningSession.started_at >= start_dt,
-            models.MediaLearningSession.started_at <= end_dt,
-        )
-        .group_by(func.date(models.MediaLearningSession.started_at))
-        .order_by(func.date(models.MediaLearningSession.started_at).asc())
-        .all()
-    )
-
-    result: List[schemas.MediaReportDayItem] = []
-    for r in rows:
-        result.append(
-            schemas.MediaReportDayItem(
-                date=r.date if isinstance(r.date, date) else date.fromisoformat(str(r.date)),
-                total_minutes=round((float(r.total_seconds or 0) / 60), 1),
-                total_completed_count=int(r.completed_count or 0),
-                average_completion_percent=round(float(r.avg_completion or 0), 1),
-            )
+    child_id = deps.get_default_child_id(db, current_user)
+    first_day, last_day = normalize_period(period)
+
+    return [
+        schemas.MediaReportDayItem(
+            date=day,
+            total_minutes=round(seconds / 60, 1),
+            total_completed_count=completed,
+            average_completion_percent=round(average, 1),
         )
-    return result
+        for day, seconds, completed, average in media_rollup.days(db, child_id, module, first_day, last_day)
+    ]
 
 
 @router.get("/child/plan", response_model=List[schemas.MediaPlanItemResponse])
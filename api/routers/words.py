@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text, bindparam
+from sqlalchemy import text
 from typing import List, Optional
 from .. import models, schemas, security, deps
 from ..database import get_db, get_dictionary_db
-from ..services import word_service
+from ..services import daily_deck, enrichment_queue, dictionary_cache, image_pipeline, image_scheduler, spaced_repetition, suggest_index, upstream, word_filter
 
 router = APIRouter(
     prefix="/api/words",
@@ -19,6 +20,9 @@ def suggest_words(
     if len(q) < 3:
         return []
 
+    if suggest_index.index.ready:
+        return suggest_index.index.suggest(q, 5)
+
     rows = dict_db.execute(
         text(
             """
@@ -34,38 +38,13 @@ def suggest_words(
     return [r[0] for r in rows]
 
 
-def _fetch_dictionary_entries(dict_db: Session, vc_ids: List[str]) -> dict:
-    if not vc_ids:
-        return {}
-    stmt = (
-        text(
-            """
-            SELECT
-                w.vc_id,
-                w.vc_vocabulary,
-                w.vc_phonetic_us,
-                w.vc_phonetic_uk,
-                COALESCE(NULLIF(t.translation, ''), e.youdao_translation) AS translation,
-                e.image_url,
-                e.audio_us_url,
-                e.audio_uk_url,
-                e.example
-            FROM word w
-            LEFT JOIN word_translation t ON t.vc_id = w.vc_id
-            LEFT JOIN word_ext e ON e.vc_id = w.vc_id
-            WHERE w.vc_id IN :vc_ids
-            """
-        )
-        .bindparams(bindparam("vc_ids", expanding=True))
-    )
-    rows = dict_db.execute(stmt, {"vc_ids": vc_ids}).mappings().all()
-    return {r["vc_id"]: dict(r) for r in rows}
-
 @router.get("/", response_model=List[schemas.WordResponse])
 def get_words(
     skip: int = 0, 
     limit: int = 100, 
     category: Optional[str] = None,
+    image_width: Optional[int] = Query(None, ge=1, description="Pick the smallest image rendition at least this wide"),
+    image_format: Optional[str] = Query(None, description="'webp' if the client can display WebP"),
     current_user: models.Parent = Depends(deps.get_current_user),
     db: Session = Depends(get_db),
     dict_db: Session = Depends(get_dictionary_db),
@@ -82,19 +61,13 @@ def get_words(
     words = query.order_by(models.Word.created_at.desc()).offset(skip).limit(limit).all()
 
     vc_ids = [w.dict_vc_id for w in words if w.dict_vc_id]
-    dict_map = _fetch_dictionary_entries(dict_db, vc_ids)
+    dict_map = dictionary_cache.get_entries(dict_db, vc_ids)
+    pending = enrichment_queue.enqueue_missing(db, dict_map.values())
 
+    accept_webp = image_format == "webp"
     result = []
     for w in words:
-        payload = None
-        if w.dict_vc_id:
-            payload = dict_map.get(w.dict_vc_id)
-            if payload and (not payload.get("image_url") or not payload.get("audio_us_url") or not payload.get("example") or not payload.get("translation")):
-                ext = word_service.ensure_word_ext(dict_db=dict_db, vc_id=w.dict_vc_id, word=payload.get("vc_vocabulary") or "")
-                payload.update(ext)
-                if not payload.get("translation"):
-                    payload["translation"] = ext.get("youdao_translation") or ""
-
+        payload = dict_map.get(w.dict_vc_id) if w.dict_vc_id else None
         if payload:
             result.append(
                 {
@@ -105,19 +78,19 @@ def get_words(
                     "phonetic_us": payload.get("vc_phonetic_us") or None,
                     "phonetic_uk": payload.get("vc_phonetic_uk") or None,
                     "example": payload.get("example") or None,
-                    "image_url": payload.get("image_url") or None,
+                    "image_url": image_pipeline.image_url_for(payload, image_width, accept_webp),
                     "audio_us_url": payload.get("audio_us_url") or None,
                     "audio_uk_url": payload.get("audio_uk_url") or None,
                     "category": w.category,
                     "difficulty": w.difficulty,
                     "created_at": w.created_at,
+                    "enrichment_pending": w.dict_vc_id in pending,
                 }
             )
-            continue
     return result
 
 @router.post("/", response_model=schemas.WordResponse)
-async def create_word(
+def create_word(
     word_in: schemas.WordCreate, 
     current_user: models.Parent = Depends(deps.get_current_user),
     db: Session = Depends(get_db),
@@ -125,6 +98,10 @@ async def create_word(
 ):
     normalized_input = word_in.word.strip()
 
+    if word_filter.word_filter.definitely_missing(normalized_input):
+        word_filter.word_filter.record_miss(normalized_input)
+        raise HTTPException(status_code=404, detail="Word not found in base dictionary")
+
     row = dict_db.execute(
         text(
             """
@@ -133,7 +110,11 @@ async def create_word(
                 w.vc_vocabulary,
                 w.vc_phonetic_us,
                 w.vc_phonetic_uk,
-                COALESCE(NULLIF(t.translation, ''), e.youdao_translation) AS translation
+                COALESCE(NULLIF(t.translation, ''), e.youdao_translation) AS translation,
+                e.image_url,
+                e.audio_us_url,
+                e.audio_uk_url,
+                e.example
             FROM word w
             LEFT JOIN word_translation t ON t.vc_id = w.vc_id
             LEFT JOIN word_ext e ON e.vc_id = w.vc_id
@@ -145,6 +126,7 @@ async def create_word(
     ).mappings().first()
 
     if not row:
+        word_filter.word_filter.record_miss(normalized_input, after_lookup=True)
         raise HTTPException(status_code=404, detail="Word not found in base dictionary")
 
     vc_id = row["vc_id"]
@@ -165,35 +147,44 @@ async def create_word(
         difficulty=word_in.difficulty
     )
     db.add(db_word)
+    db.flush()
+    spaced_repetition.add_words(db, current_user.id, [db_word.id])
     db.commit()
     db.refresh(db_word)
+    daily_deck.invalidate_parent(db, current_user.id)
+    suggest_index.index.bump_popularity(vc_id)
 
-    ext = word_service.ensure_word_ext(dict_db=dict_db, vc_id=vc_id, word=row.get("vc_vocabulary") or normalized_input)
-    meaning = row.get("translation") or ext.get("youdao_translation") or ""
+    pending = enrichment_queue.enqueue_missing(db, [dict(row)])
 
     return {
         "id": db_word.id,
         "parent_id": db_word.parent_id,
         "word": row.get("vc_vocabulary") or normalized_input,
-        "meaning": meaning,
+        "meaning": row.get("translation") or "",
         "phonetic_us": row.get("vc_phonetic_us") or None,
         "phonetic_uk": row.get("vc_phonetic_uk") or None,
-        "example": ext.get("example"),
-        "image_url": ext.get("image_url"),
-        "audio_us_url": ext.get("audio_us_url"),
-        "audio_uk_url": ext.get("audio_uk_url"),
+        "example": row.get("example") or None,
+        "image_url": row.get("image_url") or None,
+        "audio_us_url": row.get("audio_us_url") or None,
+        "audio_uk_url": row.get("audio_uk_url") or None,
         "category": db_word.category,
         "difficulty": db_word.difficulty,
-        "created_at": db_word.created_at
+        "created_at": db_word.created_at,
+        "enrichment_pending": vc_id in pending,
     }
 
 @router.get("/search")
-async def search_word_info(
+def search_word_info(
     word: str,
+    db: Session = Depends(get_db),
     dict_db: Session = Depends(get_dictionary_db)
 ):
     normalized_word = word.strip()
 
+    if word_filter.word_filter.definitely_missing(normalized_word):
+        word_filter.word_filter.record_miss(normalized_word)
+        raise HTTPException(status_code=404, detail="Word not found in base dictionary")
+
     row = dict_db.execute(
         text(
             """
@@ -218,14 +209,11 @@ async def search_word_info(
     ).mappings().first()
 
     if not row:
+        word_filter.word_filter.record_miss(normalized_word, after_lookup=True)
         raise HTTPException(status_code=404, detail="Word not found in base dictionary")
 
     payload = dict(row)
-    if not payload.get("image_url") or not payload.get("audio_us_url") or not payload.get("example") or not payload.get("translation"):
-        ext = word_service.ensure_word_ext(dict_db=dict_db, vc_id=payload["vc_id"], word=payload.get("vc_vocabulary") or normalized_word)
-        payload.update(ext)
-        if not payload.get("translation"):
-            payload["translation"] = ext.get("youdao_translation") or ""
+    pending = enrichment_queue.enqueue_missing(db, [payload])
 
     return {
         "word": payload.get("vc_vocabulary") or normalized_word,
@@ -236,8 +224,72 @@ async def search_word_info(
         "image_url": payload.get("image_url") or None,
         "audio_us_url": payload.get("audio_us_url") or None,
         "audio_uk_url": payload.get("audio_uk_url") or None,
+        "enrichment_pending": payload["vc_id"] in pending,
     }
 
+@router.get("/images/{vc_id}")
+def get_word_image(
+    vc_id: str,
+    request: Request,
+    width: Optional[int] = Query(None, ge=1),
+    dict_db: Session = Depends(get_dictionary_db),
+):
+    """Redirect to the smallest rendition of a word's image that fits `width`, WebP when the client accepts it."""
+    payload = dictionary_cache.get_entries(dict_db, [vc_id]).get(vc_id)
+    if not payload:
+        raise HTTPException(status_code=404, detail="Word not found in base dictionary")
+    accept_webp = "image/webp" in request.headers.get("accept", "")
+    url = image_pipeline.image_url_for(payload, width, accept_webp)
+    if not url:
+        raise HTTPException(status_code=404, detail="Word has no image yet")
+    response = RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    response.headers["Vary"] = "Accept"
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return response
+
+@router.get("/enrichment/status", response_model=schemas.EnrichmentQueueStatus)
+def get_enrichment_status(
+    vc_ids: Optional[str] = None,
+    current_user: models.Parent = Depends(deps.get_current_user),
+    db: Session = Depends(get_db),
+):
+    ids = [v.strip() for v in (vc_ids or "").split(",") if v and v.strip()]
+    return enrichment_queue.queue_status(db, ids[:200])
+
+@router.get("/cache/stats", response_model=schemas.DictionaryCacheStats)
+def get_dictionary_cache_stats(
+    current_user: models.Parent = Depends(deps.get_current_user),
+):
+    return dictionary_cache.entry_cache.stats()
+
+@router.get("/filter/stats", response_model=schemas.WordFilterStats)
+def get_word_filter_stats(
+    current_user: models.Parent = Depends(deps.get_current_user),
+):
+    return word_filter.word_filter.stats()
+
+@router.get("/misses", response_model=List[schemas.DictionaryMissResponse])
+def get_dictionary_misses(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: models.Parent = Depends(deps.get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Most looked-up words the base dictionary lacks: candidates for adding to it."""
+    word_filter.flush_misses()
+    return word_filter.top_misses(db, limit)
+
+@router.get("/upstreams/status", response_model=List[schemas.UpstreamBreakerStatus])
+def get_upstream_status(
+    current_user: models.Parent = Depends(deps.get_current_user),
+):
+    return upstream.breaker_status()
+
+@router.get("/upstreams/image-scheduler", response_model=schemas.ImageSchedulerStatus)
+def get_image_scheduler_status(
+    current_user: models.Parent = Depends(deps.get_current_user),
+):
+    return image_scheduler.stats()
+
 @router.delete("/{word_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_word(
     word_id: str,
@@ -252,6 +304,10 @@ def delete_word(
     if not word:
         raise HTTPException(status_code=404, detail="Word not found")
         
+    vc_id = word.dict_vc_id
     db.delete(word)
     db.commit()
+    daily_deck.invalidate_parent(db, current_user.id)
+    if vc_id:
+        suggest_index.index.bump_popularity(vc_id, -1)
     return None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, date
 import uuid
@@ -110,6 +110,88 @@ class WordResponse(BaseModel):
     category: Optional[str] = None
     difficulty: int = 1
     created_at: datetime
+    enrichment_pending: bool = False
+
+    class Config:
+        from_attributes = True
+
+class EnrichmentJobStatus(BaseModel):
+    vc_id: str
+    word: str
+    status: str  # queued / running / done / failed
+    attempts: int = 0
+    last_error: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+class EnrichmentQueueStatus(BaseModel):
+    queued: int = 0
+    running: int = 0
+    done: int = 0
+    failed: int = 0
+    workers: int = 0
+    words: List[EnrichmentJobStatus] = []
+
+class DictionaryCacheStats(BaseModel):
+    size: int
+    max_size: int
+    local_hits: int
+    redis_hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    hit_ratio: float
+    redis_enabled: bool
+
+class ResponseCacheRouteStats(BaseModel):
+    name: str
+    hits: int
+    misses: int
+    hit_ratio: float
+
+class ResponseCacheStats(BaseModel):
+    enabled: bool
+    redis_enabled: bool
+    local_size: int
+    invalidations: int
+    hit_ratio: float
+    routes: List[ResponseCacheRouteStats] = []
+
+class UpstreamBreakerStatus(BaseModel):
+    name: str
+    state: str  # closed / open / half_open
+    trip_count: int
+    rejected_count: int
+    window_calls: int
+    window_failures: int
+    window_slow_calls: int
+    last_trip_at: Optional[datetime] = None
+    last_trip_reason: Optional[str] = None
+
+class ImageSchedulerStatus(BaseModel):
+    rate_per_minute: float
+    burst: float
+    priority_reserve: float
+    granted: int
+    deferred: int
+    rate_limited: int
+    shared: bool  # True when the bucket lives in Redis
+
+class WordFilterStats(BaseModel):
+    ready: bool
+    words: int
+    memory_bytes: int
+    hash_count: int
+    rejected: int  # answered 404 without touching MySQL
+    passed: int
+    false_positives: int  # passed the filter but MySQL had no match either
+    pending_misses: int
+    loaded_at: Optional[float] = None
+
+class DictionaryMissResponse(BaseModel):
+    word: str
+    miss_count: int
+    first_seen_at: Optional[datetime] = None
+    last_seen_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -129,6 +211,35 @@ class LearningRecordResponse(LearningRecordCreate):
     class Config:
         from_attributes = True
 
+class WordResultEvent(BaseModel):
+    event_id: str = Field(..., min_length=1, max_length=64)  # client-generated idempotency key
+    word_id: str
+    result: str  # "remembered" or "forgot"
+    time_spent: float = 0
+    occurred_at: datetime
+
+class MediaSessionEvent(BaseModel):
+    event_id: str = Field(..., min_length=1, max_length=64)
+    resource_id: str
+    module: str  # video | audio
+    started_at: datetime
+    duration_seconds: int
+    completion_percent: float
+    completed_count: int = 1
+
+class LearningEventBatch(BaseModel):
+    word_results: List[WordResultEvent] = []
+    media_sessions: List[MediaSessionEvent] = []
+
+class RejectedEvent(BaseModel):
+    event_id: str
+    reason: str
+
+class LearningEventBatchResult(BaseModel):
+    accepted: int
+    duplicates: int
+    rejected: List[RejectedEvent] = []
+
 class DailyTaskResponse(BaseModel):
     total_words: int
     learned_words: int
@@ -254,3 +365,21 @@ class MediaReportDayItem(BaseModel):
     total_minutes: float
     total_completed_count: int
     average_completion_percent: float
+
+class TranscriptionJobResponse(BaseModel):
+    id: str
+    media_id: Optional[str] = None
+    status: str
+    priority: int
+    progress: int
+    stage: Optional[str] = None
+    attempts: int
+    cancel_requested: bool
+    last_error: Optional[str] = None
+    srt_url: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
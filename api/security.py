@@ -1,4 +1,5 @@
-from datetime import datetime, timedelta
+import hashlib
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
@@ -19,12 +20,19 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
+def password_version(hashed_password):
+    # Carried in tokens as "pwv"; changes whenever the password does, which invalidates older tokens
+    return hashlib.sha256((hashed_password or "").encode('utf-8')).hexdigest()[:16]
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(minutes=15)
+    # iat keeps sub-second precision (jose would truncate a datetime), so a token minted just after
+    # a revocation compares as later than it
+    to_encode.update({"exp": expire, "iat": now.replace(tzinfo=timezone.utc).timestamp()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
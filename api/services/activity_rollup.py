@@ -0,0 +1,116 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import time_ranges
+
+_MEDIA_COLUMNS = {
+    "video": ("video_sessions", "video_seconds"),
+    "audio": ("audio_sessions", "audio_seconds"),
+}
+
+
+def add_to_day(db: Session, child_id: str, day: date, deltas: Dict[str, float]) -> None:
+    """Atomically add `deltas` to the child's row for `day`, creating it if needed. Does not commit."""
+    columns = {getattr(models.ChildDailyActivity, k): getattr(models.ChildDailyActivity, k) + v for k, v in deltas.items()}
+    query = db.query(models.ChildDailyActivity).filter(
+        models.ChildDailyActivity.child_id == child_id,
+        models.ChildDailyActivity.activity_date == day,
+    )
+    if query.update(columns, synchronize_session=False):
+        return
+    try:
+        with db.begin_nested():
+            db.add(models.ChildDailyActivity(child_id=child_id, activity_date=day, **{**_zero(), **deltas}))
+    except IntegrityError:
+        # A concurrent write created the row first
+        query.update(columns, synchronize_session=False)
+
+
+def _zero() -> Dict[str, float]:
+    return {
+        "words_total": 0,
+        "words_remembered": 0,
+        "word_seconds": 0.0,
+        "video_sessions": 0,
+        "video_seconds": 0,
+        "audio_sessions": 0,
+        "audio_seconds": 0,
+    }
+
+
+def record_word(db: Session, child_id: str, result: Optional[str], time_spent: Optional[float], day: Optional[date] = None) -> None:
+    day = day or time_ranges.local_today()
+    add_to_day(db, child_id, day, {
+        "words_total": 1,
+        "words_remembered": 1 if result == "remembered" else 0,
+        "word_seconds": float(time_spent or 0),
+    })
+
+
+def record_media_start(db: Session, child_id: str, module: str, day: Optional[date] = None) -> None:
+    if module not in _MEDIA_COLUMNS:
+        return
+    day = day or time_ranges.local_today()
+    add_to_day(db, child_id, day, {_MEDIA_COLUMNS[module][0]: 1})
+
+
+def record_media_seconds(db: Session, child_id: str, module: str, started_at: Optional[datetime], delta_seconds: int) -> None:
+    """Add the change in a session's duration to the day it started on (finish may be sent again)."""
+    if module not in _MEDIA_COLUMNS or not delta_seconds:
+        return
+    day = time_ranges.local_date(started_at) if started_at else time_ranges.local_today()
+    add_to_day(db, child_id, day, {_MEDIA_COLUMNS[module][1]: delta_seconds})
+
+
+def history(db: Session, child_id: str) -> List[models.ChildDailyActivity]:
+    return (
+        db.query(models.ChildDailyActivity)
+        .filter(models.ChildDailyActivity.child_id == child_id)
+        .order_by(models.ChildDailyActivity.activity_date.desc())
+        .all()
+    )
+
+
+def get_day(db: Session, child_id: str, day: date) -> Optional[models.ChildDailyActivity]:
+    return (
+        db.query(models.ChildDailyActivity)
+        .filter(models.ChildDailyActivity.child_id == child_id, models.ChildDailyActivity.activity_date == day)
+        .first()
+    )
+
+
+def rebuild(db: Session, child_id: str) -> int:
+    """Recompute the child's rollup from learning_records and media_learning_sessions. Does not commit."""
+    days: Dict[date, Dict[str, float]] = {}
+
+    # Bucketed in Python: a day is the child's local day, which need not be the DB server's date
+    records = db.query(
+        models.LearningRecord.created_at, models.LearningRecord.result, models.LearningRecord.time_spent
+    ).filter(models.LearningRecord.child_id == child_id)
+    for created_at, result, time_spent in records.yield_per(1000):
+        row = days.setdefault(time_ranges.local_date(created_at), _zero())
+        row["words_total"] += 1
+        row["words_remembered"] += 1 if result == "remembered" else 0
+        row["word_seconds"] += float(time_spent or 0)
+
+    sessions = db.query(
+        models.MediaLearningSession.started_at, models.MediaLearningSession.module, models.MediaLearningSession.duration_seconds
+    ).filter(models.MediaLearningSession.child_id == child_id)
+    for started_at, module, seconds in sessions.yield_per(1000):
+        if module not in _MEDIA_COLUMNS or started_at is None:
+            continue
+        count_col, seconds_col = _MEDIA_COLUMNS[module]
+        row = days.setdefault(time_ranges.local_date(started_at), _zero())
+        row[count_col] += 1
+        row[seconds_col] += int(seconds or 0)
+
+    db.query(models.ChildDailyActivity).filter(models.ChildDailyActivity.child_id == child_id).delete(
+        synchronize_session=False
+    )
+    for day, values in days.items():
+        db.add(models.ChildDailyActivity(child_id=child_id, activity_date=day, **values))
+    return len(days)
@@ -0,0 +1,75 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# whisper.load_audio 输出 16kHz 单声道 float32
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+
+def frame_levels(audio: np.ndarray, frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """每帧（默认 30ms）的 RMS 能量，单位 dB"""
+    frame = max(1, int(SAMPLE_RATE * frame_seconds))
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: count * frame].reshape(count, frame).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_frames(levels: np.ndarray, margin_db: float = 12.0) -> np.ndarray:
+    """能量型 VAD：比本段噪声底（第 10 百分位）高出 margin_db 的帧视为有人声"""
+    if len(levels) == 0:
+        return np.zeros(0, dtype=bool)
+    floor = float(np.percentile(levels, 10))
+    return levels > max(floor + margin_db, -60.0)
+
+
+def silence_cuts(speech: np.ndarray, min_silence_frames: int) -> List[Tuple[int, int]]:
+    """足够长的静音段，返回 (起始帧, 长度)"""
+    cuts = []
+    start = None
+    for i, voiced in enumerate(np.append(speech, True)):
+        if not voiced and start is None:
+            start = i
+        elif voiced and start is not None:
+            if i - start >= min_silence_frames:
+                cuts.append((start, i - start))
+            start = None
+    return cuts
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    chunk_seconds: float = 120.0,
+    min_silence_seconds: float = 0.5,
+    margin_db: float = 12.0,
+    quiet_db: float = -45.0,
+) -> List[Tuple[int, int]]:
+    """
+    按静音切分成约 chunk_seconds 的片段，返回 [(起始采样, 结束采样)]。
+    切点取目标长度 ±50% 范围内离目标最近的静音段中点；找不到静音时在目标长度处硬切。
+    整段低于 quiet_db 的片段（纯静音）直接丢弃，不送去转录。
+    """
+    levels = frame_levels(audio)
+    speech = speech_frames(levels, margin_db)
+    frame = int(SAMPLE_RATE * FRAME_SECONDS)
+    total = len(audio)
+    target = max(1, int(chunk_seconds / FRAME_SECONDS))
+    midpoints = [s + n // 2 for s, n in silence_cuts(speech, max(1, int(min_silence_seconds / FRAME_SECONDS)))]
+
+    chunks = []
+    start = 0
+    frames_total = len(levels)
+    while start < frames_total:
+        if frames_total - start <= target * 1.5:
+            end = frames_total
+        else:
+            lo, hi = start + target // 2, start + target + target // 2
+            candidates = [m for m in midpoints if lo <= m <= hi]
+            end = min(candidates, key=lambda m: abs(m - start - target)) if candidates else start + target
+        if levels[start:end].max() > quiet_db:
+            chunks.append((start * frame, total if end >= frames_total else end * frame))
+        start = end
+    return chunks
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for upstream '{name}' is open, retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Sliding-window breaker. It opens when, over the last `window_size` calls (and at least
+    `min_calls`), the share of failed calls or of calls slower than `slow_call_seconds`
+    reaches its threshold. After `open_seconds` a single probe is let through (half-open);
+    its outcome closes the breaker or opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        slow_call_rate: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = max(1, min_calls)
+        self.open_seconds = open_seconds
+        self._window: deque = deque(maxlen=max(1, window_size))
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.trip_count = 0
+        self.rejected_count = 0
+        self.last_trip_at: Optional[float] = None
+        self.last_trip_reason: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not be made right now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected_count += 1
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(self.name, retry_in)
+
+    def cancel(self) -> None:
+        """The permitted call was never made (e.g. the request budget ran out first)."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record(self, success: bool, elapsed: float) -> None:
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            state = self._current_state()
+            if state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if success and not slow:
+                    self._state = self.CLOSED
+                    self._window.clear()
+                else:
+                    self._trip("probe failed" if not success else "probe slow")
+                return
+
+            self._window.append((success, slow))
+            if state != self.CLOSED or len(self._window) < self.min_calls:
+                return
+            total = len(self._window)
+            failures = sum(1 for ok, _ in self._window if not ok)
+            slow_calls = sum(1 for _, is_slow in self._window if is_slow)
+            if failures / total >= self.failure_rate:
+                self._trip(f"failure rate {failures}/{total}")
+            elif slow_calls / total >= self.slow_call_rate:
+                self._trip(f"slow calls {slow_calls}/{total} over {self.slow_call_seconds}s")
+
+    def _trip(self, reason: str) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        self.trip_count += 1
+        self.last_trip_at = time.time()
+        self.last_trip_reason = reason
+        print(f"Circuit breaker '{self.name}' opened: {reason}")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            total = len(self._window)
+            return {
+                "name": self.name,
+                "state": state,
+                "trip_count": self.trip_count,
+                "rejected_count": self.rejected_count,
+                "window_calls": total,
+                "window_failures": sum(1 for ok, _ in self._window if not ok),
+                "window_slow_calls": sum(1 for _, is_slow in self._window if is_slow),
+                "last_trip_at": self.last_trip_at,
+                "last_trip_reason": self.last_trip_reason,
+            }
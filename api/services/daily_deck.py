@@ -0,0 +1,293 @@
+import json
+import os
+import threading
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import DictionarySessionLocal, SessionLocal
+from . import dictionary_cache, enrichment_queue, redis_client, spaced_repetition, time_ranges
+
+DAILY_DECK_ENABLED = os.getenv("DAILY_DECK_ENABLED", "1") not in {"0", "false", "False"}
+DECK_SCHEDULER_POLL_SECONDS = float(os.getenv("DECK_SCHEDULER_POLL_SECONDS", 300))
+# Decks built per scheduler pass; the rest wait for the next pass (or are built on first read)
+DECK_SCHEDULER_BATCH = int(os.getenv("DECK_SCHEDULER_BATCH", 200))
+# A deck with words still being enriched is rebuilt on read once it is this old, picking up new images/audio
+DECK_PENDING_REFRESH_SECONDS = int(os.getenv("DECK_PENDING_REFRESH_SECONDS", 300))
+DECK_REDIS_TTL = int(os.getenv("DECK_REDIS_TTL", 36 * 3600))
+DEFAULT_DAILY_WORDS = 20
+DEFAULT_REMINDER_TIME = "19:00"
+
+_LOCK_KEY = redis_client.redis_key("deck", "scheduler")
+
+
+def today() -> date:
+    # Decks roll over at the child's local midnight; reminder_time is read in the same timezone
+    return time_ranges.local_today()
+
+
+def daily_words(child: models.Child) -> int:
+    settings = child.settings if isinstance(child.settings, dict) else {}
+    return int(settings.get("daily_words") or DEFAULT_DAILY_WORDS)
+
+
+def _deck_key(child_id: str, day: date) -> str:
+    return redis_client.redis_key("deck", child_id, day.isoformat())
+
+
+def _card(word: models.Word, payload: dict, pending: bool) -> dict:
+    # JSON-safe; image_renditions is kept so image_url can be picked per request, then stripped
+    return {
+        "id": word.id,
+        "parent_id": word.parent_id,
+        "word": payload.get("vc_vocabulary") or "",
+        "meaning": payload.get("translation") or "",
+        "phonetic_us": payload.get("vc_phonetic_us") or None,
+        "phonetic_uk": payload.get("vc_phonetic_uk") or None,
+        "example": payload.get("example") or None,
+        "image_url": payload.get("image_url") or None,
+        "image_renditions": payload.get("image_renditions") or [],
+        "audio_us_url": payload.get("audio_us_url") or None,
+        "audio_uk_url": payload.get("audio_uk_url") or None,
+        "category": word.category,
+        "difficulty": word.difficulty,
+        "created_at": word.created_at.isoformat() if word.created_at else None,
+        "enrichment_pending": pending,
+    }
+
+
+def resolve_cards(db: Session, dict_db: Session, words: List[models.Word]) -> List[dict]:
+    """Dictionary entries for the words, in order; queues deck-priority enrichment for gaps."""
+    dict_map = dictionary_cache.get_entries(dict_db, [w.dict_vc_id for w in words if w.dict_vc_id])
+    # Missing images/audio are filled in the background; deck words jump the queue
+    pending = enrichment_queue.enqueue_missing(db, dict_map.values(), priority=enrichment_queue.PRIORITY_DECK)
+    cards = []
+    for w in words:
+        payload = dict_map.get(w.dict_vc_id) if w.dict_vc_id else None
+        if payload:
+            cards.append(_card(w, payload, w.dict_vc_id in pending))
+    return cards
+
+
+def pick_words(db: Session, child: models.Child, limit: int, keep_ids: Optional[List[str]] = None) -> List[models.Word]:
+    """
+    The child's due words. Words already in today's deck stay first and in order, so a
+    rebuild after a settings or library change does not reshuffle what the child sees.
+    """
+    if not spaced_repetition.has_mastery(db, child.id) and spaced_repetition.seed_child(db, child):
+        db.commit()
+    kept: List[models.Word] = []
+    if keep_ids:
+        by_id = {
+            w.id: w
+            for w in db.query(models.Word)
+            .filter(models.Word.id.in_(keep_ids), models.Word.parent_id == child.parent_id)
+            .all()
+        }
+        kept = [by_id[i] for i in keep_ids if i in by_id and by_id[i].dict_vc_id][:limit]
+    if len(kept) >= limit:
+        return kept
+    seen = {w.id for w in kept}
+    due = spaced_repetition.deck(db, child.id, child.parent_id, limit + len(kept))
+    return kept + [w for w in due if w.id not in seen][: limit - len(kept)]
+
+
+def _to_cache(row: models.DailyDeck) -> dict:
+    return {
+        "daily_words": row.daily_words,
+        "has_pending": bool(row.has_pending),
+        "generated_at": row.generated_at.replace(tzinfo=None).isoformat(),
+        "words": row.words,
+    }
+
+
+def _cache_put(child_id: str, day: date, deck: dict) -> None:
+    r = redis_client.get_redis()
+    if r is None:
+        return
+    try:
+        r.set(_deck_key(child_id, day), json.dumps(deck, ensure_ascii=False), ex=DECK_REDIS_TTL)
+    except Exception as e:
+        print(f"Daily deck Redis error: {e}")
+        redis_client.mark_failed()
+
+
+def _cache_get(child_id: str, day: date) -> Optional[dict]:
+    r = redis_client.get_redis()
+    if r is None:
+        return None
+    try:
+        raw = r.get(_deck_key(child_id, day))
+    except Exception as e:
+        print(f"Daily deck Redis error: {e}")
+        redis_client.mark_failed()
+        return None
+    return json.loads(raw) if raw else None
+
+
+def _cache_delete(child_ids: List[str], day: date) -> None:
+    r = redis_client.get_redis()
+    if r is None or not child_ids:
+        return
+    try:
+        r.delete(*[_deck_key(c, day) for c in child_ids])
+    except Exception as e:
+        print(f"Daily deck Redis error: {e}")
+        redis_client.mark_failed()
+
+
+def build_deck(db: Session, dict_db: Session, child: models.Child, day: Optional[date] = None) -> dict:
+    """Pick, resolve and store the child's deck for `day`, replacing any earlier version. Commits."""
+    day = day or today()
+    limit = daily_words(child)
+    row = (
+        db.query(models.DailyDeck)
+        .filter(models.DailyDeck.child_id == child.id, models.DailyDeck.deck_date == day)
+        .first()
+    )
+    words = pick_words(db, child, limit, list(row.word_ids or []) if row else None)
+    cards = resolve_cards(db, dict_db, words)
+    if row is None:
+        row = models.DailyDeck(child_id=child.id, deck_date=day)
+        db.add(row)
+    row.word_ids = [c["id"] for c in cards]
+    row.words = cards
+    row.daily_words = limit
+    row.has_pending = any(c["enrichment_pending"] for c in cards)
+    row.stale = False
+    row.generated_at = datetime.utcnow()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker built the same deck first; use theirs
+        db.rollback()
+        row = (
+            db.query(models.DailyDeck)
+            .filter(models.DailyDeck.child_id == child.id, models.DailyDeck.deck_date == day)
+            .one()
+        )
+    deck = _to_cache(row)
+    _cache_put(child.id, day, deck)
+    return deck
+
+
+def _needs_rebuild(deck: dict) -> bool:
+    if not deck.get("has_pending"):
+        return False
+    age = datetime.utcnow() - datetime.fromisoformat(deck["generated_at"])
+    return age.total_seconds() > DECK_PENDING_REFRESH_SECONDS
+
+
+def get_deck(db: Session, dict_db: Session, child: models.Child, day: Optional[date] = None) -> dict:
+    """Today's deck: one Redis read, else one row read, else built now."""
+    day = day or today()
+    deck = _cache_get(child.id, day)
+    if deck is None:
+        row = (
+            db.query(models.DailyDeck)
+            .filter(models.DailyDeck.child_id == child.id, models.DailyDeck.deck_date == day)
+            .first()
+        )
+        if row is not None and not row.stale:
+            deck = _to_cache(row)
+            _cache_put(child.id, day, deck)
+    if deck is None or _needs_rebuild(deck):
+        deck = build_deck(db, dict_db, child, day)
+    return deck
+
+
+def invalidate_children(db: Session, child_ids: List[str], day: Optional[date] = None) -> None:
+    """Mark today's decks stale so the next read or scheduler pass rebuilds them. Commits."""
+    day = day or today()
+    if not child_ids:
+        return
+    db.query(models.DailyDeck).filter(
+        models.DailyDeck.child_id.in_(child_ids), models.DailyDeck.deck_date == day
+    ).update({models.DailyDeck.stale: True}, synchronize_session=False)
+    db.commit()
+    _cache_delete(child_ids, day)
+
+
+def invalidate_parent(db: Session, parent_id: str) -> None:
+    child_ids = [c for (c,) in db.query(models.Child.id).filter(models.Child.parent_id == parent_id).all()]
+    invalidate_children(db, child_ids)
+
+
+def children_needing_decks(db: Session, day: date, limit: int) -> List[models.Child]:
+    """
+    Children without a fresh deck for `day`, earliest reminder first. Ordered and limited in SQL,
+    so a pass reads at most `limit` children however many are waiting.
+    """
+    # reminder_time is "HH:MM" from a time input, so it sorts as text
+    reminder = func.coalesce(models.Child.settings["reminder_time"].as_string(), DEFAULT_REMINDER_TIME)
+    return (
+        db.query(models.Child)
+        .outerjoin(
+            models.DailyDeck,
+            and_(models.DailyDeck.child_id == models.Child.id, models.DailyDeck.deck_date == day),
+        )
+        .filter(or_(models.DailyDeck.id.is_(None), models.DailyDeck.stale.is_(True)))
+        .order_by(reminder.asc(), models.Child.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def generate_due(session_factory=SessionLocal, dict_session_factory=DictionarySessionLocal, day: Optional[date] = None) -> int:
+    day = day or today()
+    built = 0
+    with session_factory() as db, dict_session_factory() as dict_db:
+        for child in children_needing_decks(db, day, DECK_SCHEDULER_BATCH):
+            try:
+                build_deck(db, dict_db, child, day)
+                built += 1
+            except Exception as e:
+                db.rollback()
+                print(f"Building daily deck for child {child.id} failed: {e}")
+    return built
+
+
+def _acquire_pass() -> bool:
+    # With Redis only one API worker runs each pass; without it every worker runs it and
+    # concurrent inserts of the same deck are resolved by the unique (child_id, deck_date)
+    r = redis_client.get_redis()
+    if r is None:
+        return True
+    try:
+        return bool(r.set(_LOCK_KEY, "1", nx=True, ex=max(1, int(DECK_SCHEDULER_POLL_SECONDS * 0.9))))
+    except Exception:
+        redis_client.mark_failed()
+        return True
+
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _loop() -> None:
+    while not _stop.is_set():
+        try:
+            if _acquire_pass():
+                built = generate_due()
+                if built:
+                    print(f"Built {built} daily decks for {today().isoformat()}")
+        except Exception as e:
+            print(f"Daily deck scheduler error: {e}")
+        _stop.wait(DECK_SCHEDULER_POLL_SECONDS)
+
+
+def start() -> None:
+    global _thread
+    if not DAILY_DECK_ENABLED or (_thread is not None and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="daily-deck", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    _stop.set()
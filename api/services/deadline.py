@@ -0,0 +1,55 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Absolute time.monotonic() by which the current request or job must be done
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request budget is spent; give up instead of starting more upstream work."""
+
+
+@contextmanager
+def budget(seconds: Optional[float]):
+    """
+    Run the block with a latency budget. Nested budgets can only shorten the deadline.
+    A falsy `seconds` leaves the current deadline unchanged.
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        new_deadline = min(current, new_deadline)
+    token = _deadline.set(new_deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None when no budget is set."""
+    current = _deadline.get()
+    if current is None:
+        return None
+    return current - time.monotonic()
+
+
+def check() -> None:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("request budget exhausted")
+
+
+def clamp_timeout(timeout: float) -> float:
+    """The smaller of `timeout` and the time left in the budget; raises when nothing is left."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("request budget exhausted")
+    return min(timeout, left)
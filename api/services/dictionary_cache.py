@@ -0,0 +1,360 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+
+from . import image_pipeline, redis_client
+
+DICT_CACHE_SIZE = int(os.getenv("DICT_CACHE_SIZE", 5000))
+# Local entries expire even without an invalidation message, bounding staleness
+# if a pub/sub message from another worker or the admin backend is missed.
+DICT_CACHE_LOCAL_TTL = float(os.getenv("DICT_CACHE_LOCAL_TTL", 300))
+DICT_CACHE_REDIS_TTL = int(os.getenv("DICT_CACHE_REDIS_TTL", 24 * 3600))
+# Generation keys must outlive any entry written under them
+DICT_CACHE_GENERATION_TTL = DICT_CACHE_REDIS_TTL * 2
+
+INVALIDATE_CHANNEL = redis_client.redis_key("dict", "invalidate")
+# Lets the listener skip invalidations this process published itself
+_ORIGIN = uuid.uuid4().hex
+
+_ENTRY_QUERY = (
+    text(
+        """
+        SELECT
+            w.vc_id,
+            w.vc_vocabulary,
+            w.vc_phonetic_us,
+            w.vc_phonetic_uk,
+            COALESCE(NULLIF(t.translation, ''), e.youdao_translation) AS translation,
+            e.image_url,
+            e.audio_us_url,
+            e.audio_uk_url,
+            e.example
+        FROM word w
+        LEFT JOIN word_translation t ON t.vc_id = w.vc_id
+        LEFT JOIN word_ext e ON e.vc_id = w.vc_id
+        WHERE w.vc_id IN :vc_ids
+        """
+    )
+    .bindparams(bindparam("vc_ids", expanding=True))
+)
+
+
+def _entry_key(vc_id: str) -> str:
+    return redis_client.redis_key("dict", "entry", vc_id)
+
+
+def _generation_key(vc_id: str) -> str:
+    # Bumped by every invalidation; an entry is only written if it has not moved since the DB read
+    return redis_client.redis_key("dict", "gen", vc_id)
+
+
+# KEYS: entry, generation pairs. ARGV: ttl, then generation seen before the DB read and payload per pair.
+_SET_IF_CURRENT = """
+local written = 0
+for i = 1, #KEYS, 2 do
+    local seen = ARGV[i + 1]
+    local current = redis.call('GET', KEYS[i + 1]) or ''
+    if current == seen then
+        redis.call('SET', KEYS[i], ARGV[i + 2], 'EX', ARGV[1])
+        written = written + 1
+    end
+end
+return written
+"""
+
+
+class DictionaryEntryCache:
+    """
+    Two-tier cache for the word ⋈ word_translation ⋈ word_ext join, keyed by vc_id.
+    Tier 1 is a bounded in-process LRU; tier 2 is Redis when REDIS_URL is set.
+    """
+
+    def __init__(self, max_size: int = DICT_CACHE_SIZE, local_ttl: float = DICT_CACHE_LOCAL_TTL):
+        self.max_size = max(1, max_size)
+        self.local_ttl = local_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Invalidation sequence: a read that started before an id was invalidated must not cache it.
+        # Only the latest max_size invalidated ids are remembered; reads older than the ones
+        # forgotten are not cached at all.
+        self._seq = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._forgotten_seq = 0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _get_local(self, vc_id: str) -> Optional[dict]:
+        item = self._entries.get(vc_id)
+        if item is None:
+            return None
+        payload, stored_at = item
+        if self.local_ttl and time.monotonic() - stored_at > self.local_ttl:
+            del self._entries[vc_id]
+            return None
+        self._entries.move_to_end(vc_id)
+        return payload
+
+    def _put_local(self, vc_id: str, payload: dict, read_seq: int) -> None:
+        if read_seq < self._forgotten_seq or self._invalidated.get(vc_id, 0) > read_seq:
+            return
+        self._entries[vc_id] = (payload, time.monotonic())
+        self._entries.move_to_end(vc_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, dict_db: Session, vc_ids: Iterable[str]) -> Dict[str, dict]:
+        wanted = list(dict.fromkeys(v for v in vc_ids if v))
+        if not wanted:
+            return {}
+
+        found: Dict[str, dict] = {}
+        missing: List[str] = []
+        with self._lock:
+            read_seq = self._seq
+            for vc_id in wanted:
+                payload = self._get_local(vc_id)
+                if payload is None:
+                    missing.append(vc_id)
+                else:
+                    found[vc_id] = payload
+            self.local_hits += len(found)
+
+        generations: Dict[str, str] = {}
+        if missing:
+            from_redis, generations = self._get_redis(missing)
+            if from_redis:
+                with self._lock:
+                    self.redis_hits += len(from_redis)
+                    for vc_id, payload in from_redis.items():
+                        self._put_local(vc_id, payload, read_seq)
+                found.update(from_redis)
+                missing = [v for v in missing if v not in from_redis]
+
+        if missing:
+            rows = dict_db.execute(_ENTRY_QUERY, {"vc_ids": missing}).mappings().all()
+            from_db = {r["vc_id"]: dict(r) for r in rows}
+            self._attach_renditions(dict_db, from_db)
+            with self._lock:
+                self.misses += len(missing)
+                for vc_id, payload in from_db.items():
+                    self._put_local(vc_id, payload, read_seq)
+            self._set_redis(from_db, generations)
+            found.update(from_db)
+
+        # Callers decorate payloads in place, so never hand out the cached dicts
+        return {vc_id: dict(payload) for vc_id, payload in found.items()}
+
+    def _attach_renditions(self, dict_db: Session, payloads: Dict[str, dict]) -> None:
+        try:
+            renditions = image_pipeline.load_renditions(dict_db, [v for v, p in payloads.items() if p.get("image_url")])
+        except Exception as e:
+            dict_db.rollback()
+            print(f"Loading image renditions failed: {e}")
+            return
+        for vc_id, items in renditions.items():
+            payloads[vc_id]["image_renditions"] = items
+
+    def _get_redis(self, vc_ids: List[str]) -> Tuple[Dict[str, dict], Dict[str, str]]:
+        """Cached payloads, and the generation of every id as of this read (for _set_redis)."""
+        client = redis_client.get_redis()
+        if client is None:
+            return {}, {}
+        try:
+            raw = client.mget([_entry_key(v) for v in vc_ids] + [_generation_key(v) for v in vc_ids])
+        except Exception as e:
+            print(f"Dictionary cache Redis read failed: {e}")
+            redis_client.mark_failed()
+            return {}, {}
+        entries, gens = raw[: len(vc_ids)], raw[len(vc_ids):]
+        result = {}
+        for vc_id, value in zip(vc_ids, entries):
+            if value:
+                try:
+                    result[vc_id] = json.loads(value)
+                except ValueError:
+                    continue
+        return result, {vc_id: gen or "" for vc_id, gen in zip(vc_ids, gens)}
+
+    def _set_redis(self, payloads: Dict[str, dict], generations: Dict[str, str]) -> None:
+        """
+        Write payloads read from the DB, skipping ids invalidated since `generations` was read:
+        their payload may predate the change, and nothing would delete it before the TTL.
+        """
+        client = redis_client.get_redis()
+        # Without a generation the read happened while Redis was unreachable; do not guess
+        payloads = {v: p for v, p in payloads.items() if v in generations}
+        if client is None or not payloads:
+            return
+        keys: List[str] = []
+        args: List = [DICT_CACHE_REDIS_TTL]
+        for vc_id, payload in payloads.items():
+            keys += [_entry_key(vc_id), _generation_key(vc_id)]
+            args += [generations[vc_id], json.dumps(payload, ensure_ascii=False, default=str)]
+        try:
+            client.eval(_SET_IF_CURRENT, len(keys), *keys, *args)
+        except Exception as e:
+            print(f"Dictionary cache Redis write failed: {e}")
+            redis_client.mark_failed()
+
+    def evict_local(self, vc_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._seq += 1
+            for vc_id in vc_ids:
+                self._invalidated[vc_id] = self._seq
+                self._invalidated.move_to_end(vc_id)
+                if self._entries.pop(vc_id, None) is not None:
+                    self.invalidations += 1
+            while len(self._invalidated) > self.max_size:
+                _, seq = self._invalidated.popitem(last=False)
+                self._forgotten_seq = max(self._forgotten_seq, seq)
+
+    def invalidate(self, vc_ids: Iterable[str]) -> None:
+        ids = [v for v in vc_ids if v]
+        if not ids:
+            return
+        self.evict_local(ids)
+        _run_hooks(ids)
+        client = redis_client.get_redis()
+        if client is None:
+            return
+        try:
+            # Bump the generation before deleting, so a read racing with this one cannot write back
+            pipe = client.pipeline(transaction=True)
+            for vc_id in ids:
+                pipe.incr(_generation_key(vc_id))
+                pipe.expire(_generation_key(vc_id), DICT_CACHE_GENERATION_TTL)
+            pipe.delete(*[_entry_key(v) for v in ids])
+            pipe.execute()
+            client.publish(INVALIDATE_CHANNEL, json.dumps({"ids": ids, "origin": _ORIGIN}))
+        except Exception as e:
+            print(f"Dictionary cache Redis invalidation failed: {e}")
+            redis_client.mark_failed()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            # Reads in flight may predate invalidations this process never heard about
+            self._seq += 1
+            self._forgotten_seq = self._seq
+            self._invalidated.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.local_hits + self.redis_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": round((self.local_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+                "redis_enabled": redis_client.get_redis() is not None,
+            }
+
+
+class InvalidationListener:
+    """Evicts local entries when another worker or the admin backend publishes an invalidation."""
+
+    def __init__(self, cache: DictionaryEntryCache):
+        self.cache = cache
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if not redis_client.REDIS_URL or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="dict-cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            client = redis_client.get_redis()
+            if client is None:
+                self._stop.wait(redis_client.REDIS_RETRY_SECONDS)
+                continue
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(INVALIDATE_CHANNEL)
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message or message.get("type") != "message":
+                        continue
+                    try:
+                        data = json.loads(message["data"])
+                    except ValueError:
+                        continue
+                    # The admin backend publishes a bare list of vc_ids
+                    if isinstance(data, dict):
+                        if data.get("origin") == _ORIGIN:
+                            continue
+                        data = data.get("ids")
+                    if isinstance(data, list):
+                        self.cache.evict_local(data)
+                        _run_hooks(data)
+            except Exception as e:
+                # Entries published while disconnected may have been missed
+                print(f"Dictionary cache listener error: {e}")
+                self.cache.clear()
+                self._stop.wait(1)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+_hooks: List[Callable[[List[str]], None]] = []
+
+
+def on_invalidate(hook: Callable[[List[str]], None]) -> None:
+    """Register a callback run with the vc_ids of every local or published invalidation."""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def _run_hooks(vc_ids: List[str]) -> None:
+    for hook in list(_hooks):
+        try:
+            hook(vc_ids)
+        except Exception as e:
+            print(f"Dictionary invalidation hook failed: {e}")
+
+
+entry_cache = DictionaryEntryCache()
+_listener = InvalidationListener(entry_cache)
+
+
+def get_entries(dict_db: Session, vc_ids: Iterable[str]) -> Dict[str, dict]:
+    return entry_cache.get_many(dict_db, vc_ids)
+
+
+def invalidate(vc_ids: Iterable[str]) -> None:
+    entry_cache.invalidate(vc_ids)
+
+
+def start_listener() -> None:
+    _listener.start()
+
+
+def stop_listener() -> None:
+    _listener.stop()
@@ -0,0 +1,305 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal, DictionarySessionLocal
+from . import deadline, word_service
+
+ENRICHMENT_ENABLED = os.getenv("ENRICHMENT_ENABLED", "1") not in {"0", "false", "False"}
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", 2))
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", 8))
+ENRICHMENT_MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", 3))
+ENRICHMENT_POLL_SECONDS = float(os.getenv("ENRICHMENT_POLL_SECONDS", 2))
+# Latency budget for one claimed batch; upstream calls stop once it is spent
+ENRICHMENT_BATCH_BUDGET_SECONDS = float(os.getenv("ENRICHMENT_BATCH_BUDGET_SECONDS", 120))
+ENRICHMENT_RETRY_BASE_SECONDS = int(os.getenv("ENRICHMENT_RETRY_BASE_SECONDS", 30))
+# A finished job is not re-queued for the same word until this long has passed,
+# so words Youdao/SiliconFlow cannot fill do not loop through the queue forever.
+ENRICHMENT_REQUEUE_SECONDS = int(os.getenv("ENRICHMENT_REQUEUE_SECONDS", 24 * 3600))
+# A job claimed longer ago than this belongs to a dead process and goes back on the queue.
+# Must exceed the batch budget, or jobs a live worker is still enriching would be requeued.
+ENRICHMENT_STALE_SECONDS = int(os.getenv("ENRICHMENT_STALE_SECONDS", max(600, ENRICHMENT_BATCH_BUDGET_SECONDS * 3)))
+
+PRIORITY_BACKFILL = 0
+PRIORITY_LIBRARY = 5
+PRIORITY_DECK = 10
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def needs_enrichment(payload: Optional[dict]) -> bool:
+    if not payload:
+        return False
+    return (
+        not payload.get("image_url")
+        or not payload.get("audio_us_url")
+        or not payload.get("example")
+        or not payload.get("translation")
+    )
+
+
+def enqueue_missing(db: Session, payloads: Iterable[dict], *, priority: int = PRIORITY_LIBRARY) -> Set[str]:
+    """
+    Queue enrichment for every dictionary payload that is missing fields.
+    Returns the vc_ids that still have an enrichment job pending.
+    """
+    wanted: Dict[str, str] = {}
+    for payload in payloads:
+        if payload and payload.get("vc_id") and needs_enrichment(payload):
+            wanted[payload["vc_id"]] = payload.get("vc_vocabulary") or ""
+    if not wanted:
+        return set()
+
+    now = datetime.utcnow()
+    requeue_before = now - timedelta(seconds=ENRICHMENT_REQUEUE_SECONDS)
+    existing = db.query(models.WordEnrichmentJob).filter(models.WordEnrichmentJob.vc_id.in_(list(wanted))).all()
+    existing_map = {job.vc_id: job for job in existing}
+
+    pending: Set[str] = set()
+    changed = False
+    for vc_id, word in wanted.items():
+        job = existing_map.get(vc_id)
+        if job is None:
+            db.add(models.WordEnrichmentJob(vc_id=vc_id, word=word, status="queued", priority=priority, next_attempt_at=now))
+            pending.add(vc_id)
+            changed = True
+            continue
+
+        if job.status in ACTIVE_STATUSES:
+            if job.status == "queued" and priority > (job.priority or 0):
+                job.priority = priority
+                changed = True
+            pending.add(vc_id)
+            continue
+
+        updated_at = job.updated_at.replace(tzinfo=None) if job.updated_at else None
+        if updated_at is None or updated_at <= requeue_before:
+            job.status = "queued"
+            job.attempts = 0
+            job.last_error = None
+            job.priority = priority
+            job.next_attempt_at = now
+            if word:
+                job.word = word
+            pending.add(vc_id)
+            changed = True
+
+    if changed:
+        try:
+            db.commit()
+        except Exception:
+            # A concurrent request queued the same word first; the job exists either way.
+            db.rollback()
+    return pending
+
+
+def queue_status(db: Session, vc_ids: Optional[List[str]] = None) -> dict:
+    rows = (
+        db.query(models.WordEnrichmentJob.status, func.count(models.WordEnrichmentJob.id))
+        .group_by(models.WordEnrichmentJob.status)
+        .all()
+    )
+    counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+    for status, count in rows:
+        counts[status] = int(count or 0)
+
+    words = []
+    if vc_ids:
+        jobs = db.query(models.WordEnrichmentJob).filter(models.WordEnrichmentJob.vc_id.in_(vc_ids)).all()
+        for job in jobs:
+            words.append(
+                {
+                    "vc_id": job.vc_id,
+                    "word": job.word,
+                    "status": job.status,
+                    "attempts": job.attempts or 0,
+                    "last_error": job.last_error,
+                    "updated_at": job.updated_at,
+                }
+            )
+
+    return {**counts, "workers": _worker.worker_count if _worker.is_running else 0, "words": words}
+
+
+def _claim_jobs(db: Session, limit: int) -> List[models.WordEnrichmentJob]:
+    now = datetime.utcnow()
+    candidates = (
+        db.query(models.WordEnrichmentJob.id)
+        .filter(
+            models.WordEnrichmentJob.status == "queued",
+            models.WordEnrichmentJob.next_attempt_at <= now,
+        )
+        .order_by(models.WordEnrichmentJob.priority.desc(), models.WordEnrichmentJob.created_at.asc())
+        .limit(limit * 2)
+        .all()
+    )
+    claimed_ids = []
+    for (job_id,) in candidates:
+        if len(claimed_ids) >= limit:
+            break
+        # Conditional update so two workers never pick up the same job.
+        claimed = (
+            db.query(models.WordEnrichmentJob)
+            .filter(models.WordEnrichmentJob.id == job_id, models.WordEnrichmentJob.status == "queued")
+            .update(
+                {
+                    models.WordEnrichmentJob.status: "running",
+                    models.WordEnrichmentJob.attempts: models.WordEnrichmentJob.attempts + 1,
+                    models.WordEnrichmentJob.claimed_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        if claimed:
+            claimed_ids.append(job_id)
+    db.commit()
+    if not claimed_ids:
+        return []
+    return db.query(models.WordEnrichmentJob).filter(models.WordEnrichmentJob.id.in_(claimed_ids)).all()
+
+
+def _mark_failed(job: models.WordEnrichmentJob, error: Exception) -> None:
+    job.last_error = str(error)[:2000]
+    if isinstance(error, word_service.UPSTREAM_UNAVAILABLE):
+        # Breaker open, budget spent or image quota used up: not the word's fault, so it does not use up an attempt
+        job.attempts = max(0, (job.attempts or 1) - 1)
+        job.status = "queued"
+        delay = max(getattr(error, "retry_in", 0) or 0, ENRICHMENT_RETRY_BASE_SECONDS)
+        job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        return
+    if (job.attempts or 0) >= ENRICHMENT_MAX_ATTEMPTS:
+        job.status = "failed"
+    else:
+        delay = ENRICHMENT_RETRY_BASE_SECONDS * (2 ** max(0, (job.attempts or 1) - 1))
+        job.status = "queued"
+        job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+    print(f"Enrichment failed for {job.word} ({job.vc_id}): {error}")
+
+
+def process_jobs(db: Session, jobs: List[models.WordEnrichmentJob]) -> None:
+    """Enrich a claimed batch; upstream fetches for the batch run concurrently."""
+    dict_db = DictionarySessionLocal()
+    try:
+        with deadline.budget(ENRICHMENT_BATCH_BUDGET_SECONDS):
+            _results, errors = word_service.ensure_word_ext_many(
+                dict_db=dict_db,
+                items=[(job.vc_id, job.word) for job in jobs],
+                priorities={job.vc_id: job.priority or 0 for job in jobs},
+            )
+        for job in jobs:
+            if job.vc_id in errors:
+                _mark_failed(job, errors[job.vc_id])
+            else:
+                job.status = "done"
+                job.last_error = None
+    except Exception as e:
+        dict_db.rollback()
+        for job in jobs:
+            _mark_failed(job, e)
+    finally:
+        dict_db.close()
+    for job in jobs:
+        db.add(job)
+    db.commit()
+
+
+def run_once(session_factory=SessionLocal, batch_size: int = ENRICHMENT_BATCH_SIZE) -> bool:
+    """Claim and process one batch of jobs. Returns False when the queue is idle."""
+    with session_factory() as db:
+        jobs = _claim_jobs(db, max(1, batch_size))
+        if not jobs:
+            return False
+        process_jobs(db, jobs)
+        return True
+
+
+def recover_stale_jobs(session_factory=SessionLocal, stale_seconds: int = ENRICHMENT_STALE_SECONDS) -> int:
+    """
+    Jobs left 'running' by a crashed or restarted process go back on the queue.
+    Only jobs claimed more than `stale_seconds` ago: other API processes may still be running the rest.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    with session_factory() as db:
+        count = (
+            db.query(models.WordEnrichmentJob)
+            .filter(
+                models.WordEnrichmentJob.status == "running",
+                (models.WordEnrichmentJob.claimed_at < cutoff) | models.WordEnrichmentJob.claimed_at.is_(None),
+            )
+            .update({models.WordEnrichmentJob.status: "queued"}, synchronize_session=False)
+        )
+        db.commit()
+        return count
+
+
+class EnrichmentWorker:
+    def __init__(self, worker_count: int = ENRICHMENT_WORKERS, poll_seconds: float = ENRICHMENT_POLL_SECONDS):
+        self.worker_count = max(1, worker_count)
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._recovery_lock = threading.Lock()
+        self._next_recovery = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._recover()
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"enrichment-worker-{i}", daemon=True)
+            for i in range(self.worker_count)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def _recover(self) -> None:
+        # Jobs of a process that died are not stale yet when a replacement starts right away,
+        # so the sweep repeats while the workers run.
+        with self._recovery_lock:
+            if time.monotonic() < self._next_recovery:
+                return
+            self._next_recovery = time.monotonic() + ENRICHMENT_STALE_SECONDS / 2
+        try:
+            recover_stale_jobs()
+        except Exception as e:
+            print(f"Could not recover stale enrichment jobs: {e}")
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                busy = run_once()
+            except Exception as e:
+                print(f"Enrichment worker error: {e}")
+                busy = False
+            if not busy:
+                self._recover()
+                self._stop.wait(self.poll_seconds)
+
+
+_worker = EnrichmentWorker()
+
+
+def start_worker() -> None:
+    if ENRICHMENT_ENABLED:
+        _worker.start()
+
+
+def stop_worker() -> None:
+    _worker.stop()
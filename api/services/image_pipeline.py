@@ -0,0 +1,258 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text, bindparam
+
+from . import upstream
+
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", 2))
+IMAGE_PROCESS_TIMEOUT = float(os.getenv("IMAGE_PROCESS_TIMEOUT", 30))
+IMAGE_MAX_DOWNLOAD_BYTES = int(os.getenv("IMAGE_MAX_DOWNLOAD_BYTES", 8 * 1024 * 1024))
+# Refuse to decode anything bigger (decompression bombs); SiliconFlow returns 1024x1024
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+IMAGE_FLASHCARD_SIZE = int(os.getenv("IMAGE_FLASHCARD_SIZE", 480))
+IMAGE_THUMB_SIZE = int(os.getenv("IMAGE_THUMB_SIZE", 160))
+
+# (name, square edge in px, Pillow format). The flashcard JPEG is what word_ext.image_url points at.
+RENDITIONS = (
+    ("flashcard", IMAGE_FLASHCARD_SIZE, "JPEG"),
+    ("flashcard_webp", IMAGE_FLASHCARD_SIZE, "WEBP"),
+    ("thumb", IMAGE_THUMB_SIZE, "JPEG"),
+    ("thumb_webp", IMAGE_THUMB_SIZE, "WEBP"),
+)
+PRIMARY_RENDITION = "flashcard"
+
+_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+
+_CREATE_TABLE = text(
+    """
+    CREATE TABLE IF NOT EXISTS word_image_renditions (
+        vc_id VARCHAR(32) NOT NULL,
+        name VARCHAR(32) NOT NULL,
+        url VARCHAR(500) NOT NULL,
+        format VARCHAR(8) NOT NULL,
+        width INT NOT NULL,
+        height INT NOT NULL,
+        bytes INT NOT NULL,
+        content_hash CHAR(40) NOT NULL,
+        created_at DATETIME NOT NULL,
+        PRIMARY KEY (vc_id, name)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """
+)
+
+_table_ready = False
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def ensure_table(dict_db) -> bool:
+    global _table_ready
+    if _table_ready:
+        return True
+    try:
+        dict_db.execute(_CREATE_TABLE)
+        dict_db.commit()
+        _table_ready = True
+    except Exception as e:
+        dict_db.rollback()
+        print(f"Image renditions table unavailable: {e}")
+    return _table_ready
+
+
+def download_image(url: str, max_bytes: int = IMAGE_MAX_DOWNLOAD_BYTES) -> bytes:
+    """Stream an image through the pooled 'image' upstream, giving up past `max_bytes`."""
+    resp = upstream.get("image", url, stream=True)
+    try:
+        if resp.status_code >= 400:
+            return b""
+        length = resp.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ImageTooLarge(f"image is {length} bytes, limit {max_bytes}")
+        buf = bytearray()
+        for chunk in resp.iter_content(64 * 1024):
+            buf.extend(chunk)
+            if len(buf) > max_bytes:
+                raise ImageTooLarge(f"image exceeds {max_bytes} bytes")
+        return bytes(buf)
+    finally:
+        resp.close()
+
+
+def render_renditions(data: bytes, target_dir: str, url_prefix: str, basename: str) -> List[dict]:
+    """
+    Decode once, centre-crop to a square and write every rendition as
+    `{basename}-{sha1[:12]}-{size}.{ext}`. Runs in a worker process; returns rendition metadata.
+    """
+    from PIL import Image, ImageOps
+
+    content_hash = hashlib.sha1(data).hexdigest()
+    largest = max(size for _, size, _ in RENDITIONS)
+
+    with Image.open(BytesIO(data)) as src:
+        if src.width * src.height > IMAGE_MAX_PIXELS:
+            raise ImageTooLarge(f"image is {src.width}x{src.height}")
+        # JPEG only: let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full size
+        src.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(src).convert("RGB")
+
+    side = min(img.size)
+    left = (img.width - side) // 2
+    top = (img.height - side) // 2
+    img = img.crop((left, top, left + side, top + side))
+    # Cheap integer box downscale first, so the LANCZOS pass works on at most ~2x the target
+    factor = side // (largest * 2)
+    if factor >= 2:
+        img = img.reduce(factor)
+
+    target = Path(target_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    resized: Dict[int, object] = {}
+    renditions = []
+    for name, size, fmt in RENDITIONS:
+        if size not in resized:
+            resized[size] = img if img.width <= size else img.resize((size, size), Image.LANCZOS)
+        out = resized[size]
+        buf = BytesIO()
+        if fmt == "JPEG":
+            out.save(buf, format=fmt, quality=85, optimize=True, progressive=True)
+        else:
+            out.save(buf, format=fmt, quality=80, method=4)
+        filename = f"{basename}-{content_hash[:12]}-{out.width}.{_EXTENSIONS[fmt]}"
+        path = target / filename
+        # Content-hashed names never change meaning, so an existing file is already correct
+        if not path.exists():
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(buf.getvalue())
+            tmp.replace(path)
+        renditions.append(
+            {
+                "name": name,
+                "url": f"{url_prefix}/{filename}",
+                "format": _EXTENSIONS[fmt],
+                "width": out.width,
+                "height": out.height,
+                "bytes": buf.tell(),
+                "content_hash": content_hash,
+            }
+        )
+    return renditions
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs uvicorn and worker threads is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, IMAGE_PROCESS_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def process_image(data: bytes, target_dir: Path, url_prefix: str, basename: str) -> List[dict]:
+    """Render renditions in the process pool, so decoding never holds the GIL of an API worker."""
+    global _pool
+    args = (data, str(target_dir), url_prefix, basename)
+    if IMAGE_PROCESS_WORKERS <= 0:
+        return render_renditions(*args)
+    try:
+        return _get_pool().submit(render_renditions, *args).result(timeout=IMAGE_PROCESS_TIMEOUT)
+    except BrokenProcessPool:
+        with _pool_lock:
+            _pool = None
+        return render_renditions(*args)
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def primary_url(renditions: List[dict]) -> str:
+    for r in renditions:
+        if r["name"] == PRIMARY_RENDITION:
+            return r["url"]
+    return renditions[0]["url"] if renditions else ""
+
+
+def record_renditions(dict_db, vc_id: str, renditions: List[dict]) -> None:
+    """Replace the recorded renditions of a word. Does not commit."""
+    if not _table_ready:
+        return
+    dict_db.execute(text("DELETE FROM word_image_renditions WHERE vc_id = :vc_id"), {"vc_id": vc_id})
+    if not renditions:
+        return
+    now = datetime.utcnow()
+    dict_db.execute(
+        text(
+            """
+            INSERT INTO word_image_renditions (vc_id, name, url, format, width, height, bytes, content_hash, created_at)
+            VALUES (:vc_id, :name, :url, :format, :width, :height, :bytes, :content_hash, :created_at)
+            """
+        ),
+        [{"vc_id": vc_id, "created_at": now, **r} for r in renditions],
+    )
+
+
+def load_renditions(dict_db, vc_ids: Iterable[str]) -> Dict[str, List[dict]]:
+    ids = list(dict.fromkeys(v for v in vc_ids if v))
+    if not ids or not ensure_table(dict_db):
+        return {}
+    rows = dict_db.execute(
+        text(
+            """
+            SELECT vc_id, name, url, format, width, bytes
+            FROM word_image_renditions
+            WHERE vc_id IN :vc_ids
+            """
+        ).bindparams(bindparam("vc_ids", expanding=True)),
+        {"vc_ids": ids},
+    ).mappings().all()
+    result: Dict[str, List[dict]] = {}
+    for r in rows:
+        item = dict(r)
+        result.setdefault(item.pop("vc_id"), []).append(item)
+    return result
+
+
+def pick_rendition(renditions: Optional[List[dict]], width: Optional[int], accept_webp: bool) -> Optional[dict]:
+    """Smallest rendition at least `width` px wide (the largest if none is), WebP when accepted."""
+    if not renditions:
+        return None
+    candidates = [r for r in renditions if accept_webp or r["format"] != "webp"] or list(renditions)
+    if not width:
+        width = max(r["width"] for r in candidates)
+    fitting = [r for r in candidates if r["width"] >= width]
+    if fitting:
+        return min(fitting, key=lambda r: (r["width"], r["bytes"]))
+    return max(candidates, key=lambda r: (r["width"], -r["bytes"]))
+
+
+def image_url_for(payload: dict, width: Optional[int] = None, accept_webp: bool = False) -> Optional[str]:
+    """URL of the best rendition for a dictionary entry, falling back to word_ext.image_url."""
+    renditions = payload.get("image_renditions")
+    # Renditions of an image the admin has since replaced by URL are ignored
+    if (width or accept_webp) and renditions and any(r["url"] == payload.get("image_url") for r in renditions):
+        best = pick_rendition(renditions, width, accept_webp)
+        if best:
+            return best["url"]
+    return payload.get("image_url") or None
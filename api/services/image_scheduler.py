@@ -0,0 +1,221 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from . import deadline, redis_client
+
+# SiliconFlow image quota: sustained rate and burst, shared by every API worker through Redis
+SILICONFLOW_IMAGES_PER_MINUTE = float(os.getenv("SILICONFLOW_IMAGES_PER_MINUTE", 20))
+SILICONFLOW_BURST = float(os.getenv("SILICONFLOW_BURST", 5))
+# Tokens only high-priority (today's deck) generations may spend, so backfill never starves them
+SILICONFLOW_PRIORITY_RESERVE = float(os.getenv("SILICONFLOW_PRIORITY_RESERVE", 2))
+# How long a caller may block for a token before the job is deferred instead
+SILICONFLOW_MAX_WAIT_SECONDS = float(os.getenv("SILICONFLOW_MAX_WAIT_SECONDS", 10))
+SILICONFLOW_BACKOFF_BASE_SECONDS = float(os.getenv("SILICONFLOW_BACKOFF_BASE_SECONDS", 15))
+SILICONFLOW_BACKOFF_MAX_SECONDS = float(os.getenv("SILICONFLOW_BACKOFF_MAX_SECONDS", 600))
+
+# Same value as enrichment_queue.PRIORITY_DECK
+HIGH_PRIORITY = 10
+
+_BUCKET_KEY = redis_client.redis_key("siliconflow", "bucket")
+_PAUSE_KEY = redis_client.redis_key("siliconflow", "pause_until")
+_STRIKES_KEY = redis_client.redis_key("siliconflow", "strikes")
+
+# Refill, then take one token if that leaves at least `floor` behind. Returns the seconds to
+# wait ("0" when a token was taken) as a string so Lua does not truncate it to an integer.
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local floor = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local pause_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+if pause_until > now then
+    return tostring(pause_until - now)
+end
+local wait = 0
+if tokens - 1 >= floor then
+    tokens = tokens - 1
+else
+    wait = (floor + 1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', math.max(now, ts))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+
+class ImageRateLimited(Exception):
+    """No SiliconFlow quota right now; the generation should be retried after `retry_in` seconds."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"SiliconFlow image quota exhausted, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class ImageScheduler:
+    """
+    Token bucket in front of SiliconFlow image generation. With Redis the bucket, the 429
+    pause and the backoff strike count are shared by all workers; without it each process
+    keeps its own. Low-priority callers leave `reserve` tokens for deck words, and inside a
+    process they also step aside while a high-priority caller is waiting.
+    """
+
+    def __init__(
+        self,
+        per_minute: float = SILICONFLOW_IMAGES_PER_MINUTE,
+        burst: float = SILICONFLOW_BURST,
+        reserve: float = SILICONFLOW_PRIORITY_RESERVE,
+    ):
+        self.rate = max(per_minute, 0.1) / 60.0
+        self.capacity = max(1.0, burst)
+        self.reserve = min(max(0.0, reserve), self.capacity - 1)
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._ts = time.time()
+        self._pause_until = 0.0
+        self._strikes = 0
+        self._high_waiting = 0
+        self._script = None
+        self.granted = 0
+        self.deferred = 0
+        self.rate_limited = 0
+
+    def _take_local(self, floor: float, now: float) -> float:
+        with self._lock:
+            if self._pause_until > now:
+                return self._pause_until - now
+            self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._ts) * self.rate)
+            self._ts = max(now, self._ts)
+            if self._tokens - 1 >= floor:
+                self._tokens -= 1
+                return 0.0
+            return (floor + 1 - self._tokens) / self.rate
+
+    def _take(self, floor: float) -> float:
+        now = time.time()
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                if self._script is None:
+                    self._script = r.register_script(_TAKE_SCRIPT)
+                return float(self._script(keys=[_BUCKET_KEY, _PAUSE_KEY], args=[self.rate, self.capacity, now, floor]))
+            except Exception as e:
+                print(f"Image scheduler Redis error: {e}")
+                self._script = None
+                redis_client.mark_failed()
+        return self._take_local(floor, now)
+
+    def acquire(self, priority: int = 0, max_wait: Optional[float] = None) -> None:
+        """Block until a generation may be sent, or raise ImageRateLimited if that takes too long."""
+        high = priority >= HIGH_PRIORITY
+        max_wait = SILICONFLOW_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        left = deadline.remaining()
+        if left is not None:
+            max_wait = min(max_wait, max(0.0, left))
+        give_up_at = time.monotonic() + max_wait
+
+        if high:
+            with self._lock:
+                self._high_waiting += 1
+        try:
+            while True:
+                wait = None
+                if not high:
+                    with self._lock:
+                        if self._high_waiting:
+                            wait = 0.2
+                if wait is None:
+                    wait = self._take(0.0 if high else self.reserve)
+                    if wait <= 0:
+                        with self._lock:
+                            self.granted += 1
+                        return
+                if time.monotonic() + wait > give_up_at:
+                    with self._lock:
+                        self.deferred += 1
+                    raise ImageRateLimited(wait)
+                time.sleep(min(wait, 1.0))
+        finally:
+            if high:
+                with self._lock:
+                    self._high_waiting -= 1
+
+    def _backoff(self, strikes: int) -> float:
+        return min(SILICONFLOW_BACKOFF_MAX_SECONDS, SILICONFLOW_BACKOFF_BASE_SECONDS * (2 ** max(0, strikes - 1)))
+
+    def report_rate_limited(self) -> float:
+        """SiliconFlow answered 429: pause everyone with exponential backoff. Returns the pause."""
+        now = time.time()
+        with self._lock:
+            self.rate_limited += 1
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                strikes = int(r.incr(_STRIKES_KEY))
+                r.expire(_STRIKES_KEY, int(SILICONFLOW_BACKOFF_MAX_SECONDS * 2))
+                pause = self._backoff(strikes)
+                pipe = r.pipeline()
+                pipe.set(_PAUSE_KEY, now + pause, ex=int(pause) + 1)
+                # Empty the bucket so traffic ramps up again after the pause instead of bursting
+                pipe.hset(_BUCKET_KEY, mapping={"tokens": 0, "ts": now + pause})
+                pipe.execute()
+                print(f"SiliconFlow rate limited, pausing image generation for {pause:.0f}s")
+                return pause
+            except Exception as e:
+                print(f"Image scheduler Redis error: {e}")
+                redis_client.mark_failed()
+        with self._lock:
+            self._strikes += 1
+            pause = self._backoff(self._strikes)
+            self._pause_until = max(self._pause_until, now + pause)
+            self._tokens = 0.0
+            self._ts = now + pause
+        print(f"SiliconFlow rate limited, pausing image generation for {pause:.0f}s")
+        return pause
+
+    def report_success(self) -> None:
+        with self._lock:
+            self._strikes = 0
+        r = redis_client.get_redis()
+        if r is None:
+            return
+        try:
+            r.delete(_STRIKES_KEY)
+        except Exception:
+            redis_client.mark_failed()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_minute": self.rate * 60,
+                "burst": self.capacity,
+                "priority_reserve": self.reserve,
+                "granted": self.granted,
+                "deferred": self.deferred,
+                "rate_limited": self.rate_limited,
+                "shared": redis_client.get_redis() is not None,
+            }
+
+
+scheduler = ImageScheduler()
+
+
+def acquire(priority: int = 0, max_wait: Optional[float] = None) -> None:
+    scheduler.acquire(priority, max_wait)
+
+
+def report_rate_limited() -> float:
+    return scheduler.report_rate_limited()
+
+
+def report_success() -> None:
+    scheduler.report_success()
+
+
+def stats() -> dict:
+    return scheduler.snapshot()
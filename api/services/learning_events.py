@@ -0,0 +1,199 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from . import activity_rollup, media_progress, media_rollup, spaced_repetition, time_ranges
+
+LEARNING_EVENT_BATCH_MAX = int(os.getenv("LEARNING_EVENT_BATCH_MAX", 500))
+# Offline queues are flushed late, but not this late; older events are rejected
+LEARNING_EVENT_MAX_AGE_DAYS = int(os.getenv("LEARNING_EVENT_MAX_AGE_DAYS", 30))
+# Client clocks run ahead; timestamps further in the future than this are clamped to now
+LEARNING_EVENT_CLOCK_SKEW_SECONDS = int(os.getenv("LEARNING_EVENT_CLOCK_SKEW_SECONDS", 300))
+
+RESULTS = ("remembered", "forgot")
+MODULES = ("video", "audio")
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+def _as_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=time_ranges.local_tz)
+    return moment.astimezone(timezone.utc)
+
+
+def _clamp(moment: datetime, now: datetime) -> datetime:
+    return min(_as_utc(moment), now + timedelta(seconds=LEARNING_EVENT_CLOCK_SKEW_SECONDS))
+
+
+def _seen_event_ids(db: Session, child_id: str, event_ids: List[str]) -> Set[str]:
+    if not event_ids:
+        return set()
+    rows = (
+        db.query(models.LearningEventReceipt.event_id)
+        .filter(models.LearningEventReceipt.child_id == child_id, models.LearningEventReceipt.event_id.in_(event_ids))
+        .all()
+    )
+    return {r[0] for r in rows}
+
+
+def _ingest(db: Session, child: models.Child, batch: schemas.LearningEventBatch) -> schemas.LearningEventBatchResult:
+    now = datetime.now(timezone.utc)
+    oldest = now - timedelta(days=LEARNING_EVENT_MAX_AGE_DAYS)
+    rejected: List[schemas.RejectedEvent] = []
+    duplicates = 0
+
+    seen = _seen_event_ids(
+        db, child.id, [e.event_id for e in batch.word_results] + [e.event_id for e in batch.media_sessions]
+    )
+
+    # Ownership is checked once per batch: one query for words, one for the active media plan
+    word_ids = {e.word_id for e in batch.word_results}
+    owned_words: Set[str] = set()
+    if word_ids:
+        owned_words = {
+            r[0]
+            for r in db.query(models.Word.id)
+            .filter(models.Word.id.in_(word_ids), models.Word.parent_id == child.parent_id)
+            .all()
+        }
+    resource_ids = {e.resource_id for e in batch.media_sessions}
+    planned: Set[Tuple[str, str]] = set()
+    if resource_ids:
+        planned = {
+            (r.resource_id, r.module)
+            for r in db.query(models.ChildMediaPlanItem.resource_id, models.ChildMediaPlanItem.module)
+            .filter(
+                models.ChildMediaPlanItem.child_id == child.id,
+                models.ChildMediaPlanItem.resource_id.in_(resource_ids),
+                models.ChildMediaPlanItem.is_enabled.is_(True),
+                models.ChildMediaPlanItem.is_deleted.is_(False),
+            )
+            .all()
+        }
+
+    receipts: List[dict] = []
+    record_rows: List[dict] = []
+    mastery_results: List[Tuple[str, str, datetime]] = []
+    session_rows: List[dict] = []
+    day_totals: Dict[date, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    batch_ids: Set[str] = set()
+
+    def accept(event_id: str, kind: str) -> bool:
+        nonlocal duplicates
+        if event_id in seen or event_id in batch_ids:
+            duplicates += 1
+            return False
+        batch_ids.add(event_id)
+        receipts.append({"id": models.generate_uuid(), "child_id": child.id, "event_id": event_id, "kind": kind})
+        return True
+
+    for e in batch.word_results:
+        occurred = _clamp(e.occurred_at, now)
+        if e.result not in RESULTS:
+            rejected.append(schemas.RejectedEvent(event_id=e.event_id, reason="invalid result"))
+        elif e.word_id not in owned_words:
+            rejected.append(schemas.RejectedEvent(event_id=e.event_id, reason="word not found"))
+        elif occurred < oldest:
+            rejected.append(schemas.RejectedEvent(event_id=e.event_id, reason="event too old"))
+        elif accept(e.event_id, "word_result"):
+            stored_at = time_ranges.to_db(occurred)
+            time_spent = max(0.0, float(e.time_spent or 0))
+            record_rows.append(
+                {
+                    "id": models.generate_uuid(),
+                    "child_id": child.id,
+                    "word_id": e.word_id,
+                    "result": e.result,
+                    "time_spent": time_spent,
+                    "created_at": stored_at,
+                }
+            )
+            # word_mastery keeps naive UTC like the rest of the scheduler
+            mastery_results.append((e.word_id, e.result, occurred.replace(tzinfo=None)))
+            totals = day_totals[time_ranges.local_date(stored_at)]
+            totals["words_total"] += 1
+            totals["words_remembered"] += 1 if e.result == "remembered" else 0
+            totals["word_seconds"] += time_spent
+
+    progress_by_module: Dict[str, models.ChildMediaProgress] = {}
+    for e in batch.media_sessions:
+        started = _clamp(e.started_at, now)
+        if e.module not in MODULES:
+            rejected.append(schemas.RejectedEvent(event_id=e.event_id, reason="invalid module"))
+        elif (e.resource_id, e.module) not in planned:
+            rejected.append(schemas.RejectedEvent(event_id=e.event_id, reason="resource not in active plan"))
+        elif started < oldest:
+            rejected.append(schemas.RejectedEvent(event_id=e.event_id, reason="event too old"))
+        elif accept(e.event_id, "media_session"):
+            duration_seconds = max(0, int(e.duration_seconds))
+            completion_percent = float(max(0, min(100, e.completion_percent)))
+            completed_count = max(0, int(e.completed_count or 0))
+            progress = progress_by_module.get(e.module)
+            if progress is None:
+                progress = media_progress.get_or_create(db, child_id=child.id, module=e.module)
+                progress_by_module[e.module] = progress
+            stored_at = time_ranges.to_db(started)
+            session_rows.append(
+                {
+                    "id": models.generate_uuid(),
+                    "child_id": child.id,
+                    "module": e.module,
+                    "resource_id": e.resource_id,
+                    "started_at": stored_at,
+                    "ended_at": time_ranges.to_db(started + timedelta(seconds=duration_seconds)),
+                    "duration_seconds": duration_seconds,
+                    "completion_percent": completion_percent,
+                    "completed_count": completed_count,
+                    "difficulty_level_at_time": progress.current_difficulty_level,
+                }
+            )
+            media_progress.apply_session(
+                db,
+                progress,
+                child,
+                duration_seconds=duration_seconds,
+                completion_percent=completion_percent,
+                completed_count=completed_count,
+            )
+            totals = day_totals[time_ranges.local_date(stored_at)]
+            totals[f"{e.module}_sessions"] += 1
+            totals[f"{e.module}_seconds"] += duration_seconds
+
+    # One multi-row INSERT per table (PyMySQL rewrites executemany into a single statement)
+    if receipts:
+        db.execute(insert(models.LearningEventReceipt), receipts)
+    if record_rows:
+        db.execute(insert(models.LearningRecord), record_rows)
+    if session_rows:
+        db.execute(insert(models.MediaLearningSession), session_rows)
+    spaced_repetition.record_results(db, child.id, mastery_results)
+    for day, totals in day_totals.items():
+        activity_rollup.add_to_day(db, child.id, day, {k: v if k == "word_seconds" else int(v) for k, v in totals.items()})
+    media_rollup.add_sessions(db, child.id, session_rows)
+
+    return schemas.LearningEventBatchResult(accepted=len(receipts), duplicates=duplicates, rejected=rejected)
+
+
+def ingest(db: Session, child: models.Child, batch: schemas.LearningEventBatch) -> schemas.LearningEventBatchResult:
+    """Store a batch of offline-queued events in one transaction. Replayed event_ids are skipped."""
+    if len(batch.word_results) + len(batch.media_sessions) > LEARNING_EVENT_BATCH_MAX:
+        raise BatchTooLarge(f"At most {LEARNING_EVENT_BATCH_MAX} events per batch")
+    try:
+        result = _ingest(db, child, batch)
+        db.commit()
+        return result
+    except IntegrityError:
+        # The same batch was retried concurrently; the other request stored the receipts first
+        db.rollback()
+        result = _ingest(db, child, batch)
+        db.commit()
+        return result
@@ -0,0 +1,57 @@
+from typing import Dict, Iterable, List
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import dictionary_cache
+
+
+def resolve_word_texts(db: Session, dict_db: Session, word_ids: Iterable[str]) -> Dict[str, str]:
+    """
+    word_id -> word text in a fixed number of queries: one for the library rows, one dictionary
+    lookup by dict_vc_id (often served from the entry cache), and one for legacy words that
+    still point at the old dictionaries table.
+    """
+    ids = list(dict.fromkeys(i for i in word_ids if i))
+    if not ids:
+        return {}
+    words = db.query(models.Word.id, models.Word.dict_vc_id, models.Word.dictionary_id).filter(models.Word.id.in_(ids)).all()
+
+    entries = dictionary_cache.get_entries(dict_db, [w.dict_vc_id for w in words if w.dict_vc_id])
+    legacy_ids = [w.dictionary_id for w in words if w.dictionary_id and (w.dict_vc_id or "") not in entries]
+    legacy: Dict[str, str] = {}
+    if legacy_ids:
+        legacy = dict(
+            db.query(models.Dictionary.id, models.Dictionary.word).filter(models.Dictionary.id.in_(legacy_ids)).all()
+        )
+
+    texts: Dict[str, str] = {}
+    for w in words:
+        entry = entries.get(w.dict_vc_id) if w.dict_vc_id else None
+        text = (entry or {}).get("vc_vocabulary") or legacy.get(w.dictionary_id)
+        if text:
+            texts[w.id] = text
+    return texts
+
+
+def resolve_media_titles(db: Session, resource_ids: Iterable[str]) -> Dict[str, str]:
+    ids = list(dict.fromkeys(i for i in resource_ids if i))
+    if not ids:
+        return {}
+    return dict(
+        db.query(models.MediaResource.id, models.MediaResource.filename).filter(models.MediaResource.id.in_(ids)).all()
+    )
+
+
+def session_details(sessions: List[models.MediaLearningSession], titles: Dict[str, str], module: str, fallback: str) -> List[dict]:
+    return [
+        {
+            "resource_title": titles.get(s.resource_id) or fallback,
+            "module": module,
+            "duration_seconds": s.duration_seconds,
+            "completion_percent": s.completion_percent,
+            "started_at": s.started_at,
+        }
+        for s in sessions
+        if s.module == module
+    ]
@@ -0,0 +1,72 @@
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+
+# A session counts towards an automatic difficulty upgrade at this completion or above
+ELIGIBLE_COMPLETION_PERCENT = 80
+UPGRADE_AFTER_ELIGIBLE = 10
+MAX_DIFFICULTY_LEVEL = 4
+
+_progress = models.ChildMediaProgress
+
+
+def get_or_create(db: Session, *, child_id: str, module: str) -> models.ChildMediaProgress:
+    query = db.query(_progress).filter(_progress.child_id == child_id, _progress.module == module)
+    progress = query.first()
+    if progress:
+        return progress
+
+    progress = _progress(child_id=child_id, module=module, current_difficulty_level=1, stats={})
+    try:
+        with db.begin_nested():
+            db.add(progress)
+    except IntegrityError:
+        # A concurrent request created it first (unique on child_id, module)
+        return query.one()
+    return progress
+
+
+def apply_session(
+    db: Session,
+    progress: models.ChildMediaProgress,
+    child: models.Child,
+    *,
+    duration_seconds: int,
+    completion_percent: float,
+    completed_count: int,
+) -> None:
+    """
+    Add one finished session to the progress totals and upgrade difficulty when earned. Does not commit.
+    Both statements change the row in place, so parallel finishes cannot overwrite each other: the first
+    holds the row lock until commit, and the upgrade's WHERE re-checks the rule against current values.
+    """
+    eligible = completion_percent >= ELIGIBLE_COMPLETION_PERCENT and completed_count > 0
+    db.execute(
+        update(_progress)
+        .where(_progress.id == progress.id)
+        .values(
+            total_seconds=_progress.total_seconds + duration_seconds,
+            total_completed_count=_progress.total_completed_count + completed_count,
+            total_session_count=_progress.total_session_count + 1,
+            completion_percent_sum=_progress.completion_percent_sum + completion_percent,
+            eligible_completion_count=_progress.eligible_completion_count + (1 if eligible else 0),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    settings = child.settings or {}
+    if bool(settings.get("auto_upgrade_media_difficulty", True)):
+        db.execute(
+            update(_progress)
+            .where(
+                _progress.id == progress.id,
+                _progress.eligible_completion_count >= UPGRADE_AFTER_ELIGIBLE,
+                _progress.current_difficulty_level < MAX_DIFFICULTY_LEVEL,
+            )
+            .values(current_difficulty_level=_progress.current_difficulty_level + 1, eligible_completion_count=0)
+            .execution_options(synchronize_session=False)
+        )
+    # Reload the counters on next access instead of trusting the stale in-memory values
+    db.expire(progress)
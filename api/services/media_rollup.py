@@ -0,0 +1,198 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import time_ranges
+
+_rollup = models.MediaDailyRollup
+
+
+def _add(
+    db: Session,
+    key: dict,
+    deltas: Dict[str, float],
+    first: Optional[Tuple[datetime, Optional[int]]] = None,
+) -> None:
+    """Add `deltas` to one rollup row in a single UPDATE, creating the row if needed. Does not commit."""
+    values = [(getattr(_rollup, k), getattr(_rollup, k) + v) for k, v in deltas.items()]
+    if first is not None:
+        started_at, level = first
+        earlier = or_(_rollup.first_started_at.is_(None), _rollup.first_started_at > started_at)
+        # MySQL applies SET left to right, so the level must be decided before first_started_at changes
+        values.append((_rollup.first_difficulty_level, case((earlier, level), else_=_rollup.first_difficulty_level)))
+        values.append((_rollup.first_started_at, case((earlier, started_at), else_=_rollup.first_started_at)))
+    where = and_(*[getattr(_rollup, k) == v for k, v in key.items()])
+    stmt = update(_rollup).where(where).ordered_values(*values).execution_options(synchronize_session=False)
+    if db.execute(stmt).rowcount:
+        return
+    row = {"session_count": 0, "total_seconds": 0, "completed_count": 0, "completion_percent_sum": 0.0, **deltas}
+    if first is not None:
+        row["first_started_at"], row["first_difficulty_level"] = first
+    try:
+        with db.begin_nested():
+            db.add(_rollup(**key, **row))
+    except IntegrityError:
+        # A concurrent write created the row first
+        db.execute(stmt)
+
+
+def _key(session: models.MediaLearningSession, started_at: datetime) -> dict:
+    return {
+        "child_id": session.child_id,
+        "module": session.module,
+        "activity_date": time_ranges.local_date(started_at),
+        "resource_id": session.resource_id,
+    }
+
+
+def session_started(db: Session, session: models.MediaLearningSession, started_at: Optional[datetime] = None) -> None:
+    """Count a new session. `started_at` (stored-timestamp terms) defaults to now; the row default is not loaded yet."""
+    started_at = started_at or session.started_at or time_ranges.db_now()
+    _add(db, _key(session, started_at), {"session_count": 1}, first=(started_at, session.difficulty_level_at_time))
+
+
+def session_finished(
+    db: Session,
+    session: models.MediaLearningSession,
+    *,
+    delta_seconds: int,
+    delta_completed: int,
+    delta_completion: float,
+) -> None:
+    """Add the change in a session's totals (a finish may be sent again) to the day it started on."""
+    if not (delta_seconds or delta_completed or delta_completion):
+        return
+    started_at = session.started_at or time_ranges.db_now()
+    _add(
+        db,
+        _key(session, started_at),
+        {"total_seconds": delta_seconds, "completed_count": delta_completed, "completion_percent_sum": delta_completion},
+    )
+
+
+def add_sessions(db: Session, child_id: str, rows: List[dict]) -> None:
+    """Fold finished session rows (media_learning_sessions insert dicts) in, one UPDATE per day and resource."""
+    grouped: Dict[tuple, dict] = {}
+    for r in rows:
+        key = (r["module"], time_ranges.local_date(r["started_at"]), r["resource_id"])
+        g = grouped.setdefault(
+            key, {"session_count": 0, "total_seconds": 0, "completed_count": 0, "completion_percent_sum": 0.0, "first": None}
+        )
+        g["session_count"] += 1
+        g["total_seconds"] += int(r["duration_seconds"] or 0)
+        g["completed_count"] += int(r["completed_count"] or 0)
+        g["completion_percent_sum"] += float(r["completion_percent"] or 0)
+        if g["first"] is None or r["started_at"] < g["first"][0]:
+            g["first"] = (r["started_at"], r["difficulty_level_at_time"])
+    for (module, day, resource_id), g in grouped.items():
+        first = g.pop("first")
+        key = {"child_id": child_id, "module": module, "activity_date": day, "resource_id": resource_id}
+        _add(db, key, g, first=first)
+
+
+def _in_period(child_id: str, module: str, first_day: date, last_day: date):
+    return and_(
+        _rollup.child_id == child_id,
+        _rollup.module == module,
+        _rollup.activity_date >= first_day,
+        _rollup.activity_date <= last_day,
+    )
+
+
+def summary(db: Session, child_id: str, module: str, first_day: date, last_day: date, top: int = 5) -> dict:
+    """Report totals for local days first_day..last_day; reads at most days x resources rollup rows."""
+    period = _in_period(child_id, module, first_day, last_day)
+    sessions, seconds, completed, completion_sum = db.query(
+        func.coalesce(func.sum(_rollup.session_count), 0),
+        func.coalesce(func.sum(_rollup.total_seconds), 0),
+        func.coalesce(func.sum(_rollup.completed_count), 0),
+        func.coalesce(func.sum(_rollup.completion_percent_sum), 0),
+    ).filter(period).one()
+
+    top_rows = (
+        db.query(
+            _rollup.resource_id,
+            func.sum(_rollup.total_seconds).label("total_seconds"),
+            func.sum(_rollup.completed_count).label("completed_count"),
+        )
+        .filter(period)
+        .group_by(_rollup.resource_id)
+        .order_by(func.sum(_rollup.total_seconds).desc())
+        .limit(top)
+        .all()
+    )
+
+    first_level = (
+        db.query(_rollup.first_difficulty_level)
+        .filter(period, _rollup.first_started_at.isnot(None))
+        .order_by(_rollup.first_started_at.asc())
+        .limit(1)
+        .scalar()
+    )
+    return {
+        "session_count": int(sessions),
+        "total_seconds": int(seconds),
+        "total_completed_count": int(completed),
+        "average_completion_percent": float(completion_sum) / int(sessions) if sessions else 0.0,
+        "top": [(r.resource_id, int(r.total_seconds or 0), int(r.completed_count or 0)) for r in top_rows],
+        "first_difficulty_level": first_level,
+    }
+
+
+def days(db: Session, child_id: str, module: str, first_day: date, last_day: date) -> List[tuple]:
+    """(day, seconds, completed, average completion) per active local day, oldest first."""
+    rows = (
+        db.query(
+            _rollup.activity_date,
+            func.sum(_rollup.total_seconds),
+            func.sum(_rollup.completed_count),
+            func.sum(_rollup.completion_percent_sum),
+            func.sum(_rollup.session_count),
+        )
+        .filter(_in_period(child_id, module, first_day, last_day))
+        .group_by(_rollup.activity_date)
+        .order_by(_rollup.activity_date.asc())
+        .all()
+    )
+    return [
+        (day, int(seconds or 0), int(completed or 0), float(completion or 0) / int(sessions) if sessions else 0.0)
+        for day, seconds, completed, completion, sessions in rows
+    ]
+
+
+def rebuild(db: Session, child_id: str) -> int:
+    """Recompute the child's media rollup from media_learning_sessions. Does not commit."""
+    rows: Dict[tuple, dict] = {}
+    sessions = db.query(
+        models.MediaLearningSession.module,
+        models.MediaLearningSession.resource_id,
+        models.MediaLearningSession.started_at,
+        models.MediaLearningSession.duration_seconds,
+        models.MediaLearningSession.completed_count,
+        models.MediaLearningSession.completion_percent,
+        models.MediaLearningSession.difficulty_level_at_time,
+    ).filter(models.MediaLearningSession.child_id == child_id)
+    for module, resource_id, started_at, seconds, completed, completion, level in sessions.yield_per(1000):
+        if started_at is None:
+            continue
+        key = (module, time_ranges.local_date(started_at), resource_id)
+        row = rows.setdefault(
+            key,
+            {"session_count": 0, "total_seconds": 0, "completed_count": 0, "completion_percent_sum": 0.0,
+             "first_started_at": None, "first_difficulty_level": None},
+        )
+        row["session_count"] += 1
+        row["total_seconds"] += int(seconds or 0)
+        row["completed_count"] += int(completed or 0)
+        row["completion_percent_sum"] += float(completion or 0)
+        if row["first_started_at"] is None or started_at < row["first_started_at"]:
+            row["first_started_at"], row["first_difficulty_level"] = started_at, level
+
+    db.query(_rollup).filter(_rollup.child_id == child_id).delete(synchronize_session=False)
+    for (module, day, resource_id), values in rows.items():
+        db.add(_rollup(child_id=child_id, module=module, activity_date=day, resource_id=resource_id, **values))
+    return len(rows)
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import models, security
+from . import redis_client
+
+# Trust the signed user_id/child_id claims and serve principals from memory instead of a query per request
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "1") not in {"0", "false", "False"}
+# How long a cached principal is trusted before it is reloaded. Deletions and password changes
+# (the token's pwv no longer matches) reach every process within this window even without Redis.
+AUTH_PRINCIPAL_TTL = float(os.getenv("AUTH_PRINCIPAL_TTL", 30))
+AUTH_PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", 10000))
+# Revocations outlive every token issued before them
+_REVOCATION_TTL = security.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 60
+
+
+@dataclass(frozen=True)
+class ParentPrincipal:
+    """The authenticated parent, cached between requests. Not attached to any DB session."""
+
+    id: str
+    phone: str
+    username: str
+    avatar_url: Optional[str]
+    password_version: str
+    # First child of the parent, what get_default_child would query for
+    child_id: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ChildPrincipal:
+    id: str
+    parent_id: str
+    password_version: str
+    settings: dict = field(default_factory=dict)
+
+
+def _revoked_key(parent_id: str) -> str:
+    return redis_client.redis_key("auth", "revoked", parent_id)
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float = AUTH_PRINCIPAL_TTL, max_size: int = AUTH_PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._entries: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        # parent_id -> not-before (epoch seconds); used when Redis is not configured
+        self._revoked_local: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def _get(self, key: Tuple[str, str]):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            principal, loaded_at = item
+            if time.monotonic() - loaded_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def _put(self, key: Tuple[str, str], principal) -> None:
+        with self._lock:
+            self.loads += 1
+            self._entries[key] = (principal, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def parent(self, db: Session, parent_id: str) -> Optional[ParentPrincipal]:
+        principal = self._get(("parent", parent_id))
+        if principal is not None:
+            return principal
+        # Parent and its first child in one query
+        row = (
+            db.query(models.Parent, models.Child.id)
+            .outerjoin(models.Child, models.Child.parent_id == models.Parent.id)
+            .filter(models.Parent.id == parent_id)
+            .first()
+        )
+        if row is None:
+            return None
+        parent, child_id = row
+        principal = ParentPrincipal(
+            id=parent.id,
+            phone=parent.phone,
+            username=parent.username,
+            avatar_url=parent.avatar_url,
+            password_version=security.password_version(parent.password_hash),
+            child_id=child_id,
+        )
+        self._put(("parent", parent_id), principal)
+        return principal
+
+    def child(self, db: Session, child_id: str) -> Optional[ChildPrincipal]:
+        principal = self._get(("child", child_id))
+        if principal is not None:
+            return principal
+        row = (
+            db.query(models.Child, models.Parent.password_hash)
+            .join(models.Parent, models.Parent.id == models.Child.parent_id)
+            .filter(models.Child.id == child_id)
+            .first()
+        )
+        if row is None:
+            return None
+        child, password_hash = row
+        principal = ChildPrincipal(
+            id=child.id,
+            parent_id=child.parent_id,
+            password_version=security.password_version(password_hash),
+            settings=dict(child.settings or {}),
+        )
+        self._put(("child", child_id), principal)
+        return principal
+
+    def forget(self, *, parent_id: Optional[str] = None, child_id: Optional[str] = None) -> None:
+        """Drop cached principals in this process after a profile or settings change."""
+        with self._lock:
+            if parent_id:
+                self._entries.pop(("parent", parent_id), None)
+                for key in [k for k, (p, _) in self._entries.items() if k[0] == "child" and p.parent_id == parent_id]:
+                    del self._entries[key]
+            if child_id:
+                self._entries.pop(("child", child_id), None)
+
+    def revoked_before(self, parent_id: str) -> float:
+        """Tokens of this parent issued before the returned epoch second are rejected."""
+        client = redis_client.get_redis()
+        if client is not None:
+            try:
+                value = client.get(_revoked_key(parent_id))
+                return float(value) if value else 0.0
+            except Exception as e:
+                print(f"Token revocation Redis read failed: {e}")
+                redis_client.mark_failed()
+        return self._revoked_local.get(parent_id, 0.0)
+
+    def revoke(self, parent_id: str) -> bool:
+        """
+        Reject every token already issued to the parent and their children (password change, deletion).
+        Returns whether the revocation reached Redis; otherwise only this process enforces it.
+        """
+        # Sub-second, so a token minted earlier in the same second is still rejected
+        now = time.time()
+        self._revoked_local[parent_id] = now
+        self.forget(parent_id=parent_id)
+        client = redis_client.get_redis()
+        if client is None:
+            return False
+        try:
+            client.set(_revoked_key(parent_id), repr(now), ex=_REVOCATION_TTL)
+            return True
+        except Exception as e:
+            print(f"Token revocation Redis write failed: {e}")
+            redis_client.mark_failed()
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.loads
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "loads": self.loads,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+def is_current(payload: dict, parent_id: str, password_version: str) -> bool:
+    """A token stays valid while the password is unchanged and it was issued after any revocation."""
+    if payload.get("pwv") != password_version:
+        return False
+    return float(payload.get("iat") or 0) > principal_cache.revoked_before(parent_id)
@@ -0,0 +1,56 @@
+import os
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 0.5))
+# After a failed connection attempt, wait this long before trying Redis again
+REDIS_RETRY_SECONDS = float(os.getenv("REDIS_RETRY_SECONDS", 30))
+
+_client = None
+_last_failure = 0.0
+
+
+def get_redis():
+    """
+    Shared Redis client, or None when REDIS_URL is not configured or Redis is down.
+    Every Redis-backed feature must keep working (in-process only) when this returns None.
+    """
+    global _client, _last_failure
+    if not REDIS_URL:
+        return None
+    if _client is not None:
+        return _client
+    if _last_failure and time.monotonic() - _last_failure < REDIS_RETRY_SECONDS:
+        return None
+    try:
+        import redis
+
+        client = redis.Redis.from_url(
+            REDIS_URL,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            decode_responses=True,
+        )
+        client.ping()
+        _client = client
+        return _client
+    except Exception as e:
+        print(f"Redis unavailable ({REDIS_URL}): {e}")
+        _last_failure = time.monotonic()
+        return None
+
+
+def mark_failed() -> None:
+    """Drop the shared client after an error so the next call backs off and reconnects."""
+    global _client, _last_failure
+    _client = None
+    _last_failure = time.monotonic()
+
+
+def redis_key(*parts: str) -> str:
+    return ":".join(["davidsmom", *[str(p) for p in parts]])
@@ -0,0 +1,190 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from . import redis_client
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") not in {"0", "false", "False"}
+# Writes invalidate explicitly; the TTL only bounds staleness from a write that raced a miss
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 600))
+# In-process fallback used while Redis is not configured or down
+RESPONSE_CACHE_LOCAL_SIZE = int(os.getenv("RESPONSE_CACHE_LOCAL_SIZE", 2000))
+# Invalidations only reach the local cache of the worker that handled the write, so other
+# workers may serve a stale entry this long; 0 disables local caching
+RESPONSE_CACHE_LOCAL_TTL = int(os.getenv("RESPONSE_CACHE_LOCAL_TTL", 30))
+
+HISTORY = "history"
+MEDIA_SCOPES = {"video": "media:video", "audio": "media:audio"}
+ALL_SCOPES = (HISTORY, *MEDIA_SCOPES.values())
+
+
+def media_scope(module: str) -> str:
+    return MEDIA_SCOPES.get(module, f"media:{module}")
+
+
+def _hash_key(child_id: str, scope: str) -> str:
+    return redis_client.redis_key("resp", child_id, scope)
+
+
+class ResponseCache:
+    """
+    Cached route responses as JSON, one Redis hash per (child, scope) so a write drops every
+    period and route of that scope with one DEL. Without Redis, a bounded in-process LRU whose
+    entries live at most `local_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        ttl: int = RESPONSE_CACHE_TTL,
+        local_size: int = RESPONSE_CACHE_LOCAL_SIZE,
+        local_ttl: int = RESPONSE_CACHE_LOCAL_TTL,
+    ):
+        self.ttl = ttl
+        self.local_size = max(1, local_size)
+        self.local_ttl = min(ttl, local_ttl)
+        self._local: "OrderedDict[Tuple[str, str, str], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self.invalidations = 0
+
+    def _count(self, name: str, outcome: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(name, {"hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def get(self, child_id: str, scope: str, field: str) -> Optional[str]:
+        client = redis_client.get_redis()
+        if client is not None:
+            try:
+                return client.hget(_hash_key(child_id, scope), field)
+            except Exception as e:
+                print(f"Response cache Redis read failed: {e}")
+                redis_client.mark_failed()
+        with self._lock:
+            item = self._local.get((child_id, scope, field))
+            if item is None:
+                return None
+            raw, stored_at = item
+            if time.monotonic() - stored_at > self.local_ttl:
+                del self._local[(child_id, scope, field)]
+                return None
+            self._local.move_to_end((child_id, scope, field))
+            return raw
+
+    def set(self, child_id: str, scope: str, field: str, raw: str) -> None:
+        client = redis_client.get_redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.hset(_hash_key(child_id, scope), field, raw)
+                pipe.expire(_hash_key(child_id, scope), self.ttl)
+                pipe.execute()
+                return
+            except Exception as e:
+                print(f"Response cache Redis write failed: {e}")
+                redis_client.mark_failed()
+        if self.local_ttl <= 0:
+            return
+        with self._lock:
+            self._local[(child_id, scope, field)] = (raw, time.monotonic())
+            self._local.move_to_end((child_id, scope, field))
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def invalidate(self, child_id: str, scopes: Iterable[str] = ALL_SCOPES) -> None:
+        scopes = list(scopes)
+        if not child_id or not scopes:
+            return
+        with self._lock:
+            self.invalidations += 1
+            for key in [k for k in self._local if k[0] == child_id and k[1] in scopes]:
+                del self._local[key]
+        client = redis_client.get_redis()
+        if client is None:
+            return
+        try:
+            client.delete(*[_hash_key(child_id, s) for s in scopes])
+        except Exception as e:
+            print(f"Response cache Redis invalidation failed: {e}")
+            redis_client.mark_failed()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = []
+            for name, c in sorted(self._counters.items()):
+                lookups = c["hits"] + c["misses"]
+                routes.append(
+                    {
+                        "name": name,
+                        "hits": c["hits"],
+                        "misses": c["misses"],
+                        "hit_ratio": round(c["hits"] / lookups, 4) if lookups else 0.0,
+                    }
+                )
+            hits = sum(r["hits"] for r in routes)
+            lookups = hits + sum(r["misses"] for r in routes)
+            return {
+                "enabled": RESPONSE_CACHE_ENABLED,
+                "redis_enabled": redis_client.get_redis() is not None,
+                "local_size": len(self._local),
+                "invalidations": self.invalidations,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "routes": routes,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def cached(name: str, response_model, key: Callable[..., Tuple[str, str, str]]):
+    """
+    Cache a sync route by `key(**arguments) -> (child_id, scope, field)`. The key function runs
+    first, so it can raise the route's own 400/404s. Hits are validated back into
+    `response_model`, so direct callers get the same types as on a miss.
+    """
+    adapter = TypeAdapter(response_model)
+
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not RESPONSE_CACHE_ENABLED:
+                return func(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            child_id, scope, field = key(**arguments.arguments)
+            field = f"{name}:{field}"
+            raw = response_cache.get(child_id, scope, field)
+            if raw is not None:
+                try:
+                    value = adapter.validate_python(json.loads(raw))
+                    response_cache._count(name, "hits")
+                    return value
+                except ValueError:
+                    pass
+            response_cache._count(name, "misses")
+            value = func(*args, **kwargs)
+            response_cache.set(child_id, scope, field, json.dumps(jsonable_encoder(value), ensure_ascii=False))
+            return value
+
+        return wrapper
+
+    return decorate
+
+
+def invalidate(child_id: str, *scopes: str) -> None:
+    """Drop cached responses of `child_id` for `scopes` (all scopes when none are given)."""
+    response_cache.invalidate(child_id, scopes or ALL_SCOPES)
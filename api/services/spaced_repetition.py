@@ -0,0 +1,172 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, exists
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import time_ranges
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+MAX_EASE = 3.0
+# Interval in days after the first and second consecutive "remembered"; later ones grow by ease
+FIRST_INTERVALS = (1, 3)
+# A forgotten word comes back this soon, i.e. in the next deck
+SRS_RELEARN_MINUTES = int(os.getenv("SRS_RELEARN_MINUTES", 10))
+
+
+# due_at and last_reviewed_at are naive UTC; timestamps read from other tables go through time_ranges.to_utc
+def new_mastery(child_id: str, word_id: str, due_at: datetime) -> models.WordMastery:
+    return models.WordMastery(
+        child_id=child_id,
+        word_id=word_id,
+        ease=INITIAL_EASE,
+        interval_days=0,
+        repetitions=0,
+        attempts=0,
+        lapses=0,
+        due_at=due_at,
+    )
+
+
+def apply_result(mastery: models.WordMastery, remembered: bool, now: datetime) -> None:
+    """SM-2 style update: remembered words move out by a growing interval, forgotten ones restart."""
+    mastery.attempts = (mastery.attempts or 0) + 1
+    mastery.last_result = "remembered" if remembered else "forgot"
+    mastery.last_reviewed_at = now
+    ease = mastery.ease or INITIAL_EASE
+    if remembered:
+        mastery.repetitions = (mastery.repetitions or 0) + 1
+        if mastery.repetitions <= len(FIRST_INTERVALS):
+            interval = float(FIRST_INTERVALS[mastery.repetitions - 1])
+        else:
+            interval = max(1.0, (mastery.interval_days or 1.0) * ease)
+        mastery.ease = min(MAX_EASE, ease + 0.1)
+        mastery.interval_days = interval
+        mastery.due_at = now + timedelta(days=interval)
+    else:
+        mastery.repetitions = 0
+        mastery.lapses = (mastery.lapses or 0) + 1
+        mastery.ease = max(MIN_EASE, ease - 0.2)
+        mastery.interval_days = 0
+        mastery.due_at = now + timedelta(minutes=SRS_RELEARN_MINUTES)
+
+
+def add_words(db: Session, parent_id: str, word_ids: Iterable[str], now: Optional[datetime] = None) -> int:
+    """New library words become due immediately for every child of the parent. Does not commit."""
+    ids = list(word_ids)
+    if not ids:
+        return 0
+    now = now or datetime.utcnow()
+    child_ids = [c for (c,) in db.query(models.Child.id).filter(models.Child.parent_id == parent_id).all()]
+    for child_id in child_ids:
+        for word_id in ids:
+            db.add(new_mastery(child_id, word_id, now))
+    return len(child_ids) * len(ids)
+
+
+def has_mastery(db: Session, child_id: str) -> bool:
+    return bool(db.query(exists().where(models.WordMastery.child_id == child_id)).scalar())
+
+
+def seed_child(db: Session, child: models.Child, now: Optional[datetime] = None) -> int:
+    """Create rows for library words the child has no mastery row for yet. Does not commit."""
+    now = now or datetime.utcnow()
+    missing = (
+        db.query(models.Word.id, models.Word.created_at)
+        .outerjoin(
+            models.WordMastery,
+            and_(models.WordMastery.word_id == models.Word.id, models.WordMastery.child_id == child.id),
+        )
+        .filter(models.Word.parent_id == child.parent_id, models.WordMastery.id.is_(None))
+        .all()
+    )
+    for word_id, created_at in missing:
+        # Older library words come first, like they would have in a deck built since day one
+        db.add(new_mastery(child.id, word_id, time_ranges.to_utc(created_at) if created_at else now))
+    return len(missing)
+
+
+def replay_history(db: Session, child: models.Child) -> int:
+    """Rebuild the child's mastery rows from LearningRecord history. Does not commit."""
+    rows: Dict[str, models.WordMastery] = {
+        m.word_id: m for m in db.query(models.WordMastery).filter(models.WordMastery.child_id == child.id).all()
+    }
+    records = (
+        db.query(models.LearningRecord)
+        .filter(models.LearningRecord.child_id == child.id, models.LearningRecord.result.isnot(None))
+        .order_by(models.LearningRecord.created_at.asc())
+        .all()
+    )
+    for record in records:
+        reviewed_at = time_ranges.to_utc(record.created_at) if record.created_at else datetime.utcnow()
+        mastery = rows.get(record.word_id)
+        if mastery is None:
+            mastery = new_mastery(child.id, record.word_id, reviewed_at)
+            db.add(mastery)
+            rows[record.word_id] = mastery
+        elif mastery.last_reviewed_at is not None and mastery.last_reviewed_at.replace(tzinfo=None) >= reviewed_at:
+            continue
+        apply_result(mastery, record.result == "remembered", reviewed_at)
+    return len(records)
+
+
+def record_result(db: Session, child_id: str, word_id: str, result: str, now: Optional[datetime] = None) -> models.WordMastery:
+    now = now or datetime.utcnow()
+    mastery = (
+        db.query(models.WordMastery)
+        .filter(models.WordMastery.child_id == child_id, models.WordMastery.word_id == word_id)
+        .first()
+    )
+    if mastery is None:
+        mastery = new_mastery(child_id, word_id, now)
+        db.add(mastery)
+    apply_result(mastery, result == "remembered", now)
+    return mastery
+
+
+def record_results(db: Session, child_id: str, results: Iterable[Tuple[str, str, datetime]]) -> int:
+    """Apply (word_id, result, reviewed_at) results in time order with one mastery read. Does not commit."""
+    ordered = sorted(results, key=lambda r: r[2])
+    if not ordered:
+        return 0
+    word_ids = list({word_id for word_id, _, _ in ordered})
+    rows: Dict[str, models.WordMastery] = {
+        m.word_id: m
+        for m in db.query(models.WordMastery)
+        .filter(models.WordMastery.child_id == child_id, models.WordMastery.word_id.in_(word_ids))
+        .all()
+    }
+    for word_id, result, reviewed_at in ordered:
+        mastery = rows.get(word_id)
+        if mastery is None:
+            mastery = new_mastery(child_id, word_id, reviewed_at)
+            db.add(mastery)
+            rows[word_id] = mastery
+        elif mastery.last_reviewed_at is not None and mastery.last_reviewed_at.replace(tzinfo=None) > reviewed_at:
+            # Queued offline and older than a result already applied
+            continue
+        apply_result(mastery, result == "remembered", reviewed_at)
+    return len(ordered)
+
+
+def deck(db: Session, child_id: str, parent_id: str, limit: int) -> List[models.Word]:
+    """
+    The child's words ordered by due date: overdue first, then the ones coming up soonest.
+    A range read on (child_id, due_at), so its cost follows `limit`, not the library size.
+    """
+    return (
+        db.query(models.Word)
+        .join(models.WordMastery, models.WordMastery.word_id == models.Word.id)
+        .filter(
+            models.WordMastery.child_id == child_id,
+            models.Word.parent_id == parent_id,
+            models.Word.dict_vc_id.isnot(None),
+            models.Word.dict_vc_id != "",
+        )
+        .order_by(models.WordMastery.due_at.asc())
+        .limit(limit)
+        .all()
+    )
@@ -0,0 +1,228 @@
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text, bindparam
+
+from ..database import DictionarySessionLocal, SessionLocal
+from . import dictionary_cache
+
+SUGGEST_INDEX_ENABLED = os.getenv("SUGGEST_INDEX_ENABLED", "1") not in {"0", "false", "False"}
+# alpha: same order as the SQL path | difficulty: easiest vc_difficulty first
+# popularity: words found in the most parent libraries first
+SUGGEST_RANKING = os.getenv("SUGGEST_RANKING", "alpha")
+SUGGEST_INDEX_RELOAD_SECONDS = int(os.getenv("SUGGEST_INDEX_RELOAD_SECONDS", 3600))
+
+RANKINGS = ("alpha", "difficulty", "popularity")
+
+_LOAD_QUERY = text(
+    """
+    SELECT w.vc_id, w.vc_vocabulary, e.vc_difficulty
+    FROM word w
+    LEFT JOIN word_ext e ON e.vc_id = w.vc_id
+    WHERE w.vc_vocabulary IS NOT NULL AND w.vc_vocabulary != ''
+    """
+)
+
+_REFRESH_QUERY = (
+    text(
+        """
+        SELECT w.vc_id, w.vc_vocabulary, e.vc_difficulty
+        FROM word w
+        LEFT JOIN word_ext e ON e.vc_id = w.vc_id
+        WHERE w.vc_id IN :vc_ids
+        """
+    )
+    .bindparams(bindparam("vc_ids", expanding=True))
+)
+
+
+def _sort_key(word: str) -> str:
+    # vc_vocabulary uses a case-insensitive collation, so LIKE 'q%' ignores case
+    return word.lower()
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over word.vc_vocabulary.
+    Three parallel lists (lowercased key, display word, vc_id) keep memory compact;
+    a prefix lookup is two bisects plus a slice.
+    """
+
+    def __init__(self, ranking: str = SUGGEST_RANKING):
+        self.ranking = ranking if ranking in RANKINGS else "alpha"
+        self._keys: List[str] = []
+        self._words: List[str] = []
+        self._ids: List[str] = []
+        self._key_by_id: Dict[str, str] = {}
+        self._difficulty: Dict[str, int] = {}
+        self._popularity: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.ready = False
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def build(self, rows: Iterable[Tuple[str, str, Optional[int]]], popularity: Optional[Dict[str, int]] = None) -> None:
+        entries = []
+        difficulty: Dict[str, int] = {}
+        for vc_id, word, vc_difficulty in rows:
+            if not vc_id or not word:
+                continue
+            entries.append((_sort_key(word), word, vc_id))
+            if vc_difficulty is not None:
+                difficulty[vc_id] = int(vc_difficulty)
+        entries.sort()
+
+        keys = [e[0] for e in entries]
+        words = [e[1] for e in entries]
+        ids = [e[2] for e in entries]
+        with self._lock:
+            self._keys, self._words, self._ids = keys, words, ids
+            self._key_by_id = {vc_id: key for key, _, vc_id in entries}
+            self._difficulty = difficulty
+            if popularity is not None:
+                self._popularity = popularity
+            self.ready = True
+            self.loaded_at = time.time()
+
+    def _rank(self, i: int) -> tuple:
+        vc_id = self._ids[i]
+        if self.ranking == "difficulty":
+            return (self._difficulty.get(vc_id, 99), self._keys[i])
+        if self.ranking == "popularity":
+            return (-self._popularity.get(vc_id, 0), self._keys[i])
+        return (self._keys[i],)
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        key = _sort_key(prefix)
+        with self._lock:
+            lo = bisect_left(self._keys, key)
+            hi = bisect_left(self._keys, key + "\uffff", lo)
+            if lo >= hi:
+                return []
+            if self.ranking == "alpha":
+                return self._words[lo:min(hi, lo + limit)]
+            best = heapq.nsmallest(limit, range(lo, hi), key=self._rank)
+            return [self._words[i] for i in best]
+
+    def _position(self, vc_id: str) -> Optional[int]:
+        key = self._key_by_id.get(vc_id)
+        if key is None:
+            return None
+        i = bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            if self._ids[i] == vc_id:
+                return i
+            i += 1
+        return None
+
+    def remove(self, vc_id: str) -> None:
+        with self._lock:
+            i = self._position(vc_id)
+            if i is not None:
+                del self._keys[i]
+                del self._words[i]
+                del self._ids[i]
+            self._key_by_id.pop(vc_id, None)
+            self._difficulty.pop(vc_id, None)
+
+    def upsert(self, vc_id: str, word: str, vc_difficulty: Optional[int] = None) -> None:
+        if not vc_id or not word:
+            return
+        key = _sort_key(word)
+        with self._lock:
+            i = self._position(vc_id)
+            if i is None or self._words[i] != word:
+                if i is not None:
+                    del self._keys[i]
+                    del self._words[i]
+                    del self._ids[i]
+                j = bisect_left(self._keys, key)
+                self._keys.insert(j, key)
+                self._words.insert(j, word)
+                self._ids.insert(j, vc_id)
+                self._key_by_id[vc_id] = key
+            if vc_difficulty is not None:
+                self._difficulty[vc_id] = int(vc_difficulty)
+
+    def bump_popularity(self, vc_id: str, delta: int = 1) -> None:
+        with self._lock:
+            self._popularity[vc_id] = max(0, self._popularity.get(vc_id, 0) + delta)
+
+
+index = PrefixIndex()
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _load_popularity() -> Dict[str, int]:
+    with SessionLocal() as db:
+        rows = db.execute(
+            text(
+                """
+                SELECT dict_vc_id, COUNT(*)
+                FROM words
+                WHERE dict_vc_id IS NOT NULL AND dict_vc_id != ''
+                GROUP BY dict_vc_id
+                """
+            )
+        ).fetchall()
+    return {r[0]: int(r[1]) for r in rows}
+
+
+def load(target: PrefixIndex = index) -> int:
+    started = time.perf_counter()
+    with DictionarySessionLocal() as dict_db:
+        rows = dict_db.execute(_LOAD_QUERY).fetchall()
+    popularity = _load_popularity() if target.ranking == "popularity" else None
+    target.build(((r[0], r[1], r[2]) for r in rows), popularity=popularity)
+    print(f"Suggest index loaded {len(target)} words in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return len(target)
+
+
+def refresh(vc_ids: List[str], target: PrefixIndex = index) -> None:
+    """Re-read the given words so renamed, new or deleted entries are reflected without a full reload."""
+    if not target.ready or not vc_ids:
+        return
+    with DictionarySessionLocal() as dict_db:
+        rows = dict_db.execute(_REFRESH_QUERY, {"vc_ids": list(vc_ids)}).fetchall()
+    seen = set()
+    for vc_id, word, vc_difficulty in rows:
+        seen.add(vc_id)
+        target.upsert(vc_id, word, vc_difficulty)
+    for vc_id in vc_ids:
+        if vc_id not in seen:
+            target.remove(vc_id)
+
+
+def _loop() -> None:
+    while not _stop.is_set():
+        try:
+            load()
+        except Exception as e:
+            # Suggestions fall back to SQL until a load succeeds
+            print(f"Suggest index load failed: {e}")
+            _stop.wait(60)
+            continue
+        if SUGGEST_INDEX_RELOAD_SECONDS <= 0:
+            return
+        _stop.wait(SUGGEST_INDEX_RELOAD_SECONDS)
+
+
+def start() -> None:
+    global _thread
+    if not SUGGEST_INDEX_ENABLED or (_thread and _thread.is_alive()):
+        return
+    dictionary_cache.on_invalidate(refresh)
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="suggest-index", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    _stop.set()
@@ -0,0 +1,88 @@
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Tuple, Union
+
+# Children see days in this timezone: deck rollover, history days, report periods
+CHILD_TIMEZONE = os.getenv("CHILD_TIMEZONE") or os.getenv("DECK_TIMEZONE") or "Asia/Shanghai"
+# created_at/started_at are naive DATETIMEs filled by MySQL now(), i.e. in the server's time_zone
+DB_TIMEZONE = os.getenv("DB_TIMEZONE") or CHILD_TIMEZONE
+
+PERIOD_DAYS = {"week": 7, "month": 30, "year": 365}
+
+
+def _zone(name: str):
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(name)
+    except Exception as e:
+        print(f"Unknown timezone {name!r} ({e}), using UTC+8")
+        return timezone(timedelta(hours=8))
+
+
+local_tz = _zone(CHILD_TIMEZONE)
+db_tz = _zone(DB_TIMEZONE)
+
+
+def local_today() -> date:
+    return datetime.now(local_tz).date()
+
+
+def local_date(stored: Union[datetime, str]) -> date:
+    """The child's calendar day of a timestamp read back from the main DB."""
+    if isinstance(stored, str):
+        stored = datetime.fromisoformat(stored)
+    if stored.tzinfo is None:
+        stored = stored.replace(tzinfo=db_tz)
+    return stored.astimezone(local_tz).date()
+
+
+def to_db(moment: datetime) -> datetime:
+    """A moment as stored in the main DB (naive, DB_TIMEZONE). Naive input is taken as local time."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=local_tz)
+    return moment.astimezone(db_tz).replace(tzinfo=None)
+
+
+def to_utc(stored: datetime) -> datetime:
+    """A main-DB timestamp (naive, DB_TIMEZONE) as naive UTC, the clock word_mastery is kept in."""
+    if stored.tzinfo is None:
+        stored = stored.replace(tzinfo=db_tz)
+    return stored.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def db_now() -> datetime:
+    return to_db(datetime.now(local_tz))
+
+
+def day_range(day: Union[date, str]) -> Tuple[datetime, datetime]:
+    """
+    Half-open [start, end) in stored-timestamp terms for one local day. Filtering with
+    `col >= start AND col < end` keeps the column bare, so (child_id, col) indexes are used
+    where `func.date(col) == day` forces a scan of every row of the child.
+    """
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    start = datetime.combine(day, time.min, tzinfo=local_tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=local_tz)
+    return to_db(start), to_db(end)
+
+
+def days_range(first: date, last: date) -> Tuple[datetime, datetime]:
+    """Half-open range covering local days first..last inclusive."""
+    return day_range(first)[0], day_range(last)[1]
+
+
+def period_days(period: str, today: date = None) -> Tuple[date, date]:
+    """First and last local day of the last N days including today, for a period name in PERIOD_DAYS."""
+    today = today or local_today()
+    return today - timedelta(days=PERIOD_DAYS[period] - 1), today
+
+
+def period_range(period: str, today: date = None) -> Tuple[datetime, datetime]:
+    return days_range(*period_days(period, today))
+
+
+def between(column, bounds: Tuple[datetime, datetime]):
+    start, end = bounds
+    return (column >= start) & (column < end)
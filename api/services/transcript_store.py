@@ -0,0 +1,105 @@
+import hashlib
+import os
+from typing import Iterable, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "1") not in {"0", "false", "False"}
+
+
+def fingerprint_file(path: str) -> str:
+    """Hash of the file bytes: the same episode imported under several directories maps to one transcript."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def pair_fingerprint(pair_key: str) -> str:
+    # A video and its audio twin share pair_key (directory::name) but not their bytes
+    return f"pair:{pair_key}"
+
+
+def lookup(
+    db: Session,
+    content: str,
+    config_version: Optional[str],
+    *,
+    pair: Optional[str] = None,
+    media_id: Optional[str] = None,
+) -> Optional[str]:
+    """
+    The stored SRT for the file's `content` fingerprint, else for its `pair` fingerprint.
+    A pair row produced for this same media from other bytes is stale: the file was replaced.
+    """
+    if not (TRANSCRIPT_CACHE_ENABLED and config_version and content):
+        return None
+    fingerprints = [content] + ([pair] if pair else [])
+    rows = (
+        db.query(models.Transcript)
+        .filter(
+            models.Transcript.fingerprint.in_(fingerprints),
+            models.Transcript.config_version == config_version,
+        )
+        .all()
+    )
+    by_fingerprint = {row.fingerprint: row for row in rows}
+    row = by_fingerprint.get(content)
+    if row is None and pair:
+        row = by_fingerprint.get(pair)
+        if row is not None and row.media_id == media_id and row.source_fingerprint != content:
+            row = None
+    if row is None:
+        return None
+    db.query(models.Transcript).filter(models.Transcript.id == row.id).update(
+        {models.Transcript.hits: models.Transcript.hits + 1}, synchronize_session=False
+    )
+    return row.srt
+
+
+def save(
+    db: Session,
+    fingerprints: Iterable[str],
+    config_version: Optional[str],
+    srt: str,
+    media_id: Optional[str] = None,
+    *,
+    source: Optional[str] = None,
+    replace: bool = False,
+) -> None:
+    """
+    Store `srt` under every fingerprint that does not have one yet; with `replace`, overwrite the ones
+    that do (a fresh transcription supersedes a forced-out or stale row). Does not commit.
+    """
+    if not (TRANSCRIPT_CACHE_ENABLED and config_version):
+        return
+    for fingerprint in fingerprints:
+        existing = (
+            db.query(models.Transcript)
+            .filter(models.Transcript.fingerprint == fingerprint, models.Transcript.config_version == config_version)
+            .first()
+        )
+        if existing is not None:
+            if replace:
+                existing.srt = srt
+                existing.media_id = media_id
+                existing.source_fingerprint = source
+            continue
+        try:
+            with db.begin_nested():
+                db.add(
+                    models.Transcript(
+                        fingerprint=fingerprint,
+                        config_version=config_version,
+                        srt=srt,
+                        media_id=media_id,
+                        source_fingerprint=source,
+                    )
+                )
+        except IntegrityError:
+            # Another worker stored the same media first
+            pass
@@ -1,19 +1,35 @@
-import whisper
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import timedelta
+from typing import Callable, List, Optional
+
+from . import audio_chunks, transcription_backends
 
 # 使用全局变量缓存模型，避免每次请求重新加载
 _model = None
 
-def get_model():
+# 分段并行转录：解码一次，按静音切成约 TRANSCRIBE_CHUNK_SECONDS 的片段，在多个进程中同时转录
+# TRANSCRIBE_CHUNK_WORKERS <= 1 时保持原来的整文件转录
+TRANSCRIBE_CHUNK_WORKERS = int(os.getenv("TRANSCRIBE_CHUNK_WORKERS", 0))
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", 120))
+TRANSCRIBE_MIN_SILENCE_SECONDS = float(os.getenv("TRANSCRIBE_MIN_SILENCE_SECONDS", 0.5))
+
+_pool = None
+_pool_workers = 0
+
+def get_model(threads: int = 0):
+    """当前进程的转录引擎（见 transcription_backends），首次调用时加载模型"""
     global _model
     if _model is None:
-        # 可选模型: tiny, base, small, medium, large
-        # base 模型在速度和准确度上是很好的平衡
-        print("Loading Whisper model...")
-        _model = whisper.load_model("base")
+        print(f"Loading transcription model {transcription_backends.describe()}...")
+        _model = transcription_backends.create(threads)
     return _model
 
+def load_audio(file_path: str):
+    """解码为 16kHz 单声道 float32，不需要加载模型"""
+    return transcription_backends.backend_class().load_audio(file_path)
+
 def format_timestamp(seconds: float) -> str:
     """将秒数转换为 SRT 时间戳格式 (HH:MM:SS,mmm)"""
     td = timedelta(seconds=seconds)
@@ -24,19 +40,122 @@ def format_timestamp(seconds: float) -> str:
     millis = int(td.microseconds / 1000)
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
-def transcribe_audio(file_path: str) -> str:
-    """转录音频文件并返回 SRT 格式字符串"""
-    model = get_model()
-    
-    # 调用 Whisper 进行转录
-    result = model.transcribe(file_path)
-    
+# SRT 生成方式变化时加一，转录结果缓存中旧版本的结果不再复用
+TRANSCRIPT_FORMAT_VERSION = 1
+
+def config_version() -> str:
+    """转录结果缓存的版本：引擎、模型、解码参数、整文件/分段方式和 SRT 格式"""
+    mode = f"chunk{int(TRANSCRIBE_CHUNK_SECONDS)}" if TRANSCRIBE_CHUNK_WORKERS > 1 else "whole"
+    return f"v{TRANSCRIPT_FORMAT_VERSION}:{transcription_backends.describe()}:{mode}"
+
+def segments_to_srt(segments: List[dict]) -> str:
     srt_output = []
-    for i, segment in enumerate(result["segments"], start=1):
+    for i, segment in enumerate(segments, start=1):
         start = format_timestamp(segment["start"])
         end = format_timestamp(segment["end"])
         text = segment["text"].strip()
-        
+
         srt_output.append(f"{i}\n{start} --> {end}\n{text}\n")
-        
+
     return "\n".join(srt_output)
+
+def _init_chunk_worker(threads: int) -> None:
+    # 每个进程只用分到的核数，避免多个进程的推理线程互相争抢
+    get_model(threads)
+
+def _transcribe_chunk(audio) -> List[dict]:
+    return get_model().transcribe(audio)
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown()
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_chunk_worker,
+            initargs=(threads,),
+        )
+        _pool_workers = workers
+    return _pool
+
+def _ready() -> int:
+    return os.getpid()
+
+def preload(workers: Optional[int] = None) -> None:
+    """
+    在开始接任务前加载模型：整文件模式加载到当前进程；分段模式只启动分段进程池，
+    由每个子进程各自加载，当前进程不再多持有一份用不到的模型
+    """
+    workers = TRANSCRIBE_CHUNK_WORKERS if workers is None else workers
+    if workers > 1:
+        # 同时提交 workers 个任务，进程池会把子进程全部拉起（模型在 initializer 中加载）
+        list(_get_pool(workers).map(_ready, range(workers)))
+    else:
+        get_model()
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def transcribe_chunked(
+    file_path: str,
+    workers: int,
+    chunk_seconds: float = TRANSCRIBE_CHUNK_SECONDS,
+    progress: Optional[Callable[[float], None]] = None,
+) -> List[dict]:
+    """并行转录各静音分段，时间戳加上片段起点后按时间合并"""
+    # 只解码一次（16kHz 单声道），片段以数组形式交给子进程
+    audio = load_audio(file_path)
+    chunks = audio_chunks.split_on_silence(audio, chunk_seconds, TRANSCRIBE_MIN_SILENCE_SECONDS)
+    pool = _get_pool(workers)
+    futures = {pool.submit(_transcribe_chunk, audio[start:end]): (start, end) for start, end in chunks}
+
+    segments = []
+    try:
+        for done, future in enumerate(as_completed(futures), start=1):
+            start, end = futures[future]
+            offset = start / audio_chunks.SAMPLE_RATE
+            chunk_end = end / audio_chunks.SAMPLE_RATE
+            for segment in future.result():
+                if not segment["text"].strip():
+                    continue
+                segments.append(
+                    {
+                        "start": offset + segment["start"],
+                        "end": min(offset + segment["end"], chunk_end),
+                        "text": segment["text"],
+                    }
+                )
+            if progress:
+                progress(done / len(futures))
+    except BaseException:
+        # 取消或出错时不再转录尚未开始的片段
+        for future in futures:
+            future.cancel()
+        raise
+    segments.sort(key=lambda s: s["start"])
+    return segments
+
+def transcribe_audio(
+    file_path: str,
+    progress: Optional[Callable[[float], None]] = None,
+    workers: Optional[int] = None,
+    chunk_seconds: Optional[float] = None,
+) -> str:
+    """转录音频文件并返回 SRT 格式字符串；progress 以 0-1 的完成比例回调（分段模式下每完成一段回调一次）"""
+    workers = TRANSCRIBE_CHUNK_WORKERS if workers is None else workers
+    if workers > 1:
+        segments = transcribe_chunked(file_path, workers, chunk_seconds or TRANSCRIBE_CHUNK_SECONDS, progress)
+        return segments_to_srt(segments)
+
+    model = get_model()
+
+    # 调用转录引擎
+    segments = model.transcribe(file_path)
+    if progress:
+        progress(1.0)
+    return segments_to_srt(segments)
@@ -0,0 +1,113 @@
+import os
+from typing import List, Optional, Union
+
+import numpy as np
+
+# 转录引擎（TRANSCRIBE_BACKEND）：
+#   whisper         openai-whisper，PyTorch float32
+#   faster-whisper  CTranslate2 实现，CPU 上用 int8 量化，速度快数倍、内存更省
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "whisper")
+# 可选模型: tiny, base, small, medium, large-v3（以及 tiny.en / base.en 等纯英文模型）
+TRANSCRIBE_MODEL = os.getenv("TRANSCRIBE_MODEL", "base")
+# 仅 faster-whisper：int8 | int8_float32 | float32
+TRANSCRIBE_COMPUTE_TYPE = os.getenv("TRANSCRIBE_COMPUTE_TYPE", "int8")
+# 推理线程数，0 表示由引擎决定（分段模式下为 核数 / 进程数）
+TRANSCRIBE_THREADS = int(os.getenv("TRANSCRIBE_THREADS", 0))
+# 0 表示引擎默认：whisper 贪心解码，faster-whisper beam 5
+TRANSCRIBE_BEAM_SIZE = int(os.getenv("TRANSCRIBE_BEAM_SIZE", 0))
+# 素材都是英文，固定语言可以省掉语言检测；留空则自动检测
+TRANSCRIBE_LANGUAGE = os.getenv("TRANSCRIBE_LANGUAGE", "en") or None
+
+Audio = Union[str, np.ndarray]
+
+
+class WhisperBackend:
+    name = "whisper"
+
+    def __init__(self, model_size: str, threads: int = 0, beam_size: int = 0, language: Optional[str] = None):
+        import torch
+        import whisper
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = whisper.load_model(model_size, device="cpu")
+        self.options = {"language": language, "fp16": False}
+        if beam_size:
+            self.options["beam_size"] = beam_size
+
+    @staticmethod
+    def load_audio(path: str) -> np.ndarray:
+        import whisper
+
+        return whisper.load_audio(path)
+
+    def transcribe(self, audio: Audio) -> List[dict]:
+        result = self.model.transcribe(audio, **self.options)
+        return [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result["segments"]]
+
+
+class FasterWhisperBackend:
+    name = "faster-whisper"
+
+    def __init__(
+        self,
+        model_size: str,
+        threads: int = 0,
+        beam_size: int = 0,
+        language: Optional[str] = None,
+        compute_type: str = TRANSCRIBE_COMPUTE_TYPE,
+    ):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=threads)
+        self.beam_size = beam_size or 5
+        self.language = language
+
+    @staticmethod
+    def load_audio(path: str) -> np.ndarray:
+        from faster_whisper import decode_audio
+
+        return decode_audio(path, sampling_rate=16000)
+
+    def transcribe(self, audio: Audio) -> List[dict]:
+        # segments 是生成器，遍历时才真正解码
+        segments, _info = self.model.transcribe(audio, beam_size=self.beam_size, language=self.language)
+        return [{"start": s.start, "end": s.end, "text": s.text} for s in segments]
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def backend_class(name: str = TRANSCRIBE_BACKEND):
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown TRANSCRIBE_BACKEND {name!r}, use one of {', '.join(BACKENDS)}")
+
+
+def create(threads: int = 0):
+    """按配置创建转录引擎；TRANSCRIBE_THREADS 优先于调用方给的线程数"""
+    cls = backend_class()
+    kwargs = {
+        "threads": TRANSCRIBE_THREADS or threads,
+        "beam_size": TRANSCRIBE_BEAM_SIZE,
+        "language": TRANSCRIBE_LANGUAGE,
+    }
+    if cls is FasterWhisperBackend:
+        kwargs["compute_type"] = TRANSCRIBE_COMPUTE_TYPE
+    return cls(TRANSCRIBE_MODEL, **kwargs)
+
+
+def describe() -> str:
+    """影响转录结果的配置，写进日志和基准输出"""
+    parts = [TRANSCRIBE_BACKEND, TRANSCRIBE_MODEL]
+    beam_size = TRANSCRIBE_BEAM_SIZE
+    if TRANSCRIBE_BACKEND == FasterWhisperBackend.name:
+        parts.append(TRANSCRIBE_COMPUTE_TYPE)
+        beam_size = beam_size or 5
+    parts.append(f"beam{beam_size}" if beam_size else "greedy")
+    parts.append(TRANSCRIBE_LANGUAGE or "auto")
+    return ":".join(parts)
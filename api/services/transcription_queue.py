@@ -0,0 +1,375 @@
+import os
+import tempfile
+from datetime import timedelta
+from typing import Callable, List, Optional, Tuple
+
+import requests
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import time_ranges, transcript_store
+
+TRANSCRIBE_MAX_ATTEMPTS = int(os.getenv("TRANSCRIBE_MAX_ATTEMPTS", 3))
+TRANSCRIBE_RETRY_BASE_SECONDS = int(os.getenv("TRANSCRIBE_RETRY_BASE_SECONDS", 60))
+TRANSCRIBE_HEARTBEAT_SECONDS = float(os.getenv("TRANSCRIBE_HEARTBEAT_SECONDS", 10))
+# A running job whose worker has not heartbeated for this long is put back on the queue
+TRANSCRIBE_STALE_SECONDS = int(os.getenv("TRANSCRIBE_STALE_SECONDS", 120))
+TRANSCRIBE_DOWNLOAD_TIMEOUT = float(os.getenv("TRANSCRIBE_DOWNLOAD_TIMEOUT", 60))
+# Uploads wait here until a worker picks them up; workers must run on the same host as the API
+TRANSCRIBE_SPOOL_DIR = os.getenv("TRANSCRIBE_SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "davidsmom-transcribe")
+
+PRIORITY_BULK = 0
+PRIORITY_MEDIA = 10
+PRIORITY_UPLOAD = 20
+
+ACTIVE_STATUSES = ("queued", "running")
+TERMINAL_STATUSES = ("done", "failed", "cancelled")
+
+# api/services/transcription_queue.py -> project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PUBLIC_SUBTITLES_DIR = os.path.join(PROJECT_ROOT, "public", "subtitles")
+TRANSCRIPTS_DIR = os.path.join(PROJECT_ROOT, "uploads", "transcripts")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def media_active_key(media_id: str) -> str:
+    return f"media:{media_id}"
+
+
+def spool_dir() -> str:
+    os.makedirs(TRANSCRIBE_SPOOL_DIR, exist_ok=True)
+    return TRANSCRIBE_SPOOL_DIR
+
+
+def get_srt_path(media_directory: str, media_filename: str) -> Tuple[str, str]:
+    """Same layout as the admin API: public/subtitles/{directory}/{name}.srt, served under /public."""
+    safe_dir = "".join(c for c in media_directory if c.isalnum() or c in (" ", ".", "_", "-")).strip()
+    if not safe_dir:
+        safe_dir = "uncategorized"
+    target_dir = os.path.join(PUBLIC_SUBTITLES_DIR, safe_dir)
+    os.makedirs(target_dir, exist_ok=True)
+    srt_filename = f"{os.path.splitext(media_filename)[0]}.srt"
+    return os.path.join(target_dir, srt_filename), f"/public/subtitles/{safe_dir}/{srt_filename}"
+
+
+def _upload_srt_path(job_id: str) -> Tuple[str, str]:
+    os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
+    return os.path.join(TRANSCRIPTS_DIR, f"{job_id}.srt"), f"/uploads/transcripts/{job_id}.srt"
+
+
+def enqueue_upload(
+    db: Session, path: str, *, parent_id: Optional[str] = None, priority: int = PRIORITY_UPLOAD
+) -> models.TranscriptionJob:
+    job = models.TranscriptionJob(
+        parent_id=parent_id,
+        source_path=path,
+        status="queued",
+        priority=priority,
+        next_attempt_at=time_ranges.db_now(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get(db: Session, job_id: str) -> Optional[models.TranscriptionJob]:
+    return db.query(models.TranscriptionJob).filter(models.TranscriptionJob.id == job_id).first()
+
+
+def get_upload(db: Session, job_id: str, parent_id: str) -> Optional[models.TranscriptionJob]:
+    """An upload job submitted by `parent_id`; media jobs and other parents' uploads are not found."""
+    return (
+        db.query(models.TranscriptionJob)
+        .filter(
+            models.TranscriptionJob.id == job_id,
+            models.TranscriptionJob.parent_id == parent_id,
+            models.TranscriptionJob.media_id.is_(None),
+        )
+        .first()
+    )
+
+
+def queue_counts(db: Session) -> dict:
+    rows = (
+        db.query(models.TranscriptionJob.status, func.count(models.TranscriptionJob.id))
+        .group_by(models.TranscriptionJob.status)
+        .all()
+    )
+    counts = {status: 0 for status in ACTIVE_STATUSES + TERMINAL_STATUSES}
+    for status, count in rows:
+        counts[status] = int(count or 0)
+    return counts
+
+
+def _remove_upload(job: models.TranscriptionJob) -> None:
+    # Only spooled uploads are ours to delete, never a media library file
+    if job.media_id or not job.source_path:
+        return
+    if os.path.dirname(os.path.abspath(job.source_path)) != os.path.abspath(TRANSCRIBE_SPOOL_DIR):
+        return
+    try:
+        os.remove(job.source_path)
+    except OSError:
+        pass
+
+
+def _finish(job: models.TranscriptionJob, status: str, error: Optional[str] = None) -> None:
+    job.status = status
+    job.stage = None
+    job.active_key = None
+    job.finished_at = time_ranges.db_now()
+    if error is not None:
+        job.last_error = error[:2000]
+    if status == "done":
+        job.progress = 100
+    _remove_upload(job)
+
+
+def cancel(db: Session, job_id: str) -> Optional[models.TranscriptionJob]:
+    """Queued jobs are cancelled at once; a running job is stopped by its worker supervisor."""
+    job = get(db, job_id)
+    if job is None:
+        return None
+    if job.status == "queued":
+        # Conditional so a worker claiming the job at the same moment wins cleanly
+        updated = (
+            db.query(models.TranscriptionJob)
+            .filter(models.TranscriptionJob.id == job_id, models.TranscriptionJob.status == "queued")
+            .update(
+                {
+                    models.TranscriptionJob.status: "cancelled",
+                    models.TranscriptionJob.active_key: None,
+                    models.TranscriptionJob.finished_at: time_ranges.db_now(),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        db.refresh(job)
+        if updated:
+            _remove_upload(job)
+            return job
+    if job.status == "running" and not job.cancel_requested:
+        job.cancel_requested = True
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+def claim(db: Session, worker_id: str) -> Optional[str]:
+    """Take the most urgent due job for `worker_id`. Returns its id, or None when the queue is idle."""
+    now = time_ranges.db_now()
+    candidates = (
+        db.query(models.TranscriptionJob.id)
+        .filter(
+            models.TranscriptionJob.status == "queued",
+            models.TranscriptionJob.next_attempt_at <= now,
+        )
+        .order_by(models.TranscriptionJob.priority.desc(), models.TranscriptionJob.created_at.asc())
+        .limit(5)
+        .all()
+    )
+    for (job_id,) in candidates:
+        # Conditional update so two workers never pick up the same job.
+        claimed = (
+            db.query(models.TranscriptionJob)
+            .filter(models.TranscriptionJob.id == job_id, models.TranscriptionJob.status == "queued")
+            .update(
+                {
+                    models.TranscriptionJob.status: "running",
+                    models.TranscriptionJob.attempts: models.TranscriptionJob.attempts + 1,
+                    models.TranscriptionJob.worker: worker_id,
+                    models.TranscriptionJob.progress: 0,
+                    models.TranscriptionJob.stage: None,
+                    models.TranscriptionJob.started_at: now,
+                    models.TranscriptionJob.heartbeat_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if claimed:
+            return job_id
+    return None
+
+
+def heartbeat(db: Session, job_id: str, worker_id: str) -> bool:
+    """Record that the worker is alive. Returns True when the job was asked to cancel."""
+    db.query(models.TranscriptionJob).filter(
+        models.TranscriptionJob.id == job_id,
+        models.TranscriptionJob.worker == worker_id,
+        models.TranscriptionJob.status == "running",
+    ).update({models.TranscriptionJob.heartbeat_at: time_ranges.db_now()}, synchronize_session=False)
+    db.commit()
+    row = db.query(models.TranscriptionJob.cancel_requested).filter(models.TranscriptionJob.id == job_id).first()
+    return bool(row and row[0])
+
+
+def _retry_or_fail(job: models.TranscriptionJob, error: str) -> None:
+    if job.cancel_requested:
+        _finish(job, "cancelled", error)
+        return
+    if (job.attempts or 0) >= TRANSCRIBE_MAX_ATTEMPTS:
+        _finish(job, "failed", error)
+        return
+    delay = TRANSCRIBE_RETRY_BASE_SECONDS * (2 ** max(0, (job.attempts or 1) - 1))
+    job.status = "queued"
+    job.stage = None
+    job.progress = 0
+    job.worker = None
+    job.last_error = error[:2000]
+    job.next_attempt_at = time_ranges.db_now() + timedelta(seconds=delay)
+
+
+def _release(db: Session, jobs: List[models.TranscriptionJob], reason: str) -> int:
+    for job in jobs:
+        _retry_or_fail(job, reason)
+    db.commit()
+    return len(jobs)
+
+
+def release_worker(db: Session, worker_id: str) -> int:
+    """Settle the running job of a worker process that exited: cancelled if asked, else retried."""
+    jobs = (
+        db.query(models.TranscriptionJob)
+        .filter(models.TranscriptionJob.worker == worker_id, models.TranscriptionJob.status == "running")
+        .all()
+    )
+    return _release(db, jobs, f"worker {worker_id} exited")
+
+
+def recover_stale(db: Session) -> int:
+    """Jobs whose worker stopped heartbeating (host crash, kill -9) go back on the queue."""
+    cutoff = time_ranges.db_now() - timedelta(seconds=TRANSCRIBE_STALE_SECONDS)
+    jobs = (
+        db.query(models.TranscriptionJob)
+        .filter(models.TranscriptionJob.status == "running", models.TranscriptionJob.heartbeat_at < cutoff)
+        .all()
+    )
+    return _release(db, jobs, "worker heartbeat lost")
+
+
+def _set_stage(db: Session, job: models.TranscriptionJob, stage: str, progress: int) -> None:
+    db.refresh(job)
+    if job.cancel_requested:
+        raise JobCancelled()
+    job.stage = stage
+    job.progress = progress
+    db.commit()
+
+
+def _download(url: str, filename: str) -> str:
+    suffix = os.path.splitext(filename or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=spool_dir()) as tmp:
+        try:
+            with requests.get(url, stream=True, timeout=TRANSCRIBE_DOWNLOAD_TIMEOUT) as r:
+                r.raise_for_status()
+                for chunk in r.iter_content(chunk_size=1024 * 1024):
+                    tmp.write(chunk)
+        except Exception:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+        return tmp.name
+
+
+def _local_source(db: Session, job: models.TranscriptionJob, media: Optional[models.MediaResource]) -> Tuple[str, bool]:
+    """Path to transcribe, and whether it is a download to remove afterwards."""
+    if media is None:
+        return job.source_path, False
+    if media.url.startswith("file://"):
+        return media.url[len("file://"):], False
+    if media.url.startswith(("http://", "https://")):
+        _set_stage(db, job, "downloading", 5)
+        return _download(media.url, media.filename), True
+    return media.url, False
+
+
+def run_job(session_factory, job_id: str, transcribe: Callable[..., str], config_version: Optional[str] = None) -> str:
+    """
+    Transcribe a claimed job and write its SRT. Returns the job's status afterwards.
+    With `config_version`, transcripts are reused from and saved to the transcript store:
+    first by a hash of the file, then by the media's pair_key (its video/audio twin).
+    A job with `force` skips the lookup and replaces what the store has.
+    """
+    downloaded = None
+    with session_factory() as db:
+        job = get(db, job_id)
+        if job is None or job.status != "running":
+            return job.status if job else "missing"
+        try:
+            media = None
+            if job.media_id:
+                media = db.query(models.MediaResource).filter(models.MediaResource.id == job.media_id).first()
+                if media is None:
+                    _finish(job, "failed", "Media not found")
+                    db.commit()
+                    return job.status
+
+            local_path, is_download = _local_source(db, job, media)
+            if is_download:
+                downloaded = local_path
+            if not os.path.exists(local_path):
+                # Retrying will not make a missing file appear
+                _finish(job, "failed", f"File not found: {local_path}")
+                db.commit()
+                return job.status
+
+            fingerprints = []
+            content = None
+            srt_content = None
+            if config_version:
+                _set_stage(db, job, "fingerprinting", 10)
+                content = transcript_store.fingerprint_file(local_path)
+                pair = transcript_store.pair_fingerprint(media.pair_key) if media is not None and media.pair_key else None
+                fingerprints = [content] + ([pair] if pair else [])
+                if not job.force:
+                    srt_content = transcript_store.lookup(
+                        db, content, config_version, pair=pair, media_id=media.id if media else None
+                    )
+
+            transcribed = srt_content is None
+            if transcribed:
+                _set_stage(db, job, "transcribing", 20)
+                # Chunked transcription reports each finished chunk; a cancel request stops the remaining ones
+                srt_content = transcribe(
+                    local_path, progress=lambda done: _set_stage(db, job, "transcribing", 20 + int(70 * done))
+                )
+
+            _set_stage(db, job, "writing", 90)
+            # A fresh transcription supersedes rows that were forced out or found stale
+            transcript_store.save(
+                db, fingerprints, config_version, srt_content, media.id if media else None,
+                source=content, replace=transcribed,
+            )
+            if media is not None:
+                filepath, srt_url = get_srt_path(media.directory or "unknown", media.filename)
+            else:
+                filepath, srt_url = _upload_srt_path(job.id)
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(srt_content)
+            if media is not None:
+                media.srt_file = srt_url
+            job.srt_path = filepath
+            job.srt_url = srt_url
+            job.last_error = None
+            _finish(job, "done")
+            db.commit()
+        except JobCancelled:
+            _finish(job, "cancelled")
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            job = get(db, job_id)
+            print(f"Transcription job {job_id} failed: {e}")
+            _retry_or_fail(job, str(e))
+            db.commit()
+        finally:
+            if downloaded and os.path.exists(downloaded):
+                os.remove(downloaded)
+        return job.status
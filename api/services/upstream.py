@@ -0,0 +1,242 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import deadline
+from .circuit_breaker import CircuitBreaker
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    name: str
+    connect_timeout: float
+    read_timeout: float
+    max_connections: int
+    concurrency: int
+    breaker_failure_rate: float
+    breaker_slow_seconds: float
+    breaker_open_seconds: float
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+def _config(name: str, *, connect: float, read: float, connections: int, concurrency: int, slow: float) -> UpstreamConfig:
+    prefix = f"UPSTREAM_{name.upper()}"
+    return UpstreamConfig(
+        name=name,
+        connect_timeout=float(os.getenv(f"{prefix}_CONNECT_TIMEOUT", connect)),
+        read_timeout=float(os.getenv(f"{prefix}_TIMEOUT", read)),
+        max_connections=int(os.getenv(f"{prefix}_MAX_CONNECTIONS", connections)),
+        concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+        breaker_failure_rate=float(os.getenv(f"{prefix}_BREAKER_FAILURE_RATE", 0.5)),
+        breaker_slow_seconds=float(os.getenv(f"{prefix}_BREAKER_SLOW_SECONDS", slow)),
+        breaker_open_seconds=float(os.getenv(f"{prefix}_BREAKER_OPEN_SECONDS", 30)),
+    )
+
+
+# youdao: dictionary JSON + suggest API | siliconflow: image generation
+# image: downloads of generated images from SiliconFlow's CDN
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "youdao": _config("youdao", connect=2, read=5, connections=20, concurrency=10, slow=2),
+    "siliconflow": _config("siliconflow", connect=3, read=30, connections=8, concurrency=4, slow=20),
+    "image": _config("image", connect=3, read=20, connections=8, concurrency=8, slow=10),
+}
+
+
+def _split_timeout(timeout) -> Tuple[float, float]:
+    if isinstance(timeout, (tuple, list)):
+        return float(timeout[0]), float(timeout[1])
+    return float(timeout), float(timeout)
+
+
+class UpstreamClient:
+    """
+    Keep-alive connection pool plus a concurrency cap for one upstream.
+    The sync side is a shared requests.Session; the async side an httpx.AsyncClient per event loop.
+    Every call goes through the upstream's circuit breaker and is clamped to the current deadline.
+    """
+
+    def __init__(self, config: UpstreamConfig):
+        self.config = config
+        self.breaker = CircuitBreaker(
+            config.name,
+            failure_rate=config.breaker_failure_rate,
+            slow_call_seconds=config.breaker_slow_seconds,
+            open_seconds=config.breaker_open_seconds,
+        )
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, config.concurrency))
+        self._async_clients: Dict[int, object] = {}
+        self._async_slots: Dict[int, asyncio.Semaphore] = {}
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, self.config.max_connections))
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    @contextmanager
+    def slot(self):
+        self._slots.acquire()
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _begin(self, timeout) -> Tuple[float, float]:
+        deadline.check()
+        self.breaker.before_call()
+        connect, read = _split_timeout(timeout if timeout is not None else self.config.timeout)
+        try:
+            return deadline.clamp_timeout(connect), deadline.clamp_timeout(read)
+        except deadline.DeadlineExceeded:
+            self.breaker.cancel()
+            raise
+
+    def _record_error(self, error: Exception, elapsed: float) -> None:
+        left = deadline.remaining()
+        if left is not None and left <= 0:
+            # Our own budget cut the call short; that says nothing about the upstream's health
+            self.breaker.cancel()
+            raise deadline.DeadlineExceeded("request budget exhausted") from error
+        self.breaker.record(False, elapsed)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        timeout = kwargs.pop("timeout", None)
+        with self.slot():
+            kwargs["timeout"] = self._begin(timeout)
+            started = time.monotonic()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except Exception as e:
+                self._record_error(e, time.monotonic() - started)
+                raise
+        self.breaker.record(resp.status_code < 500, time.monotonic() - started)
+        return resp
+
+    def _async_client(self):
+        import httpx
+
+        loop_id = id(asyncio.get_running_loop())
+        client = self._async_clients.get(loop_id)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max(1, self.config.max_connections),
+                    max_keepalive_connections=max(1, self.config.max_connections),
+                ),
+                timeout=httpx.Timeout(self.config.read_timeout, connect=self.config.connect_timeout),
+            )
+            self._async_clients[loop_id] = client
+            self._async_slots[loop_id] = asyncio.Semaphore(max(1, self.config.concurrency))
+        return client, self._async_slots[loop_id]
+
+    async def arequest(self, method: str, url: str, **kwargs):
+        import httpx
+
+        timeout = kwargs.pop("timeout", None)
+        client, slots = self._async_client()
+        async with slots:
+            connect, read = self._begin(timeout)
+            kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+            started = time.monotonic()
+            try:
+                resp = await client.request(method, url, **kwargs)
+            except Exception as e:
+                self._record_error(e, time.monotonic() - started)
+                raise
+        self.breaker.record(resp.status_code < 500, time.monotonic() - started)
+        return resp
+
+    async def aclose(self) -> None:
+        loop_id = id(asyncio.get_running_loop())
+        client = self._async_clients.pop(loop_id, None)
+        self._async_slots.pop(loop_id, None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+_clients: Dict[str, UpstreamClient] = {name: UpstreamClient(cfg) for name, cfg in UPSTREAMS.items()}
+
+
+def client(name: str) -> UpstreamClient:
+    return _clients[name]
+
+
+def get(name: str, url: str, **kwargs) -> requests.Response:
+    return _clients[name].request("GET", url, **kwargs)
+
+
+def post(name: str, url: str, **kwargs) -> requests.Response:
+    return _clients[name].request("POST", url, **kwargs)
+
+
+async def aget(name: str, url: str, **kwargs):
+    return await _clients[name].arequest("GET", url, **kwargs)
+
+
+async def apost(name: str, url: str, **kwargs):
+    return await _clients[name].arequest("POST", url, **kwargs)
+
+
+def map_concurrent(fn: Callable[[T], R], items: Iterable[T], max_workers: int) -> List[R]:
+    """
+    Run fn over items on a thread pool, preserving order. Exceptions are returned in place
+    of results so one bad word does not sink a whole batch. Per-upstream caps still apply inside fn.
+    """
+    values = list(items)
+    if not values:
+        return []
+
+    def safe(value):
+        try:
+            return fn(value)
+        except Exception as e:
+            return e
+
+    if len(values) == 1 or max_workers <= 1:
+        return [safe(v) for v in values]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(values))) as executor:
+        # Copy the caller's context so the request deadline follows the work onto pool threads
+        futures = [executor.submit(contextvars.copy_context().run, safe, v) for v in values]
+        return [f.result() for f in futures]
+
+
+def breaker_status() -> List[dict]:
+    return [c.breaker.snapshot() for c in _clients.values()]
+
+
+async def aclose_all() -> None:
+    for c in _clients.values():
+        await c.aclose()
+
+
+def close_all() -> None:
+    for c in _clients.values():
+        c.close()
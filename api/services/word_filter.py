@@ -0,0 +1,303 @@
+import hashlib
+import math
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text, bindparam
+
+from .. import models
+from ..database import DictionarySessionLocal, SessionLocal
+from . import dictionary_cache
+
+WORD_FILTER_ENABLED = os.getenv("WORD_FILTER_ENABLED", "1") not in {"0", "false", "False"}
+WORD_FILTER_FALSE_POSITIVE_RATE = float(os.getenv("WORD_FILTER_FALSE_POSITIVE_RATE", 0.001))
+WORD_FILTER_RELOAD_SECONDS = int(os.getenv("WORD_FILTER_RELOAD_SECONDS", 3600))
+# Rows imported outside the API publish no invalidation; a cheap marker query spots them this often
+WORD_FILTER_POLL_SECONDS = int(os.getenv("WORD_FILTER_POLL_SECONDS", 60))
+# Miss counts are buffered in memory and written to dictionary_misses this often
+WORD_MISS_FLUSH_SECONDS = int(os.getenv("WORD_MISS_FLUSH_SECONDS", 60))
+WORD_MISS_MAX_PENDING = int(os.getenv("WORD_MISS_MAX_PENDING", 10000))
+
+_LOAD_QUERY = text(
+    """
+    SELECT vc_vocabulary
+    FROM word
+    WHERE vc_vocabulary IS NOT NULL AND vc_vocabulary != ''
+    """
+)
+
+_MARKER_QUERY = text("SELECT COUNT(*), MAX(vc_id) FROM word")
+
+_REFRESH_QUERY = (
+    text("SELECT vc_vocabulary FROM word WHERE vc_id IN :vc_ids")
+    .bindparams(bindparam("vc_ids", expanding=True))
+)
+
+
+def normalize_word(word: str) -> str:
+    # Mirror the utf8mb4_unicode_ci comparison used by `vc_vocabulary = :vocab`:
+    # case-, accent- and trailing-space-insensitive. Anything it folds together must share a key.
+    decomposed = unicodedata.normalize("NFKD", (word or "").strip())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter; k bit positions per key by double hashing one blake2b digest."""
+
+    def __init__(self, capacity: int, false_positive_rate: float = WORD_FILTER_FALSE_POSITIVE_RATE):
+        capacity = max(1, capacity)
+        rate = min(max(false_positive_rate, 1e-9), 0.5)
+        self.size = max(8, int(-capacity * math.log(rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+
+class WordFilter:
+    """
+    Answers "this word is definitely not in the base dictionary" without a DB roundtrip.
+    Until the first load finishes nothing is rejected, so lookups fall through to MySQL.
+    """
+
+    def __init__(self):
+        self._bloom: Optional[BloomFilter] = None
+        # Keys added while a load reads the table, replayed into the new filter before the swap
+        self._pending_adds: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._misses: Counter = Counter()
+        self.rejected = 0
+        self.passed = 0
+        self.false_positives = 0
+        self.loaded_at: Optional[float] = None
+        self.marker: Optional[tuple] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    @property
+    def loading(self) -> bool:
+        return self._pending_adds is not None
+
+    def begin_load(self) -> None:
+        """Call before reading the table; adds from here on survive the build() that follows."""
+        with self._lock:
+            self._pending_adds = []
+
+    def cancel_load(self) -> None:
+        with self._lock:
+            self._pending_adds = None
+
+    def build(self, words: Iterable[str], marker: Optional[tuple] = None) -> int:
+        keys = {normalize_word(w) for w in words if w}
+        # Headroom so words added between reloads do not push the false positive rate up
+        bloom = BloomFilter(int(len(keys) * 1.2) + 1000)
+        for key in keys:
+            bloom.add(key)
+        with self._lock:
+            for key in self._pending_adds or ():
+                bloom.add(key)
+            self._pending_adds = None
+            self._bloom = bloom
+            self.loaded_at = time.time()
+            self.marker = marker
+        return len(keys)
+
+    def add(self, words: Iterable[str]) -> None:
+        keys = [normalize_word(w) for w in words if w]
+        with self._lock:
+            if self._pending_adds is not None:
+                self._pending_adds.extend(keys)
+            if self._bloom is not None:
+                for key in keys:
+                    self._bloom.add(key)
+
+    def definitely_missing(self, word: str) -> bool:
+        bloom = self._bloom
+        if bloom is None:
+            return False
+        missing = normalize_word(word) not in bloom
+        with self._lock:
+            if missing:
+                self.rejected += 1
+            else:
+                self.passed += 1
+        return missing
+
+    def record_miss(self, word: str, *, after_lookup: bool = False) -> None:
+        """Count a lookup of a word the dictionary does not have; after_lookup means MySQL was asked."""
+        key = normalize_word(word)[:100]
+        if not key:
+            return
+        with self._lock:
+            if after_lookup and self._bloom is not None:
+                self.false_positives += 1
+            if key in self._misses or len(self._misses) < WORD_MISS_MAX_PENDING:
+                self._misses[key] += 1
+
+    def drain_misses(self) -> Counter:
+        with self._lock:
+            misses, self._misses = self._misses, Counter()
+        return misses
+
+    def stats(self) -> dict:
+        with self._lock:
+            bloom = self._bloom
+            return {
+                "ready": bloom is not None,
+                "words": bloom.count if bloom else 0,
+                "memory_bytes": bloom.memory_bytes if bloom else 0,
+                "hash_count": bloom.hash_count if bloom else 0,
+                "rejected": self.rejected,
+                "passed": self.passed,
+                "false_positives": self.false_positives,
+                "pending_misses": len(self._misses),
+                "loaded_at": self.loaded_at,
+            }
+
+
+word_filter = WordFilter()
+_stop = threading.Event()
+_threads: List[threading.Thread] = []
+
+
+def _read_marker(dict_db) -> tuple:
+    return tuple(dict_db.execute(_MARKER_QUERY).fetchone())
+
+
+def load(target: WordFilter = word_filter, session_factory=DictionarySessionLocal) -> int:
+    started = time.perf_counter()
+    target.begin_load()
+    try:
+        with session_factory() as dict_db:
+            # Marker first: a row inserted during the read changes it, so the next poll loads again
+            marker = _read_marker(dict_db)
+            words = [r[0] for r in dict_db.execute(_LOAD_QUERY).fetchall()]
+    except Exception:
+        target.cancel_load()
+        raise
+    count = target.build(words, marker)
+    print(f"Word filter loaded {count} words in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return count
+
+
+def reload_if_changed(target: WordFilter = word_filter, session_factory=DictionarySessionLocal) -> bool:
+    """Full reload when rows were added or removed since the last load, e.g. by an import script."""
+    with session_factory() as dict_db:
+        marker = _read_marker(dict_db)
+    if target.ready and marker == target.marker:
+        return False
+    load(target, session_factory)
+    return True
+
+
+def refresh(vc_ids: List[str], target: WordFilter = word_filter, session_factory=DictionarySessionLocal) -> None:
+    """Words can only be added to a Bloom filter; removals wait for the next full reload."""
+    if not (target.ready or target.loading) or not vc_ids:
+        return
+    with session_factory() as dict_db:
+        rows = dict_db.execute(_REFRESH_QUERY, {"vc_ids": list(vc_ids)}).fetchall()
+    target.add(r[0] for r in rows)
+
+
+def flush_misses(target: WordFilter = word_filter, session_factory=SessionLocal) -> int:
+    misses = target.drain_misses()
+    if not misses:
+        return 0
+    now = datetime.utcnow()
+    with session_factory() as db:
+        existing = {
+            m.word: m
+            for m in db.query(models.DictionaryMiss).filter(models.DictionaryMiss.word.in_(list(misses))).all()
+        }
+        for word, count in misses.items():
+            row = existing.get(word)
+            if row is None:
+                db.add(models.DictionaryMiss(word=word, miss_count=count, first_seen_at=now, last_seen_at=now))
+            else:
+                row.miss_count = (row.miss_count or 0) + count
+                row.last_seen_at = now
+        db.commit()
+    return len(misses)
+
+
+def top_misses(db, limit: int = 50) -> List[models.DictionaryMiss]:
+    return (
+        db.query(models.DictionaryMiss)
+        .order_by(models.DictionaryMiss.miss_count.desc(), models.DictionaryMiss.last_seen_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def _load_loop() -> None:
+    reload_at = 0.0
+    while not _stop.is_set():
+        try:
+            if not word_filter.ready or (WORD_FILTER_RELOAD_SECONDS > 0 and time.monotonic() >= reload_at):
+                load()
+                reload_at = time.monotonic() + WORD_FILTER_RELOAD_SECONDS
+            else:
+                reload_if_changed()
+        except Exception as e:
+            print(f"Word filter load failed: {e}")
+            _stop.wait(60)
+            continue
+        waits = [s for s in (WORD_FILTER_POLL_SECONDS, reload_at - time.monotonic()) if s > 0]
+        if WORD_FILTER_POLL_SECONDS <= 0 and WORD_FILTER_RELOAD_SECONDS <= 0:
+            return
+        _stop.wait(min(waits) if waits else 0)
+
+
+def _flush_loop() -> None:
+    while not _stop.wait(WORD_MISS_FLUSH_SECONDS):
+        try:
+            flush_misses()
+        except Exception as e:
+            print(f"Flushing dictionary misses failed: {e}")
+
+
+def start() -> None:
+    global _threads
+    if not WORD_FILTER_ENABLED or any(t.is_alive() for t in _threads):
+        return
+    dictionary_cache.on_invalidate(refresh)
+    _stop.clear()
+    _threads = [
+        threading.Thread(target=_load_loop, name="word-filter", daemon=True),
+        threading.Thread(target=_flush_loop, name="word-miss-flush", daemon=True),
+    ]
+    for t in _threads:
+        t.start()
+
+
+def stop() -> None:
+    _stop.set()
+    try:
+        flush_misses()
+    except Exception as e:
+        print(f"Flushing dictionary misses failed: {e}")
@@ -1,4 +1,4 @@
-import requests
+import asyncio
 import os
 import uuid
 import hashlib
@@ -6,8 +6,11 @@ import random
 import re
 from dotenv import load_dotenv
 from pathlib import Path
-from sqlalchemy import text
-from io import BytesIO
+from sqlalchemy import text, bindparam
+from typing import Dict, List, Optional, Tuple
+from . import dictionary_cache, image_pipeline, image_scheduler, upstream, youdao_cache
+from .circuit_breaker import CircuitOpenError
+from .deadline import DeadlineExceeded
 
 # Load environment variables
 load_dotenv()
@@ -15,11 +18,18 @@ load_dotenv()
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 UPLOADS_DIR = PROJECT_ROOT / "uploads" / "dictionarydata" / "images"
 STATIC_WORD_IMAGES_DIR = PROJECT_ROOT / "public" / "static" / "images" / "words"
+SILICONFLOW_IMAGES_URL = "https://api.siliconflow.cn/v1/images/generations"
+# How many words a bulk enrichment fetches from upstream at once
+ENRICHMENT_FETCH_CONCURRENCY = int(os.getenv("ENRICHMENT_FETCH_CONCURRENCY", 8))
 
 
 class SiliconFlowRateLimitError(Exception):
     pass
 
+# Upstream skipped on purpose (breaker open, request budget spent or image quota used up):
+# callers keep the data they already have and retry later instead of treating the word as enriched.
+UPSTREAM_UNAVAILABLE = (CircuitOpenError, DeadlineExceeded, image_scheduler.ImageRateLimited)
+
 def get_audio_url(word: str, type_id: int = 2) -> str:
     """
     Get audio URL from Youdao Dict.
@@ -90,11 +100,8 @@ def format_meaning_text(text: str) -> str:
         return truncate_content(raw)
     return "\n".join(parts)
 
-def fetch_youdao_info(word: str) -> dict:
-    """
-    Fetch word info (phonetics, meaning, example) from Youdao Dictionary API (XML/JSON)
-    """
-    info = {
+def _youdao_info_template(word: str) -> dict:
+    return {
         "word": word,
         "phonetic_us": "",
         "phonetic_uk": "",
@@ -103,72 +110,111 @@ def fetch_youdao_info(word: str) -> dict:
         "audio_us_url": get_audio_url(word, 2),
         "audio_uk_url": get_audio_url(word, 1)
     }
-    
+
+def youdao_info_url(word: str) -> str:
+    # Use Youdao JSON API (Mobile version often provides JSON)
+    # Or standard XML API: http://dict.youdao.com/suggest?q={word}&num=1&doctype=json
+    # Better JSON API: http://dict.youdao.com/jsonapi?q={word}
+    return f"http://dict.youdao.com/jsonapi?q={word.lower()}"
+
+def parse_youdao_payload(word: str, data: dict) -> dict:
+    """
+    Turn a dict.youdao.com/jsonapi payload into word info.
+    Returns None when Youdao has no dictionary entry for the word.
+    """
+    info = _youdao_info_template(word)
+
+    # Check for return-phrase to get correct casing (e.g. "january" -> "January")
+    # If "simple" or "ec" not found, word likely doesn't exist
+    if "simple" in data and "word" in data["simple"]:
+        simple = data["simple"]["word"][0]
+        if "return-phrase" in simple:
+            info["word"] = simple["return-phrase"] # Use canonical form
+
+        if "ukphone" in simple:
+            info["phonetic_uk"] = f"/{simple['ukphone']}/"
+        if "usphone" in simple:
+            info["phonetic_us"] = f"/{simple['usphone']}/"
+
+    elif "ec" in data and "word" in data["ec"]:
+        # Fallback if simple dict not present but EC exists
+        ec = data["ec"]["word"][0]
+        if "return-phrase" in ec:
+            info["word"] = ec["return-phrase"]
+    else:
+        # No dictionary entry found
+        return None
+
+    if "ec" in data and "word" in data["ec"]:
+        ec = data["ec"]["word"][0]
+        # Meaning
+        if "trs" in ec:
+            meanings = []
+            for tr in ec["trs"]:
+                 if "tr" in tr and len(tr["tr"]) > 0 and "l" in tr["tr"][0]:
+                     meanings.append(tr["tr"][0]["l"]["i"][0])
+            info["meaning"] = "; ".join(meanings)
+
+        # Phonetics fallback
+        if not info["phonetic_uk"] and "ukphone" in ec:
+            info["phonetic_uk"] = f"/{ec['ukphone']}/"
+        if not info["phonetic_us"] and "usphone" in ec:
+            info["phonetic_us"] = f"/{ec['usphone']}/"
+
+    # Example sentences (blng_sents_part)
+    if "blng_sents_part" in data and "sentence-pair" in data["blng_sents_part"]:
+        pairs = data["blng_sents_part"]["sentence-pair"]
+        if len(pairs) > 0:
+            info["example"] = pairs[0]["sentence"]
+            # pairs[0]["sentence-translation"] is the CN translation
+
+    # Image (pic_dict)
+    if "pic_dict" in data and "pic" in data["pic_dict"]:
+        pics = data["pic_dict"]["pic"]
+        if len(pics) > 0 and "image" in pics[0]:
+            info["image_url"] = pics[0]["image"]
+
+    return info
+
+def fetch_youdao_payload(word: str) -> Optional[dict]:
+    """
+    Raw dict.youdao.com/jsonapi payload for a word, or None if the request failed.
+    """
     try:
-        # Use Youdao JSON API (Mobile version often provides JSON)
-        # Or standard XML API: http://dict.youdao.com/suggest?q={word}&num=1&doctype=json
-        # Better JSON API: http://dict.youdao.com/jsonapi?q={word}
-        
-        url = f"http://dict.youdao.com/jsonapi?q={word.lower()}"
-        response = requests.get(url, timeout=5)
-        
+        response = upstream.get("youdao", youdao_info_url(word))
         if response.status_code == 200:
-            data = response.json()
-            
-            # Check for return-phrase to get correct casing (e.g. "january" -> "January")
-            # If "simple" or "ec" not found, word likely doesn't exist
-            if "simple" in data and "word" in data["simple"]:
-                simple = data["simple"]["word"][0]
-                if "return-phrase" in simple:
-                    info["word"] = simple["return-phrase"] # Use canonical form
-                
-                if "ukphone" in simple:
-                    info["phonetic_uk"] = f"/{simple['ukphone']}/"
-                if "usphone" in simple:
-                    info["phonetic_us"] = f"/{simple['usphone']}/"
-            
-            elif "ec" in data and "word" in data["ec"]:
-                # Fallback if simple dict not present but EC exists
-                ec = data["ec"]["word"][0]
-                if "return-phrase" in ec:
-                    info["word"] = ec["return-phrase"]
-            else:
-                # No dictionary entry found
-                return None
-
-            if "ec" in data and "word" in data["ec"]:
-                ec = data["ec"]["word"][0]
-                # Meaning
-                if "trs" in ec:
-                    meanings = []
-                    for tr in ec["trs"]:
-                         if "tr" in tr and len(tr["tr"]) > 0 and "l" in tr["tr"][0]:
-                             meanings.append(tr["tr"][0]["l"]["i"][0])
-                    info["meaning"] = "; ".join(meanings)
-                
-                # Phonetics fallback
-                if not info["phonetic_uk"] and "ukphone" in ec:
-                    info["phonetic_uk"] = f"/{ec['ukphone']}/"
-                if not info["phonetic_us"] and "usphone" in ec:
-                    info["phonetic_us"] = f"/{ec['usphone']}/"
-
-            # Example sentences (blng_sents_part)
-            if "blng_sents_part" in data and "sentence-pair" in data["blng_sents_part"]:
-                pairs = data["blng_sents_part"]["sentence-pair"]
-                if len(pairs) > 0:
-                    info["example"] = pairs[0]["sentence"]
-                    # pairs[0]["sentence-translation"] is the CN translation
-            
-            # Image (pic_dict)
-            if "pic_dict" in data and "pic" in data["pic_dict"]:
-                pics = data["pic_dict"]["pic"]
-                if len(pics) > 0 and "image" in pics[0]:
-                    info["image_url"] = pics[0]["image"]
+            return response.json()
+    except UPSTREAM_UNAVAILABLE:
+        raise
+    except Exception as e:
+        print(f"Error fetching Youdao info: {e}")
+    return None
+
+def fetch_youdao_info(word: str) -> dict:
+    """
+    Fetch word info (phonetics, meaning, example) from Youdao Dictionary API (XML/JSON)
+    """
+    payload = fetch_youdao_payload(word)
+    if payload is None:
+        return _youdao_info_template(word)
+    return parse_youdao_payload(word, payload)
 
+async def fetch_youdao_info_async(word: str) -> dict:
+    try:
+        response = await upstream.aget("youdao", youdao_info_url(word))
+        if response.status_code == 200:
+            return parse_youdao_payload(word, response.json())
+    except UPSTREAM_UNAVAILABLE:
+        raise
     except Exception as e:
         print(f"Error fetching Youdao info: {e}")
-        
-    return info
+
+    return _youdao_info_template(word)
+
+def _parse_suggestions(data: dict) -> list:
+    if "data" in data and "entries" in data["data"]:
+        return [entry["entry"] for entry in data["data"]["entries"]]
+    return []
 
 def get_word_suggestions(prefix: str):
     """
@@ -176,40 +222,64 @@ def get_word_suggestions(prefix: str):
     """
     try:
         url = f"http://dict.youdao.com/suggest?q={prefix}&num=5&doctype=json"
-        response = requests.get(url, timeout=3)
+        response = upstream.get("youdao", url, timeout=(upstream.UPSTREAMS["youdao"].connect_timeout, 3))
+        if response.status_code == 200:
+            return _parse_suggestions(response.json())
+    except Exception as e:
+        print(f"Error fetching suggestions: {e}")
+    return []
+
+async def get_word_suggestions_async(prefix: str):
+    try:
+        url = f"http://dict.youdao.com/suggest?q={prefix}&num=5&doctype=json"
+        response = await upstream.aget("youdao", url, timeout=3)
         if response.status_code == 200:
-            data = response.json()
-            if "data" in data and "entries" in data["data"]:
-                return [entry["entry"] for entry in data["data"]["entries"]]
+            return _parse_suggestions(response.json())
     except Exception as e:
         print(f"Error fetching suggestions: {e}")
     return []
 
 async def fetch_word_info(word: str):
     # 1. Fetch all text info from Youdao
-    info = fetch_youdao_info(word)
-    
+    info = await fetch_youdao_info_async(word) or _youdao_info_template(word)
+
     # 2. Image Generation (Fallback to SiliconFlow if Youdao has no image)
     if not info.get("image_url"):
-        img_url = get_siliconflow_image(word)
+        await asyncio.to_thread(image_scheduler.acquire, image_scheduler.HIGH_PRIORITY)
+        try:
+            img_url = await get_siliconflow_image_async(word, info.get("meaning") or "", raise_on_rate_limit=True)
+        except SiliconFlowRateLimitError:
+            raise image_scheduler.ImageRateLimited(image_scheduler.report_rate_limited())
+        image_scheduler.report_success()
         if img_url:
             # Download and save locally
-            local_url = download_and_process_image(img_url, word)
+            renditions = await asyncio.to_thread(_store_word_image, word, img_url)
+            local_url = image_pipeline.primary_url(renditions)
             if local_url:
                 info["image_url"] = local_url
             else:
                 # Fallback to remote URL if download fails (though likely won't last long)
                 info["image_url"] = img_url
-    
+
     return info
 
 
-def ensure_word_ext(
-    *,
-    dict_db,
-    vc_id: str,
-    word: str,
-):
+_WORD_EXT_COLUMNS = (
+    "image_url",
+    "audio_uk_url",
+    "audio_us_url",
+    "example",
+    "youdao_translation",
+    "word_from",
+    "word",
+    "translation",
+    "vc_phonetic_uk",
+    "vc_phonetic_us",
+    "vc_difficulty",
+)
+
+
+def _check_dictionary_db(dict_db) -> None:
     expected_db = os.getenv("DICT_DB_NAME") or os.getenv("DICTIONARY_DB_NAME") or "dictionarydata"
     try:
         actual_db = dict_db.get_bind().url.database
@@ -218,116 +288,232 @@ def ensure_word_ext(
     if actual_db != expected_db:
         raise RuntimeError(f"ensure_word_ext must use database '{expected_db}', got '{actual_db}'")
 
-    row = dict_db.execute(
+
+def _load_word_ext_rows(dict_db, vc_ids: List[str]) -> Dict[str, dict]:
+    if not vc_ids:
+        return {}
+    rows = dict_db.execute(
         text(
             """
-            SELECT image_url, audio_uk_url, audio_us_url, example, youdao_translation, word_from,
+            SELECT vc_id, image_url, audio_uk_url, audio_us_url, example, youdao_translation, word_from,
                 word, translation, vc_phonetic_uk, vc_phonetic_us, vc_difficulty
             FROM word_ext
-            WHERE vc_id = :vc_id
+            WHERE vc_id IN :vc_ids
             """
-        ),
-        {"vc_id": vc_id},
-    ).mappings().first()
-
-    existing = dict(row) if row else {}
-
-    need_audio_us = not existing.get("audio_us_url")
-    need_audio_uk = not existing.get("audio_uk_url")
-    need_example = not existing.get("example")
-    need_image = not existing.get("image_url")
-    need_youdao_translation = not existing.get("youdao_translation")
-
-    if not (need_audio_us or need_audio_uk or need_example or need_image or need_youdao_translation):
-        return {
-            "image_url": existing.get("image_url"),
-            "audio_uk_url": existing.get("audio_uk_url"),
-            "audio_us_url": existing.get("audio_us_url"),
-            "example": existing.get("example"),
-            "youdao_translation": existing.get("youdao_translation"),
-            "word_from": existing.get("word_from"),
-            "word": existing.get("word"),
-            "translation": existing.get("translation"),
-            "vc_phonetic_uk": existing.get("vc_phonetic_uk"),
-            "vc_phonetic_us": existing.get("vc_phonetic_us"),
-            "vc_difficulty": existing.get("vc_difficulty"),
-        }
-
-    youdao = fetch_youdao_info(word) or {}
+        ).bindparams(bindparam("vc_ids", expanding=True)),
+        {"vc_ids": vc_ids},
+    ).mappings().all()
+    return {r["vc_id"]: dict(r) for r in rows}
+
+
+def _word_ext_complete(existing: dict) -> bool:
+    return bool(
+        existing.get("audio_us_url")
+        and existing.get("audio_uk_url")
+        and existing.get("example")
+        and existing.get("image_url")
+        and existing.get("youdao_translation")
+    )
+
 
+_NOT_CACHED = object()
+
+
+def _enrich_word(
+    word: str,
+    existing: dict,
+    cached_payload=_NOT_CACHED,
+    generate_image: bool = True,
+    priority: int = 0,
+) -> Tuple[dict, Optional[Exception], Optional[Tuple[dict, bool]], List[dict]]:
+    """
+    Fetch whatever `existing` is missing from upstream. Runs on a worker thread, no DB access.
+    `cached_payload` is the Youdao payload from youdao_response_cache (None for a cached miss).
+    Returns the merged values, the reason image generation was skipped (if it was),
+    (payload, found) for a Youdao payload fetched fresh, so the caller can cache it, and the
+    renditions of a newly generated image.
+    """
+    fetched = None
+    if cached_payload is _NOT_CACHED:
+        payload = fetch_youdao_payload(word)
+        if payload is not None:
+            youdao = parse_youdao_payload(word, payload)
+            fetched = (payload, youdao is not None)
+        else:
+            youdao = _youdao_info_template(word)
+    else:
+        youdao = parse_youdao_payload(word, cached_payload) if cached_payload is not None else None
+    youdao = youdao or {}
+
+    deferred = None
+    renditions: List[dict] = []
     image_url = existing.get("image_url")
     if not image_url:
         image_url = youdao.get("image_url") or ""
-        if not image_url:
-            siliconflow_url = get_siliconflow_image(word, youdao.get("meaning") or "")
-            if siliconflow_url:
-                local = _download_and_resize_word_image(word, siliconflow_url)
-                if local:
-                    image_url = local
-
-    audio_us_url = existing.get("audio_us_url") or youdao.get("audio_us_url") or ""
-    audio_uk_url = existing.get("audio_uk_url") or youdao.get("audio_uk_url") or ""
-    example = existing.get("example") or youdao.get("example") or ""
-    youdao_translation = existing.get("youdao_translation") or youdao.get("meaning") or ""
-
-    word_from = existing.get("word_from")
-    word = existing.get("word")
-    translation = existing.get("translation")
-    vc_phonetic_uk = existing.get("vc_phonetic_uk")
-    vc_phonetic_us = existing.get("vc_phonetic_us")
-    vc_difficulty = existing.get("vc_difficulty")
-
-    dict_db.execute(
-        text(
-            """
-            INSERT INTO word_ext (vc_id, image_url, audio_uk_url, audio_us_url, example, youdao_translation, word_from,
-                word, translation, vc_phonetic_uk, vc_phonetic_us, vc_difficulty)
-            VALUES (:vc_id, :image_url, :audio_uk_url, :audio_us_url, :example, :youdao_translation, :word_from,
-                :word, :translation, :vc_phonetic_uk, :vc_phonetic_us, :vc_difficulty)
-            ON DUPLICATE KEY UPDATE
-                image_url = VALUES(image_url),
-                audio_uk_url = VALUES(audio_uk_url),
-                audio_us_url = VALUES(audio_us_url),
-                example = VALUES(example),
-                youdao_translation = VALUES(youdao_translation),
-                word_from = COALESCE(VALUES(word_from), word_from),
-                word = COALESCE(VALUES(word), word),
-                translation = COALESCE(VALUES(translation), translation),
-                vc_phonetic_uk = COALESCE(VALUES(vc_phonetic_uk), vc_phonetic_uk),
-                vc_phonetic_us = COALESCE(VALUES(vc_phonetic_us), vc_phonetic_us),
-                vc_difficulty = COALESCE(VALUES(vc_difficulty), vc_difficulty)
-            """
-        ),
-        {
-            "vc_id": vc_id,
-            "image_url": image_url or None,
-            "audio_uk_url": audio_uk_url or None,
-            "audio_us_url": audio_us_url or None,
-            "example": example or None,
-            "youdao_translation": youdao_translation or None,
-            "word_from": word_from or None,
-            "word": word or None,
-            "translation": translation or None,
-            "vc_phonetic_uk": vc_phonetic_uk or None,
-            "vc_phonetic_us": vc_phonetic_us or None,
-            "vc_difficulty": vc_difficulty,
-        },
-    )
-    dict_db.commit()
-
-    return {
+        if not image_url and generate_image:
+            try:
+                siliconflow_url = generate_word_image(word, youdao.get("meaning") or "", priority)
+                if siliconflow_url:
+                    renditions = _store_word_image(word, siliconflow_url)
+                    if renditions:
+                        image_url = image_pipeline.primary_url(renditions)
+            except UPSTREAM_UNAVAILABLE as e:
+                deferred = e
+
+    values = {
         "image_url": image_url or None,
-        "audio_uk_url": audio_uk_url or None,
-        "audio_us_url": audio_us_url or None,
-        "example": example or None,
-        "youdao_translation": youdao_translation or None,
-        "word_from": word_from or None,
-        "word": word or None,
-        "translation": translation or None,
-        "vc_phonetic_uk": vc_phonetic_uk or None,
-        "vc_phonetic_us": vc_phonetic_us or None,
-        "vc_difficulty": vc_difficulty,
+        "audio_uk_url": existing.get("audio_uk_url") or youdao.get("audio_uk_url") or None,
+        "audio_us_url": existing.get("audio_us_url") or youdao.get("audio_us_url") or None,
+        "example": existing.get("example") or youdao.get("example") or None,
+        "youdao_translation": existing.get("youdao_translation") or youdao.get("meaning") or None,
+        "word_from": existing.get("word_from") or None,
+        "word": existing.get("word") or None,
+        "translation": existing.get("translation") or None,
+        "vc_phonetic_uk": existing.get("vc_phonetic_uk") or None,
+        "vc_phonetic_us": existing.get("vc_phonetic_us") or None,
+        "vc_difficulty": existing.get("vc_difficulty"),
     }
+    return values, deferred, fetched, renditions
+
+
+WORD_EXT_UPSERT_CHUNK = int(os.getenv("WORD_EXT_UPSERT_CHUNK", 200))
+
+
+def upsert_word_ext_rows(dict_db, rows: List[Tuple[str, dict]], chunk_size: int = WORD_EXT_UPSERT_CHUNK) -> int:
+    """
+    Write (vc_id, values) pairs with multi-row INSERT ... ON DUPLICATE KEY UPDATE statements,
+    one round trip per `chunk_size` rows. Does not commit.
+    """
+    columns = ("vc_id",) + _WORD_EXT_COLUMNS
+    for start in range(0, len(rows), max(1, chunk_size)):
+        chunk = rows[start:start + max(1, chunk_size)]
+        params = {}
+        placeholders = []
+        for i, (vc_id, values) in enumerate(chunk):
+            row = {"vc_id": vc_id, **{c: values.get(c) for c in _WORD_EXT_COLUMNS}}
+            params.update({f"{c}_{i}": row[c] for c in columns})
+            placeholders.append("(" + ", ".join(f":{c}_{i}" for c in columns) + ")")
+        dict_db.execute(
+            text(
+                f"""
+                INSERT INTO word_ext ({", ".join(columns)})
+                VALUES {", ".join(placeholders)}
+                ON DUPLICATE KEY UPDATE
+                    image_url = VALUES(image_url),
+                    audio_uk_url = VALUES(audio_uk_url),
+                    audio_us_url = VALUES(audio_us_url),
+                    example = VALUES(example),
+                    youdao_translation = VALUES(youdao_translation),
+                    word_from = COALESCE(VALUES(word_from), word_from),
+                    word = COALESCE(VALUES(word), word),
+                    translation = COALESCE(VALUES(translation), translation),
+                    vc_phonetic_uk = COALESCE(VALUES(vc_phonetic_uk), vc_phonetic_uk),
+                    vc_phonetic_us = COALESCE(VALUES(vc_phonetic_us), vc_phonetic_us),
+                    vc_difficulty = COALESCE(VALUES(vc_difficulty), vc_difficulty)
+                """
+            ),
+            params,
+        )
+    return len(rows)
+
+
+def ensure_word_ext_many(
+    *,
+    dict_db,
+    items: List[Tuple[str, str]],
+    max_workers: int = ENRICHMENT_FETCH_CONCURRENCY,
+    generate_images: bool = True,
+    priorities: Optional[Dict[str, int]] = None,
+) -> Tuple[Dict[str, dict], Dict[str, Exception]]:
+    """
+    Fill missing word_ext fields for many (vc_id, word) pairs at once.
+    Upstream lookups run concurrently; the upserts go out as multi-row statements in one commit.
+    With generate_images=False words without a Youdao picture keep an empty image_url.
+    `priorities` (vc_id -> enrichment priority) decides who gets SiliconFlow quota first.
+    Returns (word_ext values by vc_id, errors by vc_id). A vc_id can be in both when its
+    text fields were saved but the image was skipped because an upstream was unavailable.
+    """
+    _check_dictionary_db(dict_db)
+
+    words = dict(items)
+    existing_map = _load_word_ext_rows(dict_db, list(words))
+
+    results: Dict[str, dict] = {}
+    todo: List[Tuple[str, str, dict]] = []
+    for vc_id, word in words.items():
+        existing = existing_map.get(vc_id) or {}
+        if _word_ext_complete(existing):
+            results[vc_id] = {k: existing.get(k) for k in _WORD_EXT_COLUMNS}
+        else:
+            todo.append((vc_id, word, existing))
+
+    # Payloads already fetched once are re-parsed instead of hitting Youdao again
+    cached = youdao_cache.get_many(dict_db, [word for _, word, _ in todo])
+    # Creates the table (and commits) now, before any of this batch's writes are pending
+    image_pipeline.ensure_table(dict_db)
+
+    priorities = priorities or {}
+
+    def enrich(item):
+        vc_id, word, existing = item
+        return _enrich_word(
+            word,
+            existing,
+            cached.get(youdao_cache.normalize_word(word), _NOT_CACHED),
+            generate_images,
+            priorities.get(vc_id, 0),
+        )
+
+    errors: Dict[str, Exception] = {}
+    fetched = upstream.map_concurrent(enrich, todo, max_workers)
+    written = []
+    rows = []
+    new_payloads = []
+    new_renditions = []
+    for (vc_id, word, _existing), outcome in zip(todo, fetched):
+        if isinstance(outcome, Exception):
+            errors[vc_id] = outcome
+            continue
+        values, deferred, fetched_payload, renditions = outcome
+        if fetched_payload is not None:
+            new_payloads.append((word, *fetched_payload))
+        if renditions:
+            new_renditions.append((vc_id, renditions))
+        rows.append((vc_id, values))
+        results[vc_id] = values
+        written.append(vc_id)
+        if deferred is not None:
+            # Text fields are saved; report the skipped image so the job is retried later
+            errors[vc_id] = deferred
+
+    upsert_word_ext_rows(dict_db, rows)
+    for vc_id, renditions in new_renditions:
+        image_pipeline.record_renditions(dict_db, vc_id, renditions)
+    if new_payloads:
+        try:
+            # Savepoint so a cache failure never rolls back the word_ext upserts
+            with dict_db.begin_nested():
+                youdao_cache.put_many(dict_db, new_payloads)
+        except Exception as e:
+            print(f"Youdao cache write failed: {e}")
+    if written or new_payloads:
+        dict_db.commit()
+    if written:
+        dictionary_cache.invalidate(written)
+
+    return results, errors
+
+
+def ensure_word_ext(
+    *,
+    dict_db,
+    vc_id: str,
+    word: str,
+):
+    results, errors = ensure_word_ext_many(dict_db=dict_db, items=[(vc_id, word)])
+    if vc_id in errors:
+        raise errors[vc_id]
+    return results[vc_id]
 
 
 def _safe_word_filename(word: str) -> str:
@@ -339,36 +525,28 @@ def _safe_word_filename(word: str) -> str:
     return w
 
 
-def _download_and_resize_word_image(word: str, url: str) -> str:
+def _store_word_image(word: str, url: str) -> List[dict]:
+    """Download a generated image and write its renditions under public/static/images/words."""
     try:
         safe_word = _safe_word_filename(word)
         if not safe_word:
-            return ""
+            return []
         first = safe_word[0].lower()
         if not ("a" <= first <= "z"):
             first = "other"
-        target_dir = STATIC_WORD_IMAGES_DIR / first
-        target_dir.mkdir(parents=True, exist_ok=True)
-
-        resp = requests.get(url, timeout=20)
-        if resp.status_code >= 400:
-            return ""
-        from PIL import Image
-
-        img = Image.open(BytesIO(resp.content)).convert("RGB")
-        img = img.resize((300, 300))
-        file_path = target_dir / f"{safe_word}.jpg"
-        img.save(file_path, format="JPEG", quality=85, optimize=True)
-        return f"/static/images/words/{first}/{safe_word}.jpg"
-    except Exception:
-        return ""
-
-def get_siliconflow_image(word: str, meaning: str | None = None, raise_on_rate_limit: bool = False) -> str:
-    api_key = os.getenv("SILICONFLOW_API_KEY")
-    if not api_key:
-        print("SILICONFLOW_API_KEY not found")
-        return ""
+        data = image_pipeline.download_image(url)
+        if not data:
+            return []
+        return image_pipeline.process_image(
+            data, STATIC_WORD_IMAGES_DIR / first, f"/static/images/words/{first}", safe_word
+        )
+    except UPSTREAM_UNAVAILABLE:
+        raise
+    except Exception as e:
+        print(f"Word image processing failed for {word}: {e}")
+        return []
 
+def _siliconflow_request(word: str, meaning: str | None, api_key: str) -> Tuple[dict, dict]:
     meaning_text = (meaning or "").strip()
     meaning_clause = f" with Chinese meaning '{meaning_text}'" if meaning_text else ""
     prompt = (
@@ -376,36 +554,81 @@ def get_siliconflow_image(word: str, meaning: str | None = None, raise_on_rate_l
         f"the meaning of the English word '{word}'{meaning_clause}, minimal elements, clean background, "
         "high visual clarity, easy to recognize, educational for children"
     )
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+    payload = {
+        "model": "Kwai-Kolors/Kolors",
+        "prompt": prompt,
+        "image_size": "1024x1024",
+        "batch_size": 1,
+        "response_format": "url",
+    }
+    return headers, payload
+
+def _parse_siliconflow_response(status_code: int, body: str, data, raise_on_rate_limit: bool) -> str:
+    if status_code != 200:
+        if status_code == 429 and raise_on_rate_limit:
+            raise SiliconFlowRateLimitError(body)
+        print(f"SiliconFlow API error: {status_code} - {body}")
+        return ""
+    if isinstance(data, dict):
+        if "images" in data and data["images"]:
+            item = data["images"][0]
+            if isinstance(item, dict) and item.get("url"):
+                return item["url"]
+        if "data" in data and data["data"]:
+            item = data["data"][0]
+            if isinstance(item, dict) and item.get("url"):
+                return item["url"]
+    return ""
+
+def get_siliconflow_image(word: str, meaning: str | None = None, raise_on_rate_limit: bool = False) -> str:
+    api_key = os.getenv("SILICONFLOW_API_KEY")
+    if not api_key:
+        print("SILICONFLOW_API_KEY not found")
+        return ""
+
+    headers, payload = _siliconflow_request(word, meaning, api_key)
+    try:
+        resp = upstream.post("siliconflow", SILICONFLOW_IMAGES_URL, headers=headers, json=payload)
+        data = resp.json() if resp.status_code == 200 else None
+        return _parse_siliconflow_response(resp.status_code, resp.text, data, raise_on_rate_limit)
+    except (SiliconFlowRateLimitError, *UPSTREAM_UNAVAILABLE):
+        raise
+    except Exception as e:
+        print(f"Error generating image with SiliconFlow: {e}")
+
+    return ""
 
+def generate_word_image(word: str, meaning: str | None, priority: int = 0) -> str:
+    """
+    SiliconFlow generation paced by the shared token bucket. A 429 pauses every worker with
+    backoff and is raised as ImageRateLimited so the job is requeued rather than retried inline.
+    """
+    image_scheduler.acquire(priority)
     try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}",
-        }
-        payload = {
-            "model": "Kwai-Kolors/Kolors",
-            "prompt": prompt,
-            "image_size": "1024x1024",
-            "batch_size": 1,
-            "response_format": "url",
-        }
-        resp = requests.post("https://api.siliconflow.cn/v1/images/generations", headers=headers, json=payload, timeout=30)
-        if resp.status_code != 200:
-            if resp.status_code == 429 and raise_on_rate_limit:
-                raise SiliconFlowRateLimitError(resp.text)
-            print(f"SiliconFlow API error: {resp.status_code} - {resp.text}")
-            return ""
-        data = resp.json()
-        if isinstance(data, dict):
-            if "images" in data and data["images"]:
-                item = data["images"][0]
-                if isinstance(item, dict) and item.get("url"):
-                    return item["url"]
-            if "data" in data and data["data"]:
-                item = data["data"][0]
-                if isinstance(item, dict) and item.get("url"):
-                    return item["url"]
+        url = get_siliconflow_image(word, meaning, raise_on_rate_limit=True)
+    except SiliconFlowRateLimitError:
+        raise image_scheduler.ImageRateLimited(image_scheduler.report_rate_limited())
+    image_scheduler.report_success()
+    return url
+
+async def get_siliconflow_image_async(word: str, meaning: str | None = None, raise_on_rate_limit: bool = False) -> str:
+    api_key = os.getenv("SILICONFLOW_API_KEY")
+    if not api_key:
+        print("SILICONFLOW_API_KEY not found")
+        return ""
+
+    headers, payload = _siliconflow_request(word, meaning, api_key)
+    try:
+        resp = await upstream.apost("siliconflow", SILICONFLOW_IMAGES_URL, headers=headers, json=payload)
+        data = resp.json() if resp.status_code == 200 else None
+        return _parse_siliconflow_response(resp.status_code, resp.text, data, raise_on_rate_limit)
+    except (SiliconFlowRateLimitError, *UPSTREAM_UNAVAILABLE):
+        raise
     except Exception as e:
         print(f"Error generating image with SiliconFlow: {e}")
-        
+
     return ""
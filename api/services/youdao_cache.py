@@ -0,0 +1,155 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import text, bindparam
+
+# Raw dict.youdao.com/jsonapi payloads, kept in the dictionary DB next to word_ext
+YOUDAO_CACHE_ENABLED = os.getenv("YOUDAO_CACHE_ENABLED", "1") not in {"0", "false", "False"}
+YOUDAO_CACHE_TTL_DAYS = int(os.getenv("YOUDAO_CACHE_TTL_DAYS", 180))
+# Words Youdao does not know are remembered for a shorter time in case they get added
+YOUDAO_CACHE_NEGATIVE_TTL_DAYS = int(os.getenv("YOUDAO_CACHE_NEGATIVE_TTL_DAYS", 14))
+
+_CREATE_TABLE = text(
+    """
+    CREATE TABLE IF NOT EXISTS youdao_response_cache (
+        word_key VARCHAR(100) NOT NULL,
+        found TINYINT(1) NOT NULL,
+        payload MEDIUMTEXT NULL,
+        fetched_at DATETIME NOT NULL,
+        expires_at DATETIME NOT NULL,
+        PRIMARY KEY (word_key),
+        KEY idx_youdao_response_cache_expires (expires_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """
+)
+
+_table_ready = False
+
+
+def normalize_word(word: str) -> str:
+    # Same normalization fetch_youdao_info applies to the jsonapi query
+    return (word or "").strip().lower()
+
+
+def ensure_table(dict_db) -> bool:
+    global _table_ready
+    if not YOUDAO_CACHE_ENABLED:
+        return False
+    if _table_ready:
+        return True
+    try:
+        dict_db.execute(_CREATE_TABLE)
+        dict_db.commit()
+        _table_ready = True
+    except Exception as e:
+        dict_db.rollback()
+        print(f"Youdao cache table unavailable: {e}")
+    return _table_ready
+
+
+def get_many(dict_db, words: Iterable[str]) -> Dict[str, Optional[dict]]:
+    """
+    Cached payloads keyed by normalized word. A key mapped to None is a negative entry
+    (Youdao has no dictionary entry); keys not in the result are not cached or expired.
+    """
+    keys = list(dict.fromkeys(k for k in (normalize_word(w) for w in words) if k))
+    if not keys or not ensure_table(dict_db):
+        return {}
+    try:
+        rows = dict_db.execute(
+            text(
+                """
+                SELECT word_key, found, payload
+                FROM youdao_response_cache
+                WHERE word_key IN :keys AND expires_at > :now
+                """
+            ).bindparams(bindparam("keys", expanding=True)),
+            {"keys": keys, "now": datetime.utcnow()},
+        ).fetchall()
+    except Exception as e:
+        dict_db.rollback()
+        print(f"Youdao cache read failed: {e}")
+        return {}
+
+    result: Dict[str, Optional[dict]] = {}
+    for word_key, found, payload in rows:
+        if not found:
+            result[word_key] = None
+            continue
+        try:
+            result[word_key] = json.loads(payload)
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+def put_many(dict_db, entries: Iterable[Tuple[str, dict, bool]]) -> int:
+    """
+    Store raw payloads. Each entry is (word, payload, found) where found says whether the
+    payload holds a dictionary entry. Does not commit; the caller's transaction does.
+    """
+    now = datetime.utcnow()
+    params = []
+    for word, payload, found in entries:
+        key = normalize_word(word)
+        if not key or payload is None:
+            continue
+        ttl = YOUDAO_CACHE_TTL_DAYS if found else YOUDAO_CACHE_NEGATIVE_TTL_DAYS
+        params.append(
+            {
+                "word_key": key[:100],
+                "found": 1 if found else 0,
+                "payload": json.dumps(payload, ensure_ascii=False),
+                "fetched_at": now,
+                "expires_at": now + timedelta(days=ttl),
+            }
+        )
+    # Never create the table here: callers write inside a transaction or savepoint
+    if not params or not _table_ready:
+        return 0
+    dict_db.execute(
+        text(
+            """
+            INSERT INTO youdao_response_cache (word_key, found, payload, fetched_at, expires_at)
+            VALUES (:word_key, :found, :payload, :fetched_at, :expires_at)
+            ON DUPLICATE KEY UPDATE
+                found = VALUES(found),
+                payload = VALUES(payload),
+                fetched_at = VALUES(fetched_at),
+                expires_at = VALUES(expires_at)
+            """
+        ),
+        params,
+    )
+    return len(params)
+
+
+def iter_payloads(dict_db, batch_size: int = 500, include_expired: bool = True) -> Iterator[Tuple[str, dict]]:
+    """Walk every cached positive payload, for re-parsing offline."""
+    if not ensure_table(dict_db):
+        return
+    last_key = ""
+    while True:
+        rows = dict_db.execute(
+            text(
+                """
+                SELECT word_key, payload
+                FROM youdao_response_cache
+                WHERE word_key > :last_key AND found = 1
+                    AND (:include_expired = 1 OR expires_at > :now)
+                ORDER BY word_key
+                LIMIT :limit
+                """
+            ),
+            {"last_key": last_key, "include_expired": 1 if include_expired else 0, "now": datetime.utcnow(), "limit": batch_size},
+        ).fetchall()
+        if not rows:
+            return
+        for word_key, payload in rows:
+            try:
+                yield word_key, json.loads(payload)
+            except (TypeError, ValueError):
+                continue
+        last_key = rows[-1][0]
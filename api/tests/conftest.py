@@ -0,0 +1,98 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Tests import the app as the `api` package, the way uvicorn runs it (api.main:app)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api.database import Base  # noqa: E402
+from api import models  # noqa: E402,F401
+
+
+# SQLite stand-ins for the dictionary DB tables the entry cache joins
+DICTIONARY_TABLES = (
+    "CREATE TABLE word (vc_id TEXT PRIMARY KEY, vc_vocabulary TEXT, vc_phonetic_us TEXT, vc_phonetic_uk TEXT)",
+    "CREATE TABLE word_translation (vc_id TEXT PRIMARY KEY, translation TEXT)",
+    "CREATE TABLE word_ext (vc_id TEXT PRIMARY KEY, youdao_translation TEXT, image_url TEXT, audio_us_url TEXT, audio_uk_url TEXT, example TEXT)",
+    "CREATE TABLE word_image_renditions (vc_id TEXT, name TEXT, url TEXT, format TEXT, width INT, height INT, bytes INT, content_hash TEXT, created_at TIMESTAMP)",
+)
+
+
+class QueryCounter:
+    """Counts statements sent to the watched engines; reset `count` before the part under test."""
+
+    def __init__(self, *engines):
+        self.count = 0
+        for e in engines:
+            self.watch(e)
+
+    def watch(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def _memory_engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+@pytest.fixture
+def engine():
+    """A fresh in-memory database with every table, shared by all sessions of one test."""
+    engine = _memory_engine()
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def query_counter(engine):
+    return QueryCounter(engine)
+
+
+@pytest.fixture
+def dict_db(monkeypatch):
+    """A session on an in-memory dictionary DB, with an empty entry cache."""
+    from api.services import dictionary_cache, image_pipeline
+
+    engine = _memory_engine()
+    with engine.begin() as conn:
+        for ddl in DICTIONARY_TABLES:
+            conn.execute(text(ddl))
+    # The MySQL DDL in ensure_table does not parse on SQLite; the table was created above
+    monkeypatch.setattr(image_pipeline, "_table_ready", True)
+    dictionary_cache.entry_cache.clear()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    dictionary_cache.entry_cache.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def child(db):
+    """A parent with one child, committed."""
+    parent = models.Parent(phone="13800000000", password_hash="x", username="parent")
+    db.add(parent)
+    db.flush()
+    child = models.Child(parent_id=parent.id, nickname="kid")
+    db.add(child)
+    db.commit()
+    return child
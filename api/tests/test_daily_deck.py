@@ -0,0 +1,30 @@
+from datetime import date, datetime
+
+from api import models
+from api.services import daily_deck
+
+DAY = date(2024, 5, 1)
+
+
+def _children(db, reminders):
+    parent = models.Parent(phone="13800000003", username="p", password_hash="x")
+    db.add(parent)
+    db.flush()
+    children = []
+    for i, reminder in enumerate(reminders):
+        settings = {"daily_words": 20} if reminder is None else {"daily_words": 20, "reminder_time": reminder}
+        child = models.Child(parent_id=parent.id, nickname=f"c{i}", settings=settings)
+        db.add(child)
+        children.append(child)
+    db.commit()
+    return children
+
+
+def test_children_needing_decks_orders_by_reminder_and_limits_in_sql(db):
+    late, early, default, fresh, stale = _children(db, ["21:30", "07:45", None, "06:00", "08:00"])
+    db.add(models.DailyDeck(child_id=fresh.id, deck_date=DAY, word_ids=[], words=[], daily_words=20, stale=False, generated_at=datetime(2024, 5, 1)))
+    db.add(models.DailyDeck(child_id=stale.id, deck_date=DAY, word_ids=[], words=[], daily_words=20, stale=True, generated_at=datetime(2024, 5, 1)))
+    db.commit()
+
+    assert [c.id for c in daily_deck.children_needing_decks(db, DAY, 10)] == [early.id, stale.id, default.id, late.id]
+    assert [c.id for c in daily_deck.children_needing_decks(db, DAY, 2)] == [early.id, stale.id]
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import event, text
+
+from api.services import dictionary_cache, redis_client
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client, "get_redis", lambda: client)
+    return client
+
+
+@pytest.fixture
+def cache(dict_db):
+    dict_db.execute(text("INSERT INTO word (vc_id, vc_vocabulary) VALUES ('vc1', 'apple')"))
+    dict_db.commit()
+    return dictionary_cache.DictionaryEntryCache()
+
+
+def _invalidate_during_next_read(dict_db, cache):
+    fired = []
+
+    def invalidate(*args, **kwargs):
+        if not fired:
+            fired.append(True)
+            cache.invalidate(["vc1"])
+
+    event.listen(dict_db.get_bind(), "before_cursor_execute", invalidate)
+    return fired
+
+
+def test_entries_are_cached_in_both_tiers(dict_db, cache, redis):
+    assert cache.get_many(dict_db, ["vc1"])["vc1"]["vc_vocabulary"] == "apple"
+
+    assert redis.get(dictionary_cache._entry_key("vc1")) is not None
+    assert cache.get_many(dict_db, ["vc1"])["vc1"]["vc_vocabulary"] == "apple"
+    assert cache.local_hits == 1
+
+
+def test_invalidation_during_a_db_read_wins(dict_db, cache, redis):
+    fired = _invalidate_during_next_read(dict_db, cache)
+
+    assert cache.get_many(dict_db, ["vc1"])["vc1"]["vc_vocabulary"] == "apple"
+
+    assert fired
+    # The payload read before the invalidation is not cached anywhere
+    assert redis.get(dictionary_cache._entry_key("vc1")) is None
+    assert "vc1" not in cache._entries
+    # The next read caches again
+    cache.get_many(dict_db, ["vc1"])
+    assert redis.get(dictionary_cache._entry_key("vc1")) is not None
+    assert "vc1" in cache._entries
+
+
+def test_invalidation_from_another_process_wins(dict_db, cache, redis):
+    other = dictionary_cache.DictionaryEntryCache()
+    fired = []
+
+    def invalidate(*args, **kwargs):
+        if not fired:
+            fired.append(True)
+            other.invalidate(["vc1"])
+
+    event.listen(dict_db.get_bind(), "before_cursor_execute", invalidate)
+
+    cache.get_many(dict_db, ["vc1"])
+
+    assert fired
+    assert redis.get(dictionary_cache._entry_key("vc1")) is None
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from api import models
+from api.services import enrichment_queue
+
+
+def _running_job(db, vc_id: str, claimed_at):
+    job = models.WordEnrichmentJob(vc_id=vc_id, word=vc_id, status="running", attempts=1, claimed_at=claimed_at)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_recover_stale_jobs_leaves_recently_claimed_jobs_running(db, session_factory):
+    now = datetime.utcnow()
+    _running_job(db, "live", now - timedelta(seconds=5))
+    _running_job(db, "dead", now - timedelta(seconds=enrichment_queue.ENRICHMENT_STALE_SECONDS + 60))
+
+    assert enrichment_queue.recover_stale_jobs(session_factory) == 1
+
+    db.expire_all()
+    statuses = {job.vc_id: job.status for job in db.query(models.WordEnrichmentJob)}
+    assert statuses == {"live": "running", "dead": "queued"}
+
+
+def test_claim_records_claimed_at(db):
+    db.add(models.WordEnrichmentJob(vc_id="v1", word="apple", status="queued", next_attempt_at=datetime.utcnow()))
+    db.commit()
+
+    jobs = enrichment_queue._claim_jobs(db, 1)
+
+    assert [job.vc_id for job in jobs] == ["v1"]
+    assert jobs[0].status == "running"
+    assert jobs[0].claimed_at is not None
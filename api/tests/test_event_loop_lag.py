@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from api import deps, models
+from api.database import Base, get_db, get_dictionary_db
+from api.routers import media, words
+from api.services import dictionary_cache, image_pipeline, transcription_queue
+
+from .conftest import DICTIONARY_TABLES
+
+# Every simulated upstream (dictionary DB) call takes this long
+SLOW_SECONDS = 0.3
+CONCURRENCY = 8
+# Anything near one upstream call means a request held the loop
+MAX_LAG_SECONDS = SLOW_SECONDS / 2
+
+
+@pytest.fixture
+def lag_app(tmp_path, monkeypatch):
+    # File databases with a real pool: each worker thread gets its own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+    dict_engine = create_engine(f"sqlite:///{tmp_path / 'dict.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    with dict_engine.begin() as conn:
+        for ddl in DICTIONARY_TABLES:
+            conn.execute(text(ddl))
+        for i in range(CONCURRENCY):
+            conn.execute(text("INSERT INTO word (vc_id, vc_vocabulary) VALUES (:v, :w)"), {"v": f"vc{i}", "w": f"word{i}"})
+            conn.execute(
+                text("INSERT INTO word_ext (vc_id, image_url, audio_us_url, audio_uk_url, example) VALUES (:v, '/i', '/a', '/a', 'e')"),
+                {"v": f"vc{i}"},
+            )
+    event.listen(dict_engine, "before_cursor_execute", lambda *args, **kwargs: time.sleep(SLOW_SECONDS))
+    monkeypatch.setattr(image_pipeline, "_table_ready", True)
+    monkeypatch.setattr(transcription_queue, "TRANSCRIBE_SPOOL_DIR", str(tmp_path / "spool"))
+    dictionary_cache.entry_cache.clear()
+
+    Session = sessionmaker(bind=engine)
+    DictSession = sessionmaker(bind=dict_engine)
+    with Session() as db:
+        parent = models.Parent(phone="13800000002", username="lag", password_hash="x")
+        db.add(parent)
+        db.commit()
+        parent_id = parent.id
+
+    def main_db():
+        with Session() as db:
+            yield db
+
+    def dict_db():
+        with DictSession() as db:
+            yield db
+
+    def current_user():
+        with Session() as db:
+            return db.get(models.Parent, parent_id)
+
+    app = FastAPI()
+    app.include_router(words.router)
+    app.include_router(media.router)
+
+    @app.get("/control/blocking")
+    async def blocking_control():
+        # What the fixed routes used to do: sync work inside async def
+        time.sleep(SLOW_SECONDS)
+        return {}
+
+    app.dependency_overrides[get_db] = main_db
+    app.dependency_overrides[get_dictionary_db] = dict_db
+    app.dependency_overrides[deps.get_current_user] = current_user
+    yield app
+    dictionary_cache.entry_cache.clear()
+    engine.dispose()
+    dict_engine.dispose()
+
+
+async def _max_loop_lag(app, request, interval: float = 0.005) -> float:
+    """Max delay of a periodic timer on the event loop while CONCURRENCY requests run."""
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal lag
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(lag, time.perf_counter() - start - interval)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://lag") as client:
+        tick = asyncio.create_task(ticker())
+        await asyncio.sleep(interval * 2)
+        responses = await asyncio.gather(*[request(client, i) for i in range(CONCURRENCY)])
+        done.set()
+        await tick
+    assert [r.status_code for r in responses if r.status_code >= 400] == []
+    return lag
+
+
+def test_probe_detects_a_blocked_loop(lag_app):
+    lag = asyncio.run(_max_loop_lag(lag_app, lambda c, i: c.get("/control/blocking")))
+
+    assert lag >= SLOW_SECONDS * 0.9
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        pytest.param(lambda c, i: c.get("/api/words/search", params={"word": f"word{i}"}), id="words_search"),
+        pytest.param(lambda c, i: c.post("/api/words/", json={"word": f"word{i}"}), id="words_create"),
+        # Only enqueues; the transcription itself runs in api.tools.transcription_worker
+        pytest.param(
+            lambda c, i: c.post("/api/media/transcribe", files={"file": ("a.mp3", b"\0" * 1024, "audio/mpeg")}),
+            id="media_transcribe",
+        ),
+    ],
+)
+def test_routes_do_not_block_the_event_loop(lag_app, request_):
+    lag = asyncio.run(_max_loop_lag(lag_app, request_))
+
+    assert lag < MAX_LAG_SECONDS, f"event loop held for {lag * 1000:.0f}ms"
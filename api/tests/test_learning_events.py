@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from api import models, schemas
+from api.services import learning_events, time_ranges
+
+
+@pytest.fixture
+def words(db, child):
+    words = [models.Word(parent_id=child.parent_id, dict_vc_id=f"vc{i}") for i in range(2)]
+    db.add_all(words)
+    db.flush()
+    resource = models.MediaResource(filename="clip.mp4", media_type="video", url="/m/clip")
+    db.add(resource)
+    db.flush()
+    db.add(models.ChildMediaPlanItem(child_id=child.id, resource_id=resource.id, module="video"))
+    db.commit()
+    return words, resource
+
+
+def _batch(words, resource, at: datetime) -> schemas.LearningEventBatch:
+    return schemas.LearningEventBatch(
+        word_results=[
+            schemas.WordResultEvent(event_id="w1", word_id=words[0].id, result="remembered", time_spent=4, occurred_at=at),
+            schemas.WordResultEvent(event_id="w2", word_id=words[1].id, result="forgot", time_spent=6, occurred_at=at),
+        ],
+        media_sessions=[
+            schemas.MediaSessionEvent(
+                event_id="m1", resource_id=resource.id, module="video", started_at=at,
+                duration_seconds=90, completion_percent=100,
+            )
+        ],
+    )
+
+
+def _snapshot(db) -> dict:
+    activity = db.query(models.ChildDailyActivity).one()
+    return {
+        "records": db.query(models.LearningRecord).count(),
+        "sessions": db.query(models.MediaLearningSession).count(),
+        "receipts": db.query(models.LearningEventReceipt).count(),
+        "mastery": sorted((m.word_id, m.attempts, m.last_result) for m in db.query(models.WordMastery).all()),
+        "activity": (
+            activity.words_total, activity.words_remembered, activity.word_seconds,
+            activity.video_sessions, activity.video_seconds,
+        ),
+    }
+
+
+def test_replayed_batch_changes_nothing(db, child, words):
+    batch = _batch(*words, datetime.now(timezone.utc) - timedelta(hours=1))
+
+    first = learning_events.ingest(db, child, batch)
+    assert (first.accepted, first.duplicates, first.rejected) == (3, 0, [])
+    stored = _snapshot(db)
+    assert stored["records"] == 2 and stored["sessions"] == 1 and stored["receipts"] == 3
+    assert [attempts for _, attempts, _ in stored["mastery"]] == [1, 1]
+    assert stored["activity"] == (2, 1, 10.0, 1, 90)
+
+    replay = learning_events.ingest(db, child, batch)
+    assert (replay.accepted, replay.duplicates) == (0, 3)
+    assert _snapshot(db) == stored
+
+
+def test_rollup_adds_up_across_batches(db, child, words):
+    at = datetime.now(timezone.utc) - timedelta(hours=1)
+    learning_events.ingest(db, child, _batch(*words, at))
+    word = words[0][0]
+    more = schemas.LearningEventBatch(
+        word_results=[schemas.WordResultEvent(event_id="w3", word_id=word.id, result="remembered", time_spent=2, occurred_at=at)]
+    )
+    assert learning_events.ingest(db, child, more).accepted == 1
+    assert _snapshot(db)["activity"] == (3, 2, 12.0, 1, 90)
+
+
+def test_duplicate_event_ids_within_a_batch_count_once(db, child, words):
+    word = words[0][0]
+    at = datetime.now(timezone.utc)
+    event = schemas.WordResultEvent(event_id="w1", word_id=word.id, result="remembered", occurred_at=at)
+    result = learning_events.ingest(db, child, schemas.LearningEventBatch(word_results=[event, event]))
+
+    assert (result.accepted, result.duplicates) == (1, 1)
+    assert db.query(models.LearningRecord).count() == 1
+
+
+def test_unknown_word_and_too_old_events_are_rejected(db, child, words):
+    word = words[0][0]
+    now = datetime.now(timezone.utc)
+    too_old = now - timedelta(days=learning_events.LEARNING_EVENT_MAX_AGE_DAYS + 1)
+    batch = schemas.LearningEventBatch(
+        word_results=[
+            schemas.WordResultEvent(event_id="w1", word_id="no-such-word", result="remembered", occurred_at=now),
+            schemas.WordResultEvent(event_id="w2", word_id=word.id, result="remembered", occurred_at=too_old),
+            schemas.WordResultEvent(event_id="w3", word_id=word.id, result="maybe", occurred_at=now),
+        ]
+    )
+    result = learning_events.ingest(db, child, batch)
+
+    assert result.accepted == 0
+    assert [(r.event_id, r.reason) for r in result.rejected] == [
+        ("w1", "word not found"),
+        ("w2", "event too old"),
+        ("w3", "invalid result"),
+    ]
+    assert db.query(models.LearningEventReceipt).count() == 0
+    assert db.query(models.LearningRecord).count() == 0
+
+
+def test_future_timestamps_are_clamped(db, child, words):
+    word = words[0][0]
+    now = datetime.now(timezone.utc)
+    event = schemas.WordResultEvent(event_id="w1", word_id=word.id, result="remembered", occurred_at=now + timedelta(days=2))
+    learning_events.ingest(db, child, schemas.LearningEventBatch(word_results=[event]))
+
+    latest = time_ranges.to_db(now + timedelta(seconds=learning_events.LEARNING_EVENT_CLOCK_SKEW_SECONDS + 5))
+    assert db.query(models.LearningRecord).one().created_at.replace(tzinfo=None) <= latest.replace(tzinfo=None)
+
+
+def test_concurrent_retry_is_resolved_by_the_receipt_key(db, child, words, monkeypatch):
+    batch = _batch(*words, datetime.now(timezone.utc) - timedelta(hours=1))
+    learning_events.ingest(db, child, batch)
+    stored = _snapshot(db)
+
+    # The other request committed its receipts after this one looked them up
+    seen = learning_events._seen_event_ids
+    calls = []
+
+    def racing_lookup(*args):
+        calls.append(args)
+        return set() if len(calls) == 1 else seen(*args)
+
+    monkeypatch.setattr(learning_events, "_seen_event_ids", racing_lookup)
+    result = learning_events.ingest(db, child, batch)
+
+    assert len(calls) == 2
+    assert (result.accepted, result.duplicates) == (0, 3)
+    assert _snapshot(db) == stored
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from api import models
+from api.routers.learning import get_learning_history_detail
+
+
+def _add_day(db, dict_db, parent, child, size: int) -> None:
+    day = datetime(2024, 5, 1, 9, 0)
+    for i in range(size):
+        vc_id = f"vc{size}-{i}"
+        dict_db.execute(text("INSERT INTO word (vc_id, vc_vocabulary) VALUES (:v, :w)"), {"v": vc_id, "w": f"word{i}"})
+        word = models.Word(parent_id=parent.id, dict_vc_id=vc_id)
+        db.add(word)
+        db.flush()
+        db.add(models.LearningRecord(child_id=child.id, word_id=word.id, result="remembered", time_spent=5, created_at=day))
+
+        resource = models.MediaResource(filename=f"clip{size}-{i}.mp4", media_type="video", url=f"/m/{size}/{i}")
+        db.add(resource)
+        db.flush()
+        db.add(
+            models.MediaLearningSession(
+                child_id=child.id, module="video" if i % 2 else "audio", resource_id=resource.id,
+                duration_seconds=60, started_at=day,
+            )
+        )
+    db.commit()
+    dict_db.commit()
+
+
+@pytest.mark.parametrize("size", [1, 10, 100])
+def test_history_detail_query_count_does_not_grow_with_the_day(db, dict_db, child, query_counter, size):
+    parent = db.query(models.Parent).one()
+    _add_day(db, dict_db, parent, child, size)
+    query_counter.watch(dict_db.get_bind())
+    query_counter.count = 0
+
+    detail = get_learning_history_detail("2024-05-01", current_user=parent, db=db, dict_db=dict_db)
+
+    assert len(detail["records"]) == size
+    assert all(r["word"] != "Unknown" for r in detail["records"])
+    assert len(detail["video_sessions"]) + len(detail["audio_sessions"]) == size
+    # Parent's child, records, sessions, words, dictionary entries, image renditions, media titles
+    assert query_counter.count == 7
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import models
+from api.database import Base
+from api.services import media_progress
+
+THREADS = 8
+FINISHES = 25
+
+
+@pytest.fixture
+def file_session_factory(tmp_path):
+    # A file database so every thread gets its own connection and real locking
+    engine = create_engine(f"sqlite:///{tmp_path / 'progress.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _child(Session, auto_upgrade: bool) -> str:
+    with Session() as db:
+        parent = models.Parent(phone="13800000001", username="p", password_hash="x")
+        db.add(parent)
+        db.flush()
+        child = models.Child(parent_id=parent.id, nickname="c", settings={"auto_upgrade_media_difficulty": auto_upgrade})
+        db.add(child)
+        db.commit()
+        return child.id
+
+
+def _finish_in_parallel(Session, child_id: str, completion_percent: float) -> list:
+    errors = []
+
+    def worker():
+        for _ in range(FINISHES):
+            with Session() as db:
+                try:
+                    child = db.query(models.Child).filter(models.Child.id == child_id).one()
+                    progress = media_progress.get_or_create(db, child_id=child_id, module="video")
+                    media_progress.apply_session(
+                        db, progress, child, duration_seconds=60, completion_percent=completion_percent, completed_count=1
+                    )
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    errors.append(e)
+
+    pool = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return errors
+
+
+def test_parallel_finishes_lose_no_updates(file_session_factory):
+    child_id = _child(file_session_factory, auto_upgrade=False)
+
+    errors = _finish_in_parallel(file_session_factory, child_id, completion_percent=50)
+
+    assert errors == []
+    with file_session_factory() as db:
+        rows = db.query(models.ChildMediaProgress).filter(models.ChildMediaProgress.child_id == child_id).all()
+        assert len(rows) == 1
+        progress = rows[0]
+        assert progress.total_session_count == THREADS * FINISHES
+        assert progress.total_completed_count == THREADS * FINISHES
+        assert progress.total_seconds == THREADS * FINISHES * 60
+        assert progress.completion_percent_sum == pytest.approx(THREADS * FINISHES * 50)
+
+
+def test_parallel_eligible_finishes_upgrade_once_per_threshold(file_session_factory):
+    child_id = _child(file_session_factory, auto_upgrade=True)
+
+    errors = _finish_in_parallel(file_session_factory, child_id, completion_percent=90)
+
+    assert errors == []
+    with file_session_factory() as db:
+        progress = db.query(models.ChildMediaProgress).filter(models.ChildMediaProgress.child_id == child_id).one()
+        # 200 eligible finishes: three upgrades take level 1 to the maximum, the rest keep counting
+        assert progress.current_difficulty_level == media_progress.MAX_DIFFICULTY_LEVEL
+        assert progress.eligible_completion_count == THREADS * FINISHES - 3 * media_progress.UPGRADE_AFTER_ELIGIBLE
@@ -0,0 +1,71 @@
+import pytest
+
+from api import models, schemas
+from api.routers.learning import get_learning_history_dates, record_learning_result
+from api.routers.media import finish_media_session, get_media_report_summary
+from api.services import media_rollup, redis_client, response_cache
+
+
+@pytest.fixture
+def local_cache(monkeypatch):
+    """The in-process fallback, as every worker runs it while Redis is down."""
+    monkeypatch.setattr(redis_client, "get_redis", lambda: None)
+    cache = response_cache.ResponseCache()
+    monkeypatch.setattr(response_cache, "response_cache", cache)
+    return cache
+
+
+def test_finish_invalidates_media_report_summary(db, child, local_cache):
+    parent = db.query(models.Parent).one()
+    resource = models.MediaResource(filename="clip.mp4", media_type="video", url="/m/clip")
+    db.add(resource)
+    db.flush()
+    session = models.MediaLearningSession(child_id=child.id, module="video", resource_id=resource.id, duration_seconds=0)
+    db.add(session)
+    db.flush()
+    media_rollup.session_started(db, session)
+    db.commit()
+
+    before = get_media_report_summary("week", "video", current_user=parent, db=db)
+    assert before.total_minutes == 0
+    assert local_cache.stats()["local_size"] == 1
+
+    req = schemas.MediaLearningSessionFinishRequest(duration_seconds=120, completion_percent=100)
+    finish_media_session(session.id, req, current_child=child, db=db)
+
+    assert local_cache.stats()["local_size"] == 0
+    assert get_media_report_summary("week", "video", current_user=parent, db=db).total_minutes == 2.0
+
+
+def test_record_invalidates_history_dates(db, child, local_cache):
+    parent = db.query(models.Parent).one()
+    word = models.Word(parent_id=parent.id, dict_vc_id="vc1")
+    db.add(word)
+    db.commit()
+
+    assert get_learning_history_dates(current_user=parent, db=db) == []
+    assert local_cache.stats()["local_size"] == 1
+
+    record = schemas.LearningRecordCreate(word_id=word.id, result="remembered", time_spent=5)
+    record_learning_result(record, current_user=parent, db=db)
+
+    assert local_cache.stats()["local_size"] == 0
+    dates = get_learning_history_dates(current_user=parent, db=db)
+    assert [d["total_words"] for d in dates] == [1]
+
+
+def test_local_entries_expire_after_the_local_ttl(monkeypatch):
+    monkeypatch.setattr(redis_client, "get_redis", lambda: None)
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = response_cache.ResponseCache(ttl=600, local_ttl=30)
+
+    cache.set("c1", response_cache.HISTORY, "f", "[]")
+    now[0] += 29
+    assert cache.get("c1", response_cache.HISTORY, "f") == "[]"
+    now[0] += 2
+    assert cache.get("c1", response_cache.HISTORY, "f") is None
+
+    uncached = response_cache.ResponseCache(ttl=600, local_ttl=0)
+    uncached.set("c1", response_cache.HISTORY, "f", "[]")
+    assert uncached.get("c1", response_cache.HISTORY, "f") is None
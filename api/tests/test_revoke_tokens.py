@@ -0,0 +1,59 @@
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from jose import jwt
+
+from api import security
+from api.services import principals, redis_client
+from api.tools import revoke_tokens
+
+
+def test_revoke_without_redis_exits_non_zero(monkeypatch):
+    monkeypatch.setattr(redis_client, "get_redis", lambda: None)
+    monkeypatch.setattr(principals, "principal_cache", principals.PrincipalCache())
+
+    with pytest.raises(SystemExit) as exc:
+        revoke_tokens.revoke(dry_run=False, parent_id="parent-1")
+    assert exc.value.code != 0
+
+    assert revoke_tokens.revoke(dry_run=True, parent_id="parent-1") == "parent-1"
+
+
+def test_revoke_is_written_to_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client, "get_redis", lambda: client)
+    monkeypatch.setattr(principals, "principal_cache", principals.PrincipalCache())
+
+    assert revoke_tokens.revoke(dry_run=False, parent_id="parent-1") == "parent-1"
+    assert principals.PrincipalCache().revoked_before("parent-1") > 0
+
+
+def test_revocation_rejects_tokens_from_the_same_second(monkeypatch):
+    monkeypatch.setattr(redis_client, "get_redis", lambda: None)
+    monkeypatch.setattr(principals, "principal_cache", principals.PrincipalCache())
+    monkeypatch.setattr(principals, "time", SimpleNamespace(time=lambda: 1000.5, monotonic=time.monotonic))
+    principals.principal_cache.revoke("parent-1")
+
+    def current(iat):
+        return principals.is_current({"pwv": "v1", "iat": iat}, "parent-1", "v1")
+
+    assert not current(1000)  # whole-second iat of a token minted at 1000.4
+    assert not current(1000.4)
+    assert not current(1000.5)
+    assert current(1000.6)
+
+
+def test_tokens_carry_sub_second_iat(monkeypatch):
+    class FixedDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return cls(2026, 1, 1, 0, 0, 0, 500000)
+
+    monkeypatch.setattr(security, "datetime", FixedDatetime)
+    token = security.create_access_token({"sub": "13800000000"})
+    payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM], options={"verify_exp": False})
+
+    assert payload["iat"] == datetime(2026, 1, 1, 0, 0, 0, 500000, tzinfo=timezone.utc).timestamp()
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+from api import models
+from api.services import spaced_repetition, time_ranges
+
+
+def _word(db, child) -> models.Word:
+    word = models.Word(parent_id=child.parent_id, dict_vc_id="vc1")
+    db.add(word)
+    db.flush()
+    return word
+
+
+def test_replay_history_stores_utc_like_live_results(db, child):
+    word = _word(db, child)
+    reviewed = datetime(2026, 3, 1, 12, 0)  # naive UTC, as record_result receives it
+    stored = time_ranges.to_db(reviewed.replace(tzinfo=timezone.utc))
+    db.add(models.LearningRecord(child_id=child.id, word_id=word.id, result="remembered", created_at=stored))
+    db.commit()
+
+    spaced_repetition.replay_history(db, child)
+    db.flush()
+    replayed = db.query(models.WordMastery).one()
+    assert replayed.last_reviewed_at.replace(tzinfo=None) == reviewed
+    assert replayed.due_at.replace(tzinfo=None) == reviewed + timedelta(days=1)
+
+    # A live result from before the replayed one is recognised as older and skipped
+    spaced_repetition.record_results(db, child.id, [(word.id, "forgot", reviewed - timedelta(hours=1))])
+    assert replayed.last_result == "remembered"
+
+
+def test_seed_child_converts_word_created_at_to_utc(db, child):
+    word = _word(db, child)
+    word.created_at = datetime(2026, 3, 1, 20, 0)  # DB_TIMEZONE
+    db.commit()
+
+    spaced_repetition.seed_child(db, child)
+    db.flush()
+
+    mastery = db.query(models.WordMastery).one()
+    assert mastery.due_at.replace(tzinfo=None) == time_ranges.to_utc(datetime(2026, 3, 1, 20, 0))
@@ -0,0 +1,78 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, literal_column, select, text
+
+from api import models
+from api.services import time_ranges
+
+LEARNING_INDEX = "ix_learning_records_child_created"
+MEDIA_INDEX = "ix_media_sessions_child_module_started"
+
+
+def _literal(value: datetime):
+    return literal_column(f"'{value.strftime('%Y-%m-%d %H:%M:%S')}'")
+
+
+def _plan(db, stmt) -> str:
+    sql = str(stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+    return " | ".join(r.detail for r in db.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+
+def test_day_range_is_half_open_and_contiguous():
+    start, end = time_ranges.day_range("2024-04-30")
+    next_start, _ = time_ranges.day_range(date(2024, 5, 1))
+
+    assert end - start == timedelta(days=1)
+    assert end == next_start
+    assert time_ranges.local_date(start) == date(2024, 4, 30)
+    assert time_ranges.local_date(end - timedelta(microseconds=1)) == date(2024, 4, 30)
+    assert time_ranges.days_range(date(2024, 4, 28), date(2024, 4, 30)) == (
+        time_ranges.day_range("2024-04-28")[0],
+        end,
+    )
+
+
+def test_day_range_rejects_malformed_dates():
+    with pytest.raises(ValueError):
+        time_ranges.day_range("2024-13-01")
+
+
+def test_between_includes_start_and_excludes_end(db, child):
+    word = models.Word(parent_id=child.parent_id, dict_vc_id="vc")
+    db.add(word)
+    db.flush()
+    start, end = time_ranges.day_range("2024-04-30")
+    for i, moment in enumerate((start - timedelta(seconds=1), start, end - timedelta(seconds=1), end)):
+        db.add(models.LearningRecord(id=f"lr{i}", child_id=child.id, word_id=word.id, result="remembered", created_at=moment))
+    db.commit()
+
+    rows = (
+        db.query(models.LearningRecord.id)
+        .filter(time_ranges.between(models.LearningRecord.created_at, (start, end)))
+        .order_by(models.LearningRecord.id)
+        .all()
+    )
+
+    assert [r.id for r in rows] == ["lr1", "lr2"]
+
+
+def test_range_filters_use_the_composite_indexes(db):
+    lr, ms = models.LearningRecord, models.MediaLearningSession
+    start, end = time_ranges.day_range("2024-04-30")
+    bounds = (_literal(start), _literal(end))
+
+    learning = _plan(db, select(lr.id).where(lr.child_id == "c0", time_ranges.between(lr.created_at, bounds)))
+    media = _plan(
+        db,
+        select(ms.id).where(
+            ms.child_id == "c0", ms.module.in_(("video", "audio")), time_ranges.between(ms.started_at, bounds)
+        ),
+    )
+    wrapped = _plan(db, select(lr.id).where(lr.child_id == "c0", func.date(lr.created_at) == "2024-04-30"))
+
+    # e.g. SEARCH learning_records USING INDEX ix_... (child_id=? AND created_at>? AND created_at<?)
+    assert LEARNING_INDEX in learning and "created_at>" in learning
+    assert MEDIA_INDEX in media and "started_at>" in media
+    # Wrapping the column in date() leaves only the child_id prefix usable
+    assert "created_at>" not in wrapped
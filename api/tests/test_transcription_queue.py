@@ -0,0 +1,90 @@
+import pytest
+
+from api import models
+from api.services import time_ranges, transcription_queue
+
+CONFIG_VERSION = "test:fake"
+
+
+@pytest.fixture(autouse=True)
+def subtitles_dir(tmp_path, monkeypatch):
+    # Keep the SRTs the worker writes out of public/subtitles
+    monkeypatch.setattr(transcription_queue, "PUBLIC_SUBTITLES_DIR", str(tmp_path / "subtitles"))
+
+
+@pytest.fixture
+def transcriber():
+    calls = []
+
+    def transcribe(path, progress=None):
+        calls.append(path)
+        return f"1\n00:00:00,000 --> 00:00:01,000\nrun {len(calls)}\n"
+
+    transcribe.calls = calls
+    return transcribe
+
+
+def _media(db, tmp_path, name: str, content: bytes, pair_key=None) -> models.MediaResource:
+    path = tmp_path / name
+    path.write_bytes(content)
+    media = models.MediaResource(directory="S1", filename=name, media_type="video", url=f"file://{path}", pair_key=pair_key)
+    db.add(media)
+    db.commit()
+    return media
+
+
+def _run(session_factory, media: models.MediaResource, transcribe, force: bool = False) -> str:
+    with session_factory() as db:
+        db.add(
+            models.TranscriptionJob(
+                media_id=media.id,
+                source_path=media.url,
+                active_key=transcription_queue.media_active_key(media.id),
+                force=force,
+                next_attempt_at=time_ranges.db_now(),
+            )
+        )
+        db.commit()
+        job_id = transcription_queue.claim(db, "test:1")
+    assert transcription_queue.run_job(session_factory, job_id, transcribe, CONFIG_VERSION) == "done"
+    with session_factory() as db:
+        job = transcription_queue.get(db, job_id)
+        with open(job.srt_path, encoding="utf-8") as f:
+            return f.read()
+
+
+def test_paired_media_reuse_one_transcript(db, session_factory, tmp_path, transcriber):
+    video = _media(db, tmp_path, "ep.mp4", b"video bytes", pair_key="S1::ep")
+    audio = _media(db, tmp_path, "ep.mp3", b"audio bytes", pair_key="S1::ep")
+
+    assert _run(session_factory, video, transcriber) == _run(session_factory, audio, transcriber)
+    assert len(transcriber.calls) == 1
+
+
+def test_force_skips_the_transcript_store_and_replaces_it(db, session_factory, tmp_path, transcriber):
+    media = _media(db, tmp_path, "ep.mp4", b"video bytes")
+    copy = _media(db, tmp_path, "copy.mp4", b"video bytes")
+
+    first = _run(session_factory, media, transcriber)
+    redone = _run(session_factory, media, transcriber, force=True)
+
+    assert redone != first
+    assert len(transcriber.calls) == 2
+    # The redone transcript is what duplicates get from now on
+    assert _run(session_factory, copy, transcriber) == redone
+    assert len(transcriber.calls) == 2
+
+
+def test_replaced_file_does_not_reuse_its_pair_transcript(db, session_factory, tmp_path, transcriber):
+    video = _media(db, tmp_path, "ep.mp4", b"old video", pair_key="S1::ep")
+    audio = _media(db, tmp_path, "ep.mp3", b"audio bytes", pair_key="S1::ep")
+    first = _run(session_factory, video, transcriber)
+
+    (tmp_path / "ep.mp4").write_bytes(b"new video")
+    replaced = _run(session_factory, video, transcriber)
+
+    assert replaced != first
+    assert len(transcriber.calls) == 2
+    # The twin now gets the transcript of the new file
+    assert _run(session_factory, audio, transcriber) == replaced
+    assert len(transcriber.calls) == 2
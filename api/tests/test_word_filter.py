@@ -0,0 +1,49 @@
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from api.services import word_filter
+
+
+def _insert(dict_db, vc_id, vocabulary):
+    dict_db.execute(
+        text("INSERT INTO word (vc_id, vc_vocabulary) VALUES (:vc_id, :vocab)"), {"vc_id": vc_id, "vocab": vocabulary}
+    )
+    dict_db.commit()
+
+
+def test_build_add_and_definitely_missing():
+    target = word_filter.WordFilter()
+    assert not target.definitely_missing("apple")
+
+    assert target.build(["Apple", "café ", ""]) == 2
+    assert not target.definitely_missing("apple")
+    assert not target.definitely_missing("CAFE")
+    assert target.definitely_missing("banana")
+
+    target.add(["Banana"])
+    assert not target.definitely_missing("banana")
+    assert target.stats()["rejected"] == 1
+
+
+def test_add_during_load_survives_the_swap():
+    target = word_filter.WordFilter()
+    target.build(["apple"])
+    target.begin_load()
+    # A refresh lands after load() read the table but before it swaps the new filter in
+    target.add(["banana"])
+    target.build(["apple"])
+    assert not target.definitely_missing("banana")
+
+
+def test_reload_if_changed_picks_up_imported_words(dict_db):
+    factory = sessionmaker(bind=dict_db.get_bind())
+    target = word_filter.WordFilter()
+    _insert(dict_db, "vc1", "apple")
+    word_filter.load(target, factory)
+    assert not word_filter.reload_if_changed(target, factory)
+
+    # An import outside the API publishes no invalidation
+    _insert(dict_db, "vc2", "banana")
+    assert target.definitely_missing("banana")
+    assert word_filter.reload_if_changed(target, factory)
+    assert not target.definitely_missing("banana")
@@ -0,0 +1,57 @@
+import argparse
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from ..database import Base, SessionLocal, engine
+from .. import models
+from ..services import activity_rollup, media_rollup, response_cache
+
+
+@dataclass
+class BackfillStats:
+    children: int = 0
+    days: int = 0
+    media_rows: int = 0
+
+
+def backfill(
+    *,
+    dry_run: bool,
+    child_id: Optional[str] = None,
+    bind_engine=engine,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> BackfillStats:
+    Base.metadata.create_all(bind=bind_engine)
+    stats = BackfillStats()
+    with session_factory() as db:
+        query = db.query(models.Child.id)
+        if child_id:
+            query = query.filter(models.Child.id == child_id)
+        for (cid,) in query.all():
+            stats.children += 1
+            stats.days += activity_rollup.rebuild(db, cid)
+            stats.media_rows += media_rollup.rebuild(db, cid)
+            # One transaction per child, so the history endpoints never see a half-rebuilt rollup
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+                response_cache.invalidate(cid)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild child_daily_activity and media_daily_rollup from learning records and media sessions")
+    parser.add_argument("--child-id", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    stats = backfill(dry_run=args.dry_run, child_id=args.child_id)
+    mode = "DRY_RUN" if args.dry_run else "COMMIT"
+    print(f"[{mode}] children={stats.children} days={stats.days} media_rows={stats.media_rows}")
+
+
+if __name__ == "__main__":
+    main()
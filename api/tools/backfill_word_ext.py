@@ -0,0 +1,188 @@
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..database import DictionarySessionLocal
+from ..services import word_service
+
+DEFAULT_CHECKPOINT = Path(__file__).resolve().parents[2] / "uploads" / "backfill_word_ext.checkpoint.json"
+
+# word rows with no word_ext row, or a word_ext row missing any enrichable field
+_SCAN_QUERY = text(
+    """
+    SELECT w.vc_id, w.vc_vocabulary,
+        e.vc_id AS ext_vc_id, e.image_url, e.audio_us_url, e.audio_uk_url, e.example, e.youdao_translation
+    FROM word w
+    LEFT JOIN word_ext e ON e.vc_id = w.vc_id
+    WHERE w.vc_id > :last_vc_id
+        AND (
+            e.vc_id IS NULL
+            OR e.image_url IS NULL OR e.image_url = ''
+            OR e.audio_us_url IS NULL OR e.audio_us_url = ''
+            OR e.audio_uk_url IS NULL OR e.audio_uk_url = ''
+            OR e.example IS NULL OR e.example = ''
+            OR e.youdao_translation IS NULL OR e.youdao_translation = ''
+        )
+    ORDER BY w.vc_id
+    LIMIT :limit
+    """
+)
+
+MISSING_FIELDS = ("image_url", "audio_us_url", "audio_uk_url", "example", "youdao_translation")
+
+
+@dataclass
+class BackfillStats:
+    last_vc_id: str = ""
+    scanned: int = 0
+    no_ext_row: int = 0
+    missing_image: int = 0
+    missing_text: int = 0
+    filled: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def words_per_second(self) -> float:
+        return self.scanned / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+
+def load_checkpoint(path: Path) -> BackfillStats:
+    if not path.exists():
+        return BackfillStats()
+    data = json.loads(path.read_text(encoding="utf-8"))
+    fields = BackfillStats.__dataclass_fields__
+    return BackfillStats(**{k: v for k, v in data.items() if k in fields})
+
+
+def save_checkpoint(path: Path, stats: BackfillStats) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(asdict(stats), ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def scan_batch(dict_db: Session, last_vc_id: str, limit: int) -> List[dict]:
+    rows = dict_db.execute(_SCAN_QUERY, {"last_vc_id": last_vc_id, "limit": limit}).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def count_missing(stats: BackfillStats, rows: List[dict]) -> None:
+    for row in rows:
+        if row["ext_vc_id"] is None:
+            stats.no_ext_row += 1
+        if not row["image_url"]:
+            stats.missing_image += 1
+        if any(not row[f] for f in MISSING_FIELDS if f != "image_url"):
+            stats.missing_text += 1
+
+
+def fill_batch(
+    dict_db: Session,
+    rows: List[dict],
+    *,
+    concurrency: int,
+    generate_images: bool,
+    max_waits: int = 3,
+) -> Tuple[int, int]:
+    """Enrich one scanned batch. Returns (filled, failed)."""
+    items = [(r["vc_id"], r["vc_vocabulary"]) for r in rows if r["vc_vocabulary"]]
+    for attempt in range(max_waits + 1):
+        results, errors = word_service.ensure_word_ext_many(
+            dict_db=dict_db,
+            items=items,
+            max_workers=concurrency,
+            generate_images=generate_images,
+        )
+        unavailable = [e for e in errors.values() if isinstance(e, word_service.UPSTREAM_UNAVAILABLE)]
+        # Whole batch bounced off an open breaker: wait it out instead of skipping past the words
+        if results or not unavailable or len(unavailable) < len(errors) or attempt == max_waits:
+            break
+        wait = max(5.0, max(getattr(e, "retry_in", 0) or 0 for e in unavailable))
+        print(f"Upstream unavailable ({unavailable[0]}), waiting {wait:.0f}s")
+        time.sleep(wait)
+    for vc_id, error in errors.items():
+        print(f"Failed {vc_id}: {error}")
+    return len([vc_id for vc_id in results if vc_id not in errors]), len(errors)
+
+
+def backfill(
+    *,
+    dry_run: bool,
+    batch_size: int = 200,
+    concurrency: int = word_service.ENRICHMENT_FETCH_CONCURRENCY,
+    limit: Optional[int] = None,
+    generate_images: bool = True,
+    checkpoint: Optional[Path] = DEFAULT_CHECKPOINT,
+    resume: bool = False,
+    session_factory: Callable[[], Session] = DictionarySessionLocal,
+) -> BackfillStats:
+    stats = load_checkpoint(checkpoint) if resume and checkpoint else BackfillStats()
+    started = time.monotonic() - stats.elapsed_seconds
+    processed = 0
+
+    with session_factory() as dict_db:
+        while limit is None or processed < limit:
+            size = batch_size if limit is None else min(batch_size, limit - processed)
+            rows = scan_batch(dict_db, stats.last_vc_id, size)
+            if not rows:
+                break
+
+            count_missing(stats, rows)
+            if not dry_run:
+                filled, failed = fill_batch(dict_db, rows, concurrency=concurrency, generate_images=generate_images)
+                stats.filled += filled
+                stats.failed += failed
+
+            processed += len(rows)
+            stats.scanned += len(rows)
+            stats.last_vc_id = rows[-1]["vc_id"]
+            stats.elapsed_seconds = time.monotonic() - started
+            # Dry runs never move the checkpoint, so a later real run starts where it should
+            if checkpoint and not dry_run:
+                save_checkpoint(checkpoint, stats)
+            print(
+                f"... scanned={stats.scanned} filled={stats.filled} failed={stats.failed} "
+                f"last_vc_id={stats.last_vc_id} rate={stats.words_per_second:.1f} words/s"
+            )
+
+    stats.elapsed_seconds = time.monotonic() - started
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fill missing word_ext fields for the whole dictionary")
+    parser.add_argument("--dry-run", action="store_true", help="Only scan and count missing fields")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=word_service.ENRICHMENT_FETCH_CONCURRENCY)
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many words")
+    parser.add_argument("--no-images", action="store_true", help="Skip SiliconFlow image generation")
+    parser.add_argument("--checkpoint", default=str(DEFAULT_CHECKPOINT))
+    parser.add_argument("--resume", action="store_true", help="Continue after the vc_id stored in the checkpoint")
+    args = parser.parse_args()
+
+    stats = backfill(
+        dry_run=args.dry_run,
+        batch_size=max(1, args.batch_size),
+        concurrency=max(1, args.concurrency),
+        limit=args.limit,
+        generate_images=not args.no_images,
+        checkpoint=Path(args.checkpoint) if args.checkpoint else None,
+        resume=args.resume,
+    )
+    mode = "DRY_RUN" if args.dry_run else "COMMIT"
+    print(
+        f"[{mode}] scanned={stats.scanned} no_ext_row={stats.no_ext_row} missing_image={stats.missing_image} "
+        f"missing_text={stats.missing_text} filled={stats.filled} failed={stats.failed} "
+        f"elapsed={stats.elapsed_seconds:.1f}s rate={stats.words_per_second:.1f} words/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
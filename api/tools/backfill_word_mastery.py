@@ -0,0 +1,67 @@
+import argparse
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from ..database import Base, SessionLocal, engine
+from .. import models
+from ..services import spaced_repetition
+
+
+@dataclass
+class BackfillStats:
+    children: int = 0
+    records_replayed: int = 0
+    words_seeded: int = 0
+
+
+def backfill(
+    *,
+    dry_run: bool,
+    child_id: Optional[str] = None,
+    rebuild: bool = False,
+    bind_engine=engine,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> BackfillStats:
+    Base.metadata.create_all(bind=bind_engine)
+    stats = BackfillStats()
+    with session_factory() as db:
+        query = db.query(models.Child)
+        if child_id:
+            query = query.filter(models.Child.id == child_id)
+        for child in query.all():
+            stats.children += 1
+            if rebuild:
+                # Rows written before the scheduler kept UTC throughout carry DB_TIMEZONE timestamps
+                db.query(models.WordMastery).filter(models.WordMastery.child_id == child.id).delete(
+                    synchronize_session=False
+                )
+            stats.records_replayed += spaced_repetition.replay_history(db, child)
+            # Flush so words that were just replayed are not seeded a second time
+            db.flush()
+            stats.words_seeded += spaced_repetition.seed_child(db, child)
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build word_mastery rows from learning history and the word library")
+    parser.add_argument("--child-id", default=None)
+    parser.add_argument("--rebuild", action="store_true", help="Drop the children's existing word_mastery rows first")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    stats = backfill(dry_run=args.dry_run, child_id=args.child_id, rebuild=args.rebuild)
+    mode = "DRY_RUN" if args.dry_run else "COMMIT"
+    print(
+        f"[{mode}] children={stats.children} records_replayed={stats.records_replayed} "
+        f"words_seeded={stats.words_seeded}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from ..database import engine
+
+# (table, index name, columns). create_all only creates indexes together with new tables,
+# so existing deployments get these from here.
+INDEXES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("learning_records", "ix_learning_records_child_created", ("child_id", "created_at")),
+    ("media_learning_sessions", "ix_media_sessions_child_module_started", ("child_id", "module", "started_at")),
+]
+
+
+def pending_indexes(bind_engine: Engine) -> List[Tuple[str, str, Tuple[str, ...]]]:
+    inspector = inspect(bind_engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table, name, columns in INDEXES:
+        if table not in tables:
+            continue
+        if any(ix["name"] == name for ix in inspector.get_indexes(table)):
+            continue
+        missing.append((table, name, columns))
+    return missing
+
+
+def create_statement(bind_engine: Engine, table: str, name: str, columns: Tuple[str, ...]) -> str:
+    sql = f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"
+    if bind_engine.dialect.name == "mysql":
+        # Online DDL: reads and writes continue while the index builds
+        sql += " ALGORITHM=INPLACE LOCK=NONE"
+    return sql
+
+
+def migrate(*, dry_run: bool, bind_engine: Engine = engine, log: Callable[[str], None] = print) -> int:
+    created = 0
+    for table, name, columns in pending_indexes(bind_engine):
+        sql = create_statement(bind_engine, table, name, columns)
+        log(sql)
+        if dry_run:
+            continue
+        with bind_engine.begin() as conn:
+            conn.execute(text(sql))
+        created += 1
+    return created
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Add composite (child, timestamp) indexes to the history tables")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    created = migrate(dry_run=args.dry_run)
+    mode = "DRY_RUN" if args.dry_run else "COMMIT"
+    print(f"[{mode}] indexes_created={created}")
+
+
+if __name__ == "__main__":
+    main()
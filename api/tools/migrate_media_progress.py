@@ -0,0 +1,137 @@
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..database import engine
+from .. import models
+
+COUNTER_COLUMNS: List[Tuple[str, str]] = [
+    ("total_seconds", "INT NOT NULL DEFAULT 0"),
+    ("total_completed_count", "INT NOT NULL DEFAULT 0"),
+    ("total_session_count", "INT NOT NULL DEFAULT 0"),
+    ("completion_percent_sum", "FLOAT NOT NULL DEFAULT 0"),
+    ("eligible_completion_count", "INT NOT NULL DEFAULT 0"),
+]
+UNIQUE_NAME = "uq_child_media_progress_module"
+
+
+@dataclass
+class MigrationStats:
+    columns_added: int = 0
+    rows_copied: int = 0
+    duplicates_merged: int = 0
+    unique_added: bool = False
+
+
+def _as_int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def copy_json_stats(db: Session) -> int:
+    """Move the legacy stats JSON into the counter columns, for rows whose counters are still empty."""
+    copied = 0
+    for progress in db.query(models.ChildMediaProgress).filter(models.ChildMediaProgress.total_session_count == 0):
+        stats = progress.stats or {}
+        if not stats:
+            continue
+        progress.total_seconds = _as_int(stats.get("total_seconds"))
+        progress.total_completed_count = _as_int(stats.get("total_completed_count"))
+        progress.total_session_count = _as_int(stats.get("total_session_count"))
+        progress.completion_percent_sum = _as_float(stats.get("completion_percent_sum"))
+        progress.eligible_completion_count = _as_int(stats.get("eligible_completion_count"))
+        copied += 1
+    return copied
+
+
+def merge_duplicates(db: Session) -> int:
+    """Concurrent get-or-create could leave two rows per (child, module); fold them into the oldest."""
+    groups: Dict[Tuple[str, str], List[models.ChildMediaProgress]] = defaultdict(list)
+    for progress in db.query(models.ChildMediaProgress).order_by(models.ChildMediaProgress.created_at.asc()):
+        groups[(progress.child_id, progress.module)].append(progress)
+    merged = 0
+    for rows in groups.values():
+        keep, extra = rows[0], rows[1:]
+        for row in extra:
+            keep.total_seconds += row.total_seconds or 0
+            keep.total_completed_count += row.total_completed_count or 0
+            keep.total_session_count += row.total_session_count or 0
+            keep.completion_percent_sum += row.completion_percent_sum or 0
+            keep.eligible_completion_count += row.eligible_completion_count or 0
+            keep.current_difficulty_level = max(keep.current_difficulty_level, row.current_difficulty_level)
+            db.delete(row)
+            merged += 1
+    return merged
+
+
+def migrate(*, dry_run: bool, bind_engine: Engine = engine, log: Callable[[str], None] = print) -> MigrationStats:
+    stats = MigrationStats()
+    table = models.ChildMediaProgress.__tablename__
+    inspector = inspect(bind_engine)
+    if table not in inspector.get_table_names():
+        return stats
+
+    existing = {c["name"] for c in inspector.get_columns(table)}
+    missing = [(name, ddl) for name, ddl in COUNTER_COLUMNS if name not in existing]
+    for name, ddl in missing:
+        log(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+    if dry_run and missing:
+        # The copy below needs the columns; without them there is nothing more to preview
+        stats.columns_added = len(missing)
+        return stats
+    for name, ddl in missing:
+        with bind_engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+        stats.columns_added += 1
+
+    with sessionmaker(bind=bind_engine)() as db:
+        stats.rows_copied = copy_json_stats(db)
+        db.flush()
+        stats.duplicates_merged = merge_duplicates(db)
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+    has_unique = any(c["name"] == UNIQUE_NAME for c in inspector.get_unique_constraints(table)) or any(
+        ix["name"] == UNIQUE_NAME for ix in inspector.get_indexes(table)
+    )
+    if not has_unique:
+        sql = f"CREATE UNIQUE INDEX {UNIQUE_NAME} ON {table} (child_id, module)"
+        log(sql)
+        if not dry_run:
+            with bind_engine.begin() as conn:
+                conn.execute(text(sql))
+            stats.unique_added = True
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move child_media_progress.stats JSON into counter columns")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    stats = migrate(dry_run=args.dry_run)
+    mode = "DRY_RUN" if args.dry_run else "COMMIT"
+    print(
+        f"[{mode}] columns_added={stats.columns_added} rows_copied={stats.rows_copied} "
+        f"duplicates_merged={stats.duplicates_merged} unique_added={stats.unique_added}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+
+from ..database import DictionarySessionLocal
+from ..services import dictionary_cache, word_service, youdao_cache
+
+# word_ext columns whose values come from the Youdao payload
+YOUDAO_FIELDS = {
+    "example": "example",
+    "youdao_translation": "meaning",
+    "audio_us_url": "audio_us_url",
+    "audio_uk_url": "audio_uk_url",
+    "image_url": "image_url",
+}
+
+
+@dataclass
+class ReparseStats:
+    payloads: int = 0
+    matched_words: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+def find_vc_ids(dict_db: Session, word_keys: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+    if not word_keys:
+        return {}
+    rows = dict_db.execute(
+        text(
+            """
+            SELECT vc_id, vc_vocabulary
+            FROM word
+            WHERE vc_vocabulary IN :words
+            """
+        ).bindparams(bindparam("words", expanding=True)),
+        {"words": word_keys},
+    ).fetchall()
+    result: Dict[str, List[Tuple[str, str]]] = {}
+    for vc_id, vocabulary in rows:
+        result.setdefault(youdao_cache.normalize_word(vocabulary), []).append((vc_id, vocabulary))
+    return result
+
+
+def merge_fields(existing: dict, info: dict, *, overwrite: bool) -> dict:
+    values = {k: existing.get(k) for k in word_service._WORD_EXT_COLUMNS}
+    for column, info_key in YOUDAO_FIELDS.items():
+        parsed = info.get(info_key) or None
+        if not parsed:
+            continue
+        # Generated or uploaded images are never replaced by a re-parse
+        if column == "image_url" and values.get(column):
+            continue
+        if overwrite or not values.get(column):
+            values[column] = parsed
+    return values
+
+
+def reparse(
+    *,
+    dry_run: bool,
+    overwrite: bool,
+    batch_size: int = 500,
+    session_factory: Callable[[], Session] = DictionarySessionLocal,
+) -> ReparseStats:
+    stats = ReparseStats()
+    with session_factory() as reader, session_factory() as dict_db:
+        batch: List[Tuple[str, dict]] = []
+
+        def flush() -> None:
+            vc_map = find_vc_ids(dict_db, [key for key, _ in batch])
+            targets = [(vc_id, vocab, payload) for key, payload in batch for vc_id, vocab in vc_map.get(key, [])]
+            stats.matched_words += len(targets)
+            existing_map = word_service._load_word_ext_rows(dict_db, [t[0] for t in targets])
+            rows = []
+            for vc_id, vocabulary, payload in targets:
+                info = word_service.parse_youdao_payload(vocabulary, payload)
+                if not info:
+                    stats.unchanged += 1
+                    continue
+                existing = existing_map.get(vc_id) or {}
+                values = merge_fields(existing, info, overwrite=overwrite)
+                if all(values.get(k) == existing.get(k) for k in YOUDAO_FIELDS):
+                    stats.unchanged += 1
+                    continue
+                stats.updated += 1
+                if not dry_run:
+                    rows.append((vc_id, values))
+            if rows:
+                word_service.upsert_word_ext_rows(dict_db, rows)
+                dict_db.commit()
+                dictionary_cache.invalidate([vc_id for vc_id, _ in rows])
+            batch.clear()
+
+        for word_key, payload in youdao_cache.iter_payloads(reader, batch_size=batch_size):
+            stats.payloads += 1
+            batch.append((word_key, payload))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-parse cached Youdao payloads into word_ext without refetching")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--overwrite", action="store_true", help="Replace existing Youdao-derived fields, not just fill gaps")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    stats = reparse(dry_run=args.dry_run, overwrite=args.overwrite, batch_size=args.batch_size)
+    mode = "DRY_RUN" if args.dry_run else "COMMIT"
+    print(
+        f"[{mode}] payloads={stats.payloads} matched_words={stats.matched_words} "
+        f"updated={stats.updated} unchanged={stats.unchanged}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+from typing import Optional
+
+from ..database import SessionLocal
+from .. import models
+from ..services import principals, redis_client
+
+
+def revoke(*, dry_run: bool, parent_id: Optional[str] = None, phone: Optional[str] = None) -> Optional[str]:
+    """
+    Reject all tokens issued so far to a parent and their children. Returns the parent id revoked.
+    Raises SystemExit when the revocation could not be written to Redis, the only place API workers read it.
+    """
+    if not parent_id:
+        with SessionLocal() as db:
+            row = db.query(models.Parent.id).filter(models.Parent.phone == phone).first()
+        if row is None:
+            return None
+        parent_id = row[0]
+    if not dry_run and not principals.principal_cache.revoke(parent_id):
+        raise SystemExit(f"Revocation of {parent_id} was not written to Redis; API workers will not see it")
+    return parent_id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Revoke a parent's tokens after a password reset or account deletion done outside the API"
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--parent-id", default=None)
+    target.add_argument("--phone", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if redis_client.get_redis() is None:
+        # The API processes only see revocations through Redis; a revocation held by this process dies with it
+        message = "REDIS_URL is not configured or Redis is down; API workers cannot see a revocation"
+        if not args.dry_run:
+            raise SystemExit(message)
+        print(message)
+    parent_id = revoke(dry_run=args.dry_run, parent_id=args.parent_id, phone=args.phone)
+    mode = "DRY_RUN" if args.dry_run else "COMMIT"
+    print(f"[{mode}] revoked={parent_id or 'not found'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from ..database import SessionLocal
+from ..services import transcription_queue
+
+
+def _worker_id(pid: int) -> str:
+    return f"{socket.gethostname()}:{pid}"
+
+
+def _heartbeat(job_id: str, worker_id: str, stop: threading.Event) -> None:
+    while not stop.wait(transcription_queue.TRANSCRIBE_HEARTBEAT_SECONDS):
+        try:
+            with SessionLocal() as db:
+                cancelled = transcription_queue.heartbeat(db, job_id, worker_id)
+        except Exception as e:
+            print(f"Transcription heartbeat failed for {job_id}: {e}")
+            continue
+        if cancelled:
+            # Whisper cannot be interrupted mid-file; exit and let the supervisor mark the job and respawn
+            print(f"Transcription job {job_id} cancelled, restarting worker {worker_id}")
+            os._exit(0)
+
+
+def work(poll_seconds: float) -> None:
+    """
+    One worker process: loads the model once, then runs jobs one at a time. In chunked mode the
+    model lives only in the chunk pool's processes, not in this one.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    from ..services import transcription
+
+    transcription.preload()
+    config_version = transcription.config_version()
+    worker_id = _worker_id(os.getpid())
+    while True:
+        try:
+            with SessionLocal() as db:
+                job_id = transcription_queue.claim(db, worker_id)
+        except Exception as e:
+            print(f"Transcription worker {worker_id} could not claim a job: {e}")
+            job_id = None
+        if job_id is None:
+            time.sleep(poll_seconds)
+            continue
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(job_id, worker_id, stop), daemon=True)
+        beat.start()
+        try:
+            status = transcription_queue.run_job(SessionLocal, job_id, transcription.transcribe_audio, config_version)
+            print(f"Transcription job {job_id}: {status}")
+        finally:
+            stop.set()
+            beat.join()
+
+
+def _release(pid: int) -> None:
+    try:
+        with SessionLocal() as db:
+            transcription_queue.release_worker(db, _worker_id(pid))
+    except Exception as e:
+        print(f"Could not release jobs of worker {pid}: {e}")
+
+
+def supervise(workers: int, poll_seconds: float) -> None:
+    ctx = multiprocessing.get_context("spawn")
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    with SessionLocal() as db:
+        recovered = transcription_queue.recover_stale(db)
+        counts = transcription_queue.queue_counts(db)
+    print(f"Transcription queue: {counts}, recovered={recovered}")
+
+    procs = {}
+
+    def spawn(slot: int) -> None:
+        proc = ctx.Process(target=work, args=(poll_seconds,), name=f"transcription-worker-{slot}")
+        proc.start()
+        procs[slot] = proc
+
+    for slot in range(max(1, workers)):
+        spawn(slot)
+
+    next_recover = time.monotonic() + transcription_queue.TRANSCRIBE_STALE_SECONDS
+    while not stopping.wait(1):
+        for slot, proc in list(procs.items()):
+            if proc.is_alive():
+                continue
+            # Cancelled jobs end here too: the worker exits and its job is settled by the supervisor
+            _release(proc.pid)
+            print(f"Worker {proc.name} (pid {proc.pid}) exited with {proc.exitcode}, respawning")
+            spawn(slot)
+        if time.monotonic() >= next_recover:
+            next_recover = time.monotonic() + transcription_queue.TRANSCRIBE_STALE_SECONDS
+            try:
+                with SessionLocal() as db:
+                    transcription_queue.recover_stale(db)
+            except Exception as e:
+                print(f"Could not recover stale transcription jobs: {e}")
+
+    for proc in procs.values():
+        proc.terminate()
+    for proc in procs.values():
+        proc.join(timeout=10)
+        _release(proc.pid)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run transcription jobs queued by the API and admin API")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TRANSCRIBE_WORKERS", 1)))
+    parser.add_argument("--poll-seconds", type=float, default=float(os.getenv("TRANSCRIBE_POLL_SECONDS", 2)))
+    args = parser.parse_args()
+    supervise(args.workers, args.poll_seconds)
+
+
+if __name__ == "__main__":
+    main()
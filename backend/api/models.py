@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Integer, Float, DateTime
+from sqlalchemy import Column, String, Text, Integer, Float, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from database import Base
 import uuid
@@ -39,3 +39,35 @@ class MediaResource(Base):
     srt_file = Column(String(500), nullable=True)  # New field for SRT file path
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class TranscriptionJob(Base):
+    """Mirror of api.models.TranscriptionJob; jobs are run by api/tools/transcription_worker.py"""
+    __tablename__ = "transcription_jobs"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    media_id = Column(String(36), ForeignKey("media_resources.id"), nullable=True, index=True)
+    parent_id = Column(String(36), nullable=True, index=True)  # uploader of an ad-hoc upload job
+    source_path = Column(String(1000), nullable=False)
+    active_key = Column(String(64), unique=True, nullable=True)  # media:<id> while queued/running
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    priority = Column(Integer, nullable=False, default=0)
+    progress = Column(Integer, nullable=False, default=0)
+    stage = Column(String(20), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    force = Column(Boolean, nullable=False, default=False)  # skip the transcript store
+    last_error = Column(Text, nullable=True)
+    srt_path = Column(String(1000), nullable=True)
+    srt_url = Column(String(500), nullable=True)
+    worker = Column(String(100), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_transcription_jobs_claim", "status", "priority", "created_at"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
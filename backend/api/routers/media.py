@@ -1,19 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from sqlalchemy import func, or_
+import asyncio
 import os
 import shutil
 from urllib.parse import urlparse
-import requests
-import tempfile
 import mimetypes
 
-from database import get_db
+from database import get_db, SessionLocal
 from models import MediaResource
-from schemas import MediaResourceResponse, MediaResourceListResponse, BatchImportRequest, BatchImportResponse
-from services import transcription
+from schemas import (
+    MediaResourceResponse, MediaResourceListResponse, BatchImportRequest, BatchImportResponse,
+    TranscriptionJobResponse, TranscriptionJobListResponse, DirectoryTranscriptionRequest, DirectoryTranscriptionResponse,
+)
+from services import transcription_jobs
 
 router = APIRouter(
     prefix="/media",
@@ -176,7 +179,7 @@ def get_srt_path(media_directory: str, media_filename: str) -> tuple[str, str]:
     return abs_path, url_path
 
 @router.post("/{media_id}/upload_srt")
-async def upload_srt(
+def upload_srt(
     media_id: str,
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
@@ -200,90 +203,77 @@ async def upload_srt(
     
     return {"srt_file": srt_url}
 
-def generate_srt_task(media_id: str, db_session_factory):
-    """Background task for SRT generation"""
-    # Create a new session for the background task
-    db = db_session_factory()
-    tmp_path = None
-    try:
-        media = db.query(MediaResource).filter(MediaResource.id == media_id).first()
-        if not media:
-            print(f"Media {media_id} not found for transcription")
-            return
+@router.post("/{media_id}/generate_srt", response_model=TranscriptionJobResponse, status_code=202)
+def generate_srt(
+    media_id: str,
+    force: bool = False,
+    db: Session = Depends(get_db)
+):
+    media = db.query(MediaResource).filter(MediaResource.id == media_id).first()
+    if not media:
+        raise HTTPException(status_code=404, detail="Media not found")
 
-        print(f"Starting transcription for {media.filename}...")
-        
-        # Determine local path for transcription
-        local_path = ""
-        
-        if media.url.startswith("file://"):
-            local_path = media.url.replace("file://", "")
-        else:
-            # Handle remote URLs: Download to temporary file first
-            print(f"Downloading remote file for transcription: {media.url}")
-            try:
-                suffix = os.path.splitext(media.filename)[1]
-                if not suffix:
-                    suffix = ".mp4" if media.media_type == "video" else ".mp3"
-                    
-                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                    with requests.get(media.url, stream=True) as r:
-                        r.raise_for_status()
-                        for chunk in r.iter_content(chunk_size=8192):
-                            tmp.write(chunk)
-                    tmp_path = tmp.name
-                    local_path = tmp_path
-            except Exception as e:
-                print(f"Failed to download remote file: {str(e)}")
-                return
+    # 排入 transcription_jobs，由 api/tools/transcription_worker.py 执行；重复提交返回已有任务
+    # 已有字幕再次提交视为重做，不复用缓存的转录结果
+    return transcription_jobs.enqueue_media(db, media, force=force or bool(media.srt_file))
 
-        if not os.path.exists(local_path):
-             print(f"File not found for transcription: {local_path}")
-             return
 
-        # Generate SRT content
-        try:
-            srt_content = transcription.transcribe_audio(local_path)
-            
-            # Get dynamic storage path
-            filepath, srt_url = get_srt_path(media.directory or "unknown", media.filename)
-            
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(srt_content)
-                
-            # Update DB
-            media.srt_file = srt_url
-            db.commit()
-            print(f"Transcription completed for {media.filename}")
-            
-        except Exception as e:
-            print(f"Transcription failed: {str(e)}")
-            
-    finally:
-        # Clean up temporary file if created
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except:
-                pass
-        db.close()
+@router.post("/generate_srt", response_model=DirectoryTranscriptionResponse, status_code=202)
+def generate_srt_for_directory(req: DirectoryTranscriptionRequest, db: Session = Depends(get_db)):
+    return transcription_jobs.enqueue_directory(db, req.directory, req.media_type, req.overwrite)
 
 
-@router.post("/{media_id}/generate_srt")
-async def generate_srt(
-    media_id: str,
-    background_tasks: BackgroundTasks,
+@router.get("/transcription_jobs", response_model=TranscriptionJobListResponse)
+def list_transcription_jobs(
+    status: Optional[str] = None,
+    media_id: Optional[str] = None,
+    limit: int = 50,
     db: Session = Depends(get_db)
 ):
-    media = db.query(MediaResource).filter(MediaResource.id == media_id).first()
-    if not media:
-        raise HTTPException(status_code=404, detail="Media not found")
-    
-    # Allow remote URLs now as we handle them in background task
-    # if not media.url.startswith("file://"):
-    #      raise HTTPException(status_code=400, detail="Only local files are supported for auto-generation currently")
+    return transcription_jobs.list_jobs(db, status=status, media_id=media_id, limit=limit)
 
-    from database import SessionLocal
-    background_tasks.add_task(generate_srt_task, media_id, SessionLocal)
-    
-    return {"message": "Transcription task started in background"}
+
+@router.get("/transcription_jobs/{job_id}", response_model=TranscriptionJobResponse)
+def get_transcription_job(job_id: str, db: Session = Depends(get_db)):
+    job = transcription_jobs.get(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+    return job
+
+
+def _load_transcription_job(job_id: str):
+    with SessionLocal() as db:
+        return transcription_jobs.get(db, job_id)
+
+
+@router.get("/transcription_jobs/{job_id}/events")
+async def stream_transcription_job(job_id: str, request: Request):
+    """SSE：任务状态变化时推送一次，结束（done/failed/cancelled）后关闭"""
+    job = await run_in_threadpool(_load_transcription_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+
+    async def events():
+        nonlocal job
+        last = None
+        while True:
+            payload = TranscriptionJobResponse.model_validate(job).model_dump_json()
+            if payload != last:
+                last = payload
+                yield f"data: {payload}\n\n"
+            if job.status in transcription_jobs.TERMINAL_STATUSES or await request.is_disconnected():
+                return
+            await asyncio.sleep(1)
+            job = await run_in_threadpool(_load_transcription_job, job_id)
+            if job is None:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/transcription_jobs/{job_id}/cancel", response_model=TranscriptionJobResponse)
+def cancel_transcription_job(job_id: str, db: Session = Depends(get_db)):
+    job = transcription_jobs.cancel(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+    return job
@@ -3,12 +3,11 @@ from sqlalchemy.orm import Session
 from typing import Optional, List
 from sqlalchemy import func, or_, and_
 import os
-import uuid
-import shutil
 
 from database import get_dict_db
 from models import WordExt
 from schemas import WordExtResponse, WordListResponse, WordExtUpdate
+from services import dictionary_cache, word_images
 
 router = APIRouter(
     prefix="/words",
@@ -78,11 +77,12 @@ def update_word(vc_id: str, update_data: WordExtUpdate, db: Session = Depends(ge
         setattr(word, key, value)
     
     db.commit()
+    dictionary_cache.invalidate([vc_id])
     db.refresh(word)
     return word
 
 @router.post("/{vc_id}/upload_image")
-async def upload_word_image(
+def upload_word_image(
     vc_id: str, 
     file: UploadFile = File(...), 
     db: Session = Depends(get_dict_db)
@@ -91,21 +91,35 @@ async def upload_word_image(
     if not word:
         raise HTTPException(status_code=404, detail="Word not found")
         
-    if not os.path.exists(UPLOADS_DIR):
-        os.makedirs(UPLOADS_DIR)
-        
-    # 生成安全文件名
-    ext = os.path.splitext(file.filename)[1]
-    filename = f"{uuid.uuid4()}{ext}"
-    filepath = os.path.join(UPLOADS_DIR, filename)
-    
-    with open(filepath, "wb") as f:
-        shutil.copyfileobj(file.file, f)
-        
-    # 更新数据库 URL
-    # 注意：前端访问路径应该是 /uploads/{filename}，需要在 main.py 中 mount 静态目录
-    image_url = f"/uploads/{filename}"
+    try:
+        data = word_images.read_capped(file.file)
+    except word_images.ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    # 同步路由在 FastAPI 线程池中运行，数据库查询与读文件都不阻塞事件循环
+    # 解码并生成多种尺寸（闪卡 / 缩略图 / WebP）交给 api 侧同一份实现的进程池，本线程只等待结果
+    # 文件名带内容哈希：同一张图重复上传不会产生新文件，CDN 缓存也不会读到旧图
+    try:
+        renditions = word_images.process_image(
+            data,
+            os.path.join(UPLOADS_DIR, "word_images"),
+            "/uploads/word_images",
+            vc_id,
+        )
+    except word_images.ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
+
+    # 更新数据库 URL，image_url 指向闪卡 JPEG，其余尺寸记录在 word_image_renditions
+    # 注意：前端访问路径应该是 /uploads/...，需要在 main.py 中 mount 静态目录
+    word_images.ensure_table(db)
+    word_images.record_renditions(db, vc_id, renditions)
+    image_url = word_images.primary_url(renditions)
     word.image_url = image_url
     db.commit()
+    dictionary_cache.invalidate([vc_id])
     
-    return {"image_url": image_url}
+    return {"image_url": image_url, "renditions": renditions}
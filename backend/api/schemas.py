@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 # --- Word Schemas ---
@@ -70,6 +70,40 @@ class BatchImportResponse(BaseModel):
     skipped_count: int
     message: str
 
+class TranscriptionJobResponse(BaseModel):
+    id: str
+    media_id: Optional[str] = None
+    status: str
+    priority: int
+    progress: int
+    stage: Optional[str] = None
+    attempts: int
+    cancel_requested: bool
+    last_error: Optional[str] = None
+    srt_url: Optional[str] = None
+    worker: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class TranscriptionJobListResponse(BaseModel):
+    counts: Dict[str, int]
+    items: List[TranscriptionJobResponse]
+
+class DirectoryTranscriptionRequest(BaseModel):
+    directory: str
+    media_type: Optional[str] = None
+    overwrite: bool = False
+
+class DirectoryTranscriptionResponse(BaseModel):
+    directory: str
+    queued_count: int
+    already_queued_count: int
+    skipped_count: int
+
 # --- Dashboard Schemas ---
 
 class DashboardStats(BaseModel):
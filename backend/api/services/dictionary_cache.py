@@ -0,0 +1,50 @@
+import json
+import os
+from typing import Iterable
+
+from dotenv import load_dotenv
+
+# backend/api/services/dictionary_cache.py (4层) -> 回退4层到达根目录
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.env'))
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+# 与 api/services/dictionary_cache.py 使用相同的 key 与频道
+ENTRY_KEY_PREFIX = "davidsmom:dict:entry:"
+GENERATION_KEY_PREFIX = "davidsmom:dict:gen:"
+GENERATION_TTL = int(os.getenv("DICT_CACHE_REDIS_TTL", 24 * 3600)) * 2
+INVALIDATE_CHANNEL = "davidsmom:dict:invalidate"
+
+_client = None
+
+
+def _get_redis():
+    global _client
+    if not REDIS_URL:
+        return None
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5, decode_responses=True)
+    return _client
+
+
+def invalidate(vc_ids: Iterable[str]) -> None:
+    """管理后台修改 word_ext 后，通知 API 进程丢弃对应词条缓存"""
+    ids = [v for v in vc_ids if v]
+    if not ids:
+        return
+    try:
+        client = _get_redis()
+        if client is None:
+            return
+        # 先递增版本号再删除，正在读库的 API 进程不会把旧词条写回 Redis
+        pipe = client.pipeline(transaction=True)
+        for v in ids:
+            pipe.incr(f"{GENERATION_KEY_PREFIX}{v}")
+            pipe.expire(f"{GENERATION_KEY_PREFIX}{v}", GENERATION_TTL)
+        pipe.delete(*[f"{ENTRY_KEY_PREFIX}{v}" for v in ids])
+        pipe.execute()
+        client.publish(INVALIDATE_CHANNEL, json.dumps(ids))
+    except Exception as e:
+        print(f"Dictionary cache invalidation failed: {e}")
@@ -0,0 +1,164 @@
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import MediaResource, TranscriptionJob
+
+# 与 api/services/transcription_queue.py 共用 transcription_jobs 表，任务由 api/tools/transcription_worker.py 执行
+PRIORITY_BULK = 0
+PRIORITY_MEDIA = 10
+
+ACTIVE_STATUSES = ("queued", "running")
+TERMINAL_STATUSES = ("done", "failed", "cancelled")
+
+_table_ready = False
+
+
+def ensure_table(db: Session) -> None:
+    global _table_ready
+    if not _table_ready:
+        TranscriptionJob.__table__.create(bind=db.get_bind(), checkfirst=True)
+        _table_ready = True
+
+
+def _active_key(media_id: str) -> str:
+    return f"media:{media_id}"
+
+
+def _active_job(db: Session, media_id: str) -> Optional[TranscriptionJob]:
+    return db.query(TranscriptionJob).filter(TranscriptionJob.active_key == _active_key(media_id)).first()
+
+
+def enqueue_media(
+    db: Session, media: MediaResource, priority: int = PRIORITY_MEDIA, force: bool = False
+) -> TranscriptionJob:
+    """
+    同一媒体同时只有一个排队/运行中的任务，重复提交返回已有任务（并按需提高优先级）
+    force：跳过转录结果缓存（transcripts 表）重新转录，用于重做有问题的字幕
+    """
+    ensure_table(db)
+    job = _active_job(db, media.id)
+    if job is None:
+        job = TranscriptionJob(
+            media_id=media.id,
+            source_path=media.url,
+            active_key=_active_key(media.id),
+            status="queued",
+            priority=priority,
+            force=force,
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # 并发提交了同一媒体
+            db.rollback()
+            job = _active_job(db, media.id)
+    elif job.status == "queued" and (priority > (job.priority or 0) or (force and not job.force)):
+        job.priority = max(priority, job.priority or 0)
+        job.force = bool(job.force or force)
+        db.commit()
+    db.refresh(job)
+    return job
+
+
+def enqueue_directory(
+    db: Session,
+    directory: str,
+    media_type: Optional[str] = None,
+    overwrite: bool = False,
+    priority: int = PRIORITY_BULK,
+) -> dict:
+    """整个目录一次排队：已有字幕的跳过（overwrite 除外，且不复用缓存的转录结果），已在队列中的不重复添加"""
+    ensure_table(db)
+    query = db.query(MediaResource).filter(MediaResource.directory == directory)
+    if media_type:
+        query = query.filter(MediaResource.media_type == media_type)
+    media_list = query.all()
+
+    targets = [m for m in media_list if overwrite or not m.srt_file]
+    keys = [_active_key(m.id) for m in targets]
+    active = set()
+    if keys:
+        active = {
+            key for (key,) in db.query(TranscriptionJob.active_key).filter(TranscriptionJob.active_key.in_(keys)).all()
+        }
+    new_jobs = [
+        TranscriptionJob(
+            media_id=m.id,
+            source_path=m.url,
+            active_key=_active_key(m.id),
+            status="queued",
+            priority=priority,
+            force=overwrite,
+        )
+        for m in targets
+        if _active_key(m.id) not in active
+    ]
+    if new_jobs:
+        db.add_all(new_jobs)
+        try:
+            db.commit()
+        except IntegrityError:
+            # 与单个提交撞上：重新读取已在队列中的媒体后再来一次
+            db.rollback()
+            return enqueue_directory(db, directory, media_type, overwrite, priority)
+    return {
+        "directory": directory,
+        "queued_count": len(new_jobs),
+        "already_queued_count": len(targets) - len(new_jobs),
+        "skipped_count": len(media_list) - len(targets),
+    }
+
+
+def get(db: Session, job_id: str) -> Optional[TranscriptionJob]:
+    ensure_table(db)
+    return db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+
+
+def list_jobs(db: Session, status: Optional[str] = None, media_id: Optional[str] = None, limit: int = 50) -> dict:
+    ensure_table(db)
+    counts = {s: 0 for s in ACTIVE_STATUSES + TERMINAL_STATUSES}
+    for s, count in db.query(TranscriptionJob.status, func.count(TranscriptionJob.id)).group_by(TranscriptionJob.status):
+        counts[s] = int(count or 0)
+
+    query = db.query(TranscriptionJob)
+    if status:
+        query = query.filter(TranscriptionJob.status == status)
+    if media_id:
+        query = query.filter(TranscriptionJob.media_id == media_id)
+    jobs: List[TranscriptionJob] = (
+        query.order_by(TranscriptionJob.created_at.desc()).limit(max(1, min(limit, 500))).all()
+    )
+    return {"counts": counts, "items": jobs}
+
+
+def cancel(db: Session, job_id: str) -> Optional[TranscriptionJob]:
+    """排队中的任务直接取消；运行中的任务标记 cancel_requested，由 worker 主进程终止"""
+    job = get(db, job_id)
+    if job is None:
+        return None
+    if job.status == "queued":
+        updated = (
+            db.query(TranscriptionJob)
+            .filter(TranscriptionJob.id == job_id, TranscriptionJob.status == "queued")
+            .update(
+                {
+                    TranscriptionJob.status: "cancelled",
+                    TranscriptionJob.active_key: None,
+                    TranscriptionJob.finished_at: func.now(),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        db.refresh(job)
+        if updated:
+            return job
+    if job.status == "running" and not job.cancel_requested:
+        job.cancel_requested = True
+        db.commit()
+        db.refresh(job)
+    return job
@@ -0,0 +1,33 @@
+import os
+import sys
+
+# 图片尺寸、文件命名与 word_image_renditions 表只在 api/services/image_pipeline.py 实现一份，
+# 后台直接导入它，两边渲染的图片对 pick_rendition / image_url_for 完全一致
+# backend/api/services/word_images.py (4层) -> 回退4层到达根目录
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if _ROOT_DIR not in sys.path:
+    sys.path.append(_ROOT_DIR)
+
+from api.services.image_pipeline import (  # noqa: E402
+    ImageTooLarge,
+    ensure_table,
+    primary_url,
+    process_image,
+    record_renditions,
+)
+
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", 8 * 1024 * 1024))
+
+__all__ = ["ImageTooLarge", "ensure_table", "primary_url", "process_image", "read_capped", "record_renditions"]
+
+
+def read_capped(fileobj, max_bytes: int = IMAGE_MAX_UPLOAD_BYTES) -> bytes:
+    """分块读取上传文件，超过上限立即停止"""
+    buf = bytearray()
+    while True:
+        chunk = fileobj.read(64 * 1024)
+        if not chunk:
+            return bytes(buf)
+        buf.extend(chunk)
+        if len(buf) > max_bytes:
+            raise ImageTooLarge(f"图片超过 {max_bytes // (1024 * 1024)}MB 上限")
@@ -105,8 +105,8 @@ export default function Media() {
       if (!confirm('Generating SRT may take a while. Continue?')) return;
       setGeneratingSrtId(mediaId);
       try {
-          await api.post(`/media/${mediaId}/generate_srt`);
-          alert('SRT generation started in background. Please refresh later.');
+          const { data: job } = await api.post(`/media/${mediaId}/generate_srt`);
+          alert(`SRT job ${job.status} (id ${job.id}). Subtitles appear after the transcription worker finishes; refresh later.`);
       } catch (e: any) {
           alert('Generation failed: ' + (e.response?.data?.detail || e.message));
       } finally {
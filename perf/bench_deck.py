@@ -0,0 +1,113 @@
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql.expression import func
+
+from api import models
+from api.database import Base
+from api.services import spaced_repetition
+
+
+def percentile(values: List[float], p: float) -> float:
+    values_sorted = sorted(values)
+    k = int(round((len(values_sorted) - 1) * p))
+    return values_sorted[max(0, min(len(values_sorted) - 1, k))]
+
+
+def summarize(name: str, latencies_ms: List[float]) -> None:
+    print(
+        f"{name:<28} avg={statistics.mean(latencies_ms):8.2f}ms "
+        f"p50={percentile(latencies_ms, 0.50):8.2f}ms p99={percentile(latencies_ms, 0.99):8.2f}ms"
+    )
+
+
+def measure(fn: Callable[[], list], repeat: int) -> List[float]:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def populate(db, words: int, seed: int = 42):
+    rng = random.Random(seed)
+    parent = models.Parent(phone=f"bench-{words}", username=f"bench-{words}", password_hash="x")
+    db.add(parent)
+    db.flush()
+    child = models.Child(parent_id=parent.id, nickname="bench", settings={"daily_words": 20})
+    db.add(child)
+    db.flush()
+    now = datetime.utcnow()
+    word_rows = []
+    mastery_rows = []
+    for i in range(words):
+        word_id = f"{words}-w{i}"
+        word_rows.append({"id": word_id, "parent_id": parent.id, "dict_vc_id": f"vc{i}", "difficulty": 1})
+        # Most of a large library is scheduled into the future; a few hundred are due
+        due = now + timedelta(days=rng.uniform(-3, 120))
+        mastery_rows.append(
+            {
+                "id": f"{words}-m{i}",
+                "child_id": child.id,
+                "word_id": word_id,
+                "ease": 2.5,
+                "interval_days": 1,
+                "repetitions": 1,
+                "attempts": 1,
+                "lapses": 0,
+                "due_at": due,
+            }
+        )
+    db.bulk_insert_mappings(models.Word, word_rows)
+    db.bulk_insert_mappings(models.WordMastery, mastery_rows)
+    db.commit()
+    return parent, child
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Daily deck latency: ORDER BY random() vs word_mastery due-date range read")
+    parser.add_argument("--database-url", default="sqlite://", help="Use a scratch database; tables are created in it")
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        with Session() as db:
+            start = time.perf_counter()
+            parent, child = populate(db, size)
+            print(f"\n== library of {size} words (populated in {time.perf_counter() - start:.1f}s) ==")
+
+            def random_deck():
+                return (
+                    db.query(models.Word)
+                    .filter(
+                        models.Word.parent_id == parent.id,
+                        models.Word.dict_vc_id.isnot(None),
+                        models.Word.dict_vc_id != "",
+                    )
+                    .order_by(func.random())
+                    .limit(args.limit)
+                    .all()
+                )
+
+            summarize("order_by_random", measure(random_deck, args.repeat))
+            summarize(
+                "word_mastery_due_range",
+                measure(lambda: spaced_repetition.deck(db, child.id, parent.id, args.limit), args.repeat),
+            )
+
+
+if __name__ == "__main__":
+    main()
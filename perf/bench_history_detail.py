@@ -0,0 +1,93 @@
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from api import models
+from api.database import Base
+from api.routers.learning import get_learning_history_detail
+from api.services import dictionary_cache, image_pipeline
+
+# SQLite stand-ins for the dictionary DB tables the entry cache joins
+_DICT_TABLES = (
+    "CREATE TABLE word (vc_id TEXT PRIMARY KEY, vc_vocabulary TEXT, vc_phonetic_us TEXT, vc_phonetic_uk TEXT)",
+    "CREATE TABLE word_translation (vc_id TEXT PRIMARY KEY, translation TEXT)",
+    "CREATE TABLE word_ext (vc_id TEXT PRIMARY KEY, youdao_translation TEXT, image_url TEXT, audio_us_url TEXT, audio_uk_url TEXT, example TEXT)",
+    "CREATE TABLE word_image_renditions (vc_id TEXT, name TEXT, url TEXT, format TEXT, width INT, height INT, bytes INT, content_hash TEXT, created_at TIMESTAMP)",
+)
+
+
+class QueryCounter:
+    def __init__(self, *engines):
+        self.count = 0
+        for e in engines:
+            event.listen(e, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def populate(db, dict_db, records: int, sessions: int):
+    parent = models.Parent(phone=f"bench-{records}", username="bench", password_hash="x")
+    db.add(parent)
+    db.flush()
+    child = models.Child(parent_id=parent.id, nickname="bench")
+    db.add(child)
+    db.flush()
+    day = datetime(2024, 5, 1, 9, 0)
+    for i in range(records):
+        vc_id = f"vc{records}-{i}"
+        dict_db.execute(text("INSERT INTO word (vc_id, vc_vocabulary) VALUES (:v, :w)"), {"v": vc_id, "w": f"word{i}"})
+        word = models.Word(parent_id=parent.id, dict_vc_id=vc_id)
+        db.add(word)
+        db.flush()
+        db.add(models.LearningRecord(child_id=child.id, word_id=word.id, result="remembered", time_spent=5, created_at=day))
+    for i in range(sessions):
+        resource = models.MediaResource(filename=f"clip{i}.mp4", media_type="video", url=f"/m/{i}")
+        db.add(resource)
+        db.flush()
+        db.add(
+            models.MediaLearningSession(
+                child_id=child.id, module="video" if i % 2 else "audio", resource_id=resource.id,
+                duration_seconds=60, started_at=day,
+            )
+        )
+    db.commit()
+    dict_db.commit()
+    return parent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query count and latency of /api/learning/history/{date}")
+    parser.add_argument("--sizes", default="1,10,100")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    dict_engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with dict_engine.begin() as conn:
+        for ddl in _DICT_TABLES:
+            conn.execute(text(ddl))
+    # The MySQL DDL in ensure_table does not parse on SQLite; the table was created above
+    image_pipeline._table_ready = True
+    Session = sessionmaker(bind=engine)
+    DictSession = sessionmaker(bind=dict_engine)
+    counter = QueryCounter(engine, dict_engine)
+
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        with Session() as db, DictSession() as dict_db:
+            parent = populate(db, dict_db, size, size)
+            dictionary_cache.entry_cache.clear()
+            counter.count = 0
+            start = time.perf_counter()
+            detail = get_learning_history_detail("2024-05-01", current_user=parent, db=db, dict_db=dict_db)
+            elapsed = (time.perf_counter() - start) * 1000
+            assert len(detail["records"]) == size
+            assert all(r["word"] != "Unknown" for r in detail["records"])
+            print(f"records={size:<5} sessions={size:<5} queries={counter.count:<3} {elapsed:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
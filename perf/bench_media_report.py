@@ -0,0 +1,139 @@
+import argparse
+import random
+import time
+from datetime import datetime, time as dtime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from api import models
+from api.database import Base
+from api.routers.media import get_media_report_days, get_media_report_summary
+from api.services import media_rollup, response_cache, time_ranges
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def populate(db, days: int, per_day: int, resources: int):
+    """Sessions over the last `days` local days; every other day is folded in incrementally, the rest by rebuild."""
+    parent = models.Parent(phone="bench-report", username="bench", password_hash="x")
+    db.add(parent)
+    db.flush()
+    child = models.Child(parent_id=parent.id, nickname="bench")
+    db.add(child)
+    db.flush()
+    pool = [models.MediaResource(filename=f"clip{i}.mp4", media_type="video", url=f"/m/{i}") for i in range(resources)]
+    db.add_all(pool)
+    db.flush()
+
+    rng = random.Random(7)
+    today = time_ranges.local_today()
+    for d in range(days):
+        day = today - timedelta(days=d)
+        for _ in range(per_day):
+            started_at = time_ranges.to_db(datetime.combine(day, dtime(rng.randint(0, 23), rng.randint(0, 59))))
+            session = models.MediaLearningSession(
+                child_id=child.id,
+                module="video",
+                resource_id=rng.choice(pool).id,
+                started_at=started_at,
+                duration_seconds=rng.randint(30, 900),
+                completion_percent=rng.randint(0, 100),
+                completed_count=rng.randint(0, 2),
+                difficulty_level_at_time=rng.randint(1, 4),
+            )
+            db.add(session)
+            if d % 2 == 0:
+                media_rollup.session_started(db, session, started_at)
+                media_rollup.session_finished(
+                    db,
+                    session,
+                    delta_seconds=session.duration_seconds,
+                    delta_completed=session.completed_count,
+                    delta_completion=float(session.completion_percent),
+                )
+    db.commit()
+    return parent, child
+
+
+def snapshot(db, child_id):
+    rows = db.query(models.MediaDailyRollup).filter(models.MediaDailyRollup.child_id == child_id).all()
+    return {
+        (r.module, r.activity_date, r.resource_id): (
+            r.session_count, r.total_seconds, r.completed_count, round(r.completion_percent_sum, 3),
+            r.first_started_at, r.first_difficulty_level,
+        )
+        for r in rows
+    }
+
+
+def raw_totals(db, child_id, period):
+    """What the report used to compute by loading every session of the period."""
+    start, end = time_ranges.period_range(period)
+    sessions = (
+        db.query(models.MediaLearningSession)
+        .filter(
+            models.MediaLearningSession.child_id == child_id,
+            models.MediaLearningSession.module == "video",
+            time_ranges.between(models.MediaLearningSession.started_at, (start, end)),
+        )
+        .all()
+    )
+    seconds = sum(s.duration_seconds for s in sessions)
+    completion = sum(s.completion_percent for s in sessions) / len(sessions) if sessions else 0.0
+    return round(seconds / 60, 1), sum(s.completed_count for s in sessions), round(completion, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query count and latency of /api/media/report/* per period")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=6)
+    parser.add_argument("--resources", type=int, default=40)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    counter = QueryCounter(engine)
+
+    with Session() as db:
+        parent, child = populate(db, args.days, args.per_day, args.resources)
+
+        incremental = snapshot(db, child.id)
+        media_rollup.rebuild(db, child.id)
+        db.commit()
+        rebuilt = snapshot(db, child.id)
+        assert all(rebuilt[k] == v for k, v in incremental.items()), "incremental rollup disagrees with rebuild"
+
+        # The first report creates the progress row; count steady-state queries only
+        get_media_report_summary("week", "video", current_user=parent, db=db)
+        counts = {}
+        for period in ("week", "month", "year"):
+            # Measure the rollup queries, not the response cache
+            response_cache.invalidate(child.id)
+            counter.count = 0
+            start = time.perf_counter()
+            summary = get_media_report_summary(period, "video", current_user=parent, db=db)
+            days = get_media_report_days("video", period, current_user=parent, db=db)
+            elapsed = (time.perf_counter() - start) * 1000
+            expected = raw_totals(db, child.id, period)
+            assert (summary.total_minutes, summary.total_completed_count, summary.average_completion_percent) == expected, (
+                period, summary, expected,
+            )
+            assert len(days) == min(time_ranges.PERIOD_DAYS[period], args.days)
+            counts[period] = counter.count
+            print(f"period={period:<6} days={len(days):<4} queries={counter.count:<3} {elapsed:8.2f}ms")
+
+    assert len(set(counts.values())) == 1, f"query count grows with the period: {counts}"
+    print("report totals match the raw sessions; query count is constant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import random
+import statistics
+import string
+import time
+from typing import Callable, List
+
+from sqlalchemy import text
+
+from api.database import DictionarySessionLocal
+from api.services import suggest_index
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values_sorted = sorted(values)
+    k = int(round((len(values_sorted) - 1) * p))
+    return values_sorted[max(0, min(len(values_sorted) - 1, k))]
+
+
+def summarize(name: str, latencies_us: List[float]) -> None:
+    print(f"\n== {name} ==")
+    print(
+        "latency_us "
+        f"avg={statistics.mean(latencies_us):.1f} "
+        f"p50={percentile(latencies_us, 0.50):.1f} "
+        f"p90={percentile(latencies_us, 0.90):.1f} "
+        f"p99={percentile(latencies_us, 0.99):.1f} "
+        f"max={max(latencies_us):.1f}"
+    )
+
+
+def measure(fn: Callable[[str], List[str]], prefixes: List[str]) -> List[float]:
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        fn(prefix)
+        latencies.append((time.perf_counter() - start) * 1_000_000)
+    return latencies
+
+
+def synthetic_rows(count: int):
+    rng = random.Random(42)
+    for i in range(count):
+        length = rng.randint(3, 12)
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+        yield (f"vc{i}", word, rng.randint(1, 6))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare /api/words/suggest SQL path against the in-memory prefix index")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--ranking", choices=suggest_index.RANKINGS, default="alpha")
+    parser.add_argument("--synthetic", type=int, default=0, help="Build the index from N generated words instead of MySQL")
+    args = parser.parse_args()
+
+    index = suggest_index.PrefixIndex(ranking=args.ranking)
+    start = time.perf_counter()
+    if args.synthetic:
+        index.build(synthetic_rows(args.synthetic))
+    else:
+        suggest_index.load(index)
+    print(f"index_build words={len(index)} ms={(time.perf_counter() - start) * 1000:.1f}")
+
+    rng = random.Random(7)
+    words = index._words
+    prefixes = [rng.choice(words)[: rng.randint(3, 5)] for _ in range(args.queries)] if words else []
+    if not prefixes:
+        raise SystemExit("Index is empty")
+
+    summarize(f"prefix_index_{args.ranking}", measure(lambda q: index.suggest(q, 5), prefixes))
+
+    if args.synthetic:
+        return
+
+    with DictionarySessionLocal() as dict_db:
+        def sql_suggest(q: str) -> List[str]:
+            rows = dict_db.execute(
+                text(
+                    """
+                    SELECT vc_vocabulary
+                    FROM word
+                    WHERE vc_vocabulary LIKE :prefix
+                    ORDER BY vc_vocabulary
+                    LIMIT 5
+                    """
+                ),
+                {"prefix": f"{q}%"},
+            ).fetchall()
+            return [r[0] for r in rows]
+
+        summarize("sql_like_prefix", measure(sql_suggest, prefixes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import glob
+import os
+import random
+import re
+import tempfile
+import time
+import wave
+from concurrent.futures import wait
+
+import numpy as np
+
+from api.services import audio_chunks, transcription, transcription_backends
+
+AUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public", "static", "audio")
+_TIMESTAMP = re.compile(r"(\d\d):(\d\d):(\d\d),(\d\d\d) --> (\d\d):(\d\d):(\d\d),(\d\d\d)")
+
+
+def build_track(paths, minutes: float, seed: int = 7) -> np.ndarray:
+    """Long media stand-in: the clips in random order with 0.3-1.5s pauses, repeated up to `minutes`."""
+    clips = [transcription.load_audio(p) for p in paths]
+    rng = random.Random(seed)
+    parts, total = [], 0
+    target = int(minutes * 60 * audio_chunks.SAMPLE_RATE)
+    while total < target:
+        clip = rng.choice(clips)
+        pause = np.zeros(int(rng.uniform(0.3, 1.5) * audio_chunks.SAMPLE_RATE), dtype=np.float32)
+        parts.extend([clip, pause])
+        total += len(clip) + len(pause)
+    return np.concatenate(parts)
+
+
+def write_wav(audio: np.ndarray) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+        path = tmp.name
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(audio_chunks.SAMPLE_RATE)
+        f.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+    return path
+
+
+def check_srt(srt: str, duration: float) -> int:
+    """Cues must be in order and inside the media; returns the cue count."""
+    last = 0.0
+    cues = 0
+    for m in _TIMESTAMP.finditer(srt):
+        v = [int(x) for x in m.groups()]
+        start = v[0] * 3600 + v[1] * 60 + v[2] + v[3] / 1000
+        end = v[4] * 3600 + v[5] * 60 + v[6] + v[7] / 1000
+        assert last - 0.001 <= start <= end <= duration + 0.5, (start, end, last)
+        last = start
+        cues += 1
+    return cues
+
+
+def run(label: str, path: str, duration: float, **kwargs) -> float:
+    start = time.perf_counter()
+    srt = transcription.transcribe_audio(path, **kwargs)
+    elapsed = time.perf_counter() - start
+    cues = check_srt(srt, duration)
+    speed = duration / elapsed
+    print(f"{label:<28} wall={elapsed:8.1f}s cues={cues:<5} {speed:6.2f} audio-s/wall-s")
+    return speed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Transcription throughput, whole file vs. silence-chunked across processes")
+    parser.add_argument("files", nargs="*", help="media to transcribe as-is (default: a track built from public/static/audio)")
+    parser.add_argument("--minutes", type=float, default=10, help="length of the built track")
+    parser.add_argument("--workers", type=int, default=max(2, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--chunk-seconds", type=float, default=transcription.TRANSCRIBE_CHUNK_SECONDS)
+    args = parser.parse_args()
+
+    built = None
+    if args.files:
+        paths = args.files
+    else:
+        clips = sorted(glob.glob(os.path.join(AUDIO_DIR, "*.mp3")))
+        assert clips, f"no mp3 files in {AUDIO_DIR}"
+        built = write_wav(build_track(clips, args.minutes))
+        paths = [built]
+
+    try:
+        print(f"backend: {transcription_backends.describe()}")
+        # Model loads are not throughput: load here and start every chunk process before timing
+        transcription.get_model()
+        pool = transcription._get_pool(args.workers)
+        wait([pool.submit(time.sleep, 0.5) for _ in range(args.workers)])
+
+        for path in paths:
+            audio = transcription.load_audio(path)
+            duration = len(audio) / audio_chunks.SAMPLE_RATE
+            chunks = audio_chunks.split_on_silence(audio, args.chunk_seconds, transcription.TRANSCRIBE_MIN_SILENCE_SECONDS)
+            print(f"{os.path.basename(path)}: {duration:.0f}s audio, {len(chunks)} chunks of ~{args.chunk_seconds:.0f}s")
+            whole = run("whole file", path, duration, workers=1)
+            chunked = run(f"chunked x{args.workers}", path, duration, workers=args.workers, chunk_seconds=args.chunk_seconds)
+            print(f"speedup {chunked / whole:.2f}x")
+    finally:
+        transcription.shutdown()
+        if built:
+            os.remove(built)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from api import models
+from api.database import Base
+from api.services import time_ranges, transcription_queue
+
+CONFIG_VERSION = "check:fake"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Duplicate and paired media reuse one transcript instead of re-transcribing")
+    parser.add_argument("--transcribe-seconds", type=float, default=1.0, help="simulated Whisper time per file")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="transcript-reuse-")
+    # Keep the SRTs this check writes out of public/subtitles
+    transcription_queue.PUBLIC_SUBTITLES_DIR = os.path.join(work, "subtitles")
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    def media_file(name: str, content: bytes) -> str:
+        path = os.path.join(work, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return "file://" + path
+
+    episode = os.urandom(256 * 1024)
+    media = [
+        # The same episode imported under two directories
+        models.MediaResource(directory="S1", filename="ep1.mp4", media_type="video", url=media_file("a.mp4", episode)),
+        models.MediaResource(directory="S1 copy", filename="ep1.mp4", media_type="video", url=media_file("b.mp4", episode)),
+        # A video and its audio twin: different bytes, same pair_key
+        models.MediaResource(directory="S2", filename="ep2.mp4", media_type="video", url=media_file("c.mp4", os.urandom(1024)), pair_key="S2::ep2"),
+        models.MediaResource(directory="S2", filename="ep2.mp3", media_type="audio", url=media_file("c.mp3", os.urandom(1024)), pair_key="S2::ep2"),
+    ]
+    with Session() as db:
+        db.add_all(media)
+        db.commit()
+        for m in media:
+            db.add(
+                models.TranscriptionJob(
+                    media_id=m.id,
+                    source_path=m.url,
+                    active_key=transcription_queue.media_active_key(m.id),
+                    next_attempt_at=time_ranges.db_now(),
+                )
+            )
+        db.commit()
+        media_ids = [m.id for m in media]
+
+    transcribed = []
+
+    def fake_transcribe(path, progress=None):
+        time.sleep(args.transcribe_seconds)
+        transcribed.append(path)
+        return f"1\n00:00:00,000 --> 00:00:01,000\n{os.path.basename(path)}\n"
+
+    timings = []
+    while True:
+        with Session() as db:
+            job_id = transcription_queue.claim(db, "check:1")
+        if job_id is None:
+            break
+        start = time.perf_counter()
+        status = transcription_queue.run_job(Session, job_id, fake_transcribe, CONFIG_VERSION)
+        timings.append(time.perf_counter() - start)
+        assert status == "done", status
+
+    with Session() as db:
+        srts = {}
+        for media_id in media_ids:
+            m = db.query(models.MediaResource).filter(models.MediaResource.id == media_id).first()
+            job = db.query(models.TranscriptionJob).filter(models.TranscriptionJob.media_id == media_id).first()
+            with open(job.srt_path, encoding="utf-8") as f:
+                srts[m.url] = f.read()
+            assert m.srt_file == job.srt_url
+            print(f"{m.directory + '/' + m.filename:<18} {job.srt_url}")
+        stored = db.query(models.Transcript).count()
+
+    for i, t in enumerate(timings):
+        print(f"job {i + 1}: {t * 1000:8.1f}ms")
+    urls = [m.url for m in media]
+    assert srts[urls[0]] == srts[urls[1]] and srts[urls[2]] == srts[urls[3]]
+    assert len(transcribed) == 2, f"expected 2 transcriptions for 4 media, ran {len(transcribed)}"
+    print(f"4 media, {len(transcribed)} transcriptions, {stored} stored transcript keys")
+    shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
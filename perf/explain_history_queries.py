@@ -0,0 +1,121 @@
+import argparse
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, func, literal_column, select, text
+
+from api import models
+from api.database import Base
+from api.services import time_ranges
+
+LEARNING_INDEX = "ix_learning_records_child_created"
+MEDIA_INDEX = "ix_media_sessions_child_module_started"
+
+
+def populate(engine, children: int, rows_per_child: int) -> str:
+    now = datetime(2024, 5, 1, 12, 0)
+    with engine.begin() as conn:
+        conn.execute(models.Parent.__table__.insert(), [{"id": "p", "phone": "explain", "username": "p", "password_hash": "x"}])
+        conn.execute(
+            models.Child.__table__.insert(),
+            [{"id": f"c{c}", "parent_id": "p", "nickname": f"c{c}"} for c in range(children)],
+        )
+        conn.execute(models.Word.__table__.insert(), [{"id": "w", "parent_id": "p", "dict_vc_id": "vc"}])
+        conn.execute(models.MediaResource.__table__.insert(), [{"id": "r", "filename": "r.mp4", "media_type": "video", "url": "/r"}])
+        for c in range(children):
+            conn.execute(
+                models.LearningRecord.__table__.insert(),
+                [
+                    {"id": f"lr{c}-{i}", "child_id": f"c{c}", "word_id": "w", "result": "remembered", "created_at": now - timedelta(hours=i)}
+                    for i in range(rows_per_child)
+                ],
+            )
+            conn.execute(
+                models.MediaLearningSession.__table__.insert(),
+                [
+                    {
+                        "id": f"ms{c}-{i}", "child_id": f"c{c}", "module": "video" if i % 2 else "audio",
+                        "resource_id": "r", "started_at": now - timedelta(hours=i), "duration_seconds": 60,
+                    }
+                    for i in range(rows_per_child)
+                ],
+            )
+        if engine.dialect.name == "mysql":
+            conn.execute(text("ANALYZE TABLE learning_records, media_learning_sessions"))
+    return "c0"
+
+
+def _literal(value: datetime):
+    return literal_column(f"'{value.strftime('%Y-%m-%d %H:%M:%S')}'")
+
+
+def history_queries(child_id: str, day: date):
+    start, end = time_ranges.day_range(day)
+    bounds = (_literal(start), _literal(end))
+    lr, ms = models.LearningRecord, models.MediaLearningSession
+    return {
+        "learning day (range)": (
+            select(lr.id).where(lr.child_id == child_id, time_ranges.between(lr.created_at, bounds)),
+            LEARNING_INDEX,
+        ),
+        "media day (range)": (
+            select(ms.id).where(
+                ms.child_id == child_id, ms.module.in_(("video", "audio")), time_ranges.between(ms.started_at, bounds)
+            ),
+            MEDIA_INDEX,
+        ),
+        "media period (range)": (
+            select(ms.id).where(ms.child_id == child_id, ms.module == "video", time_ranges.between(ms.started_at, bounds)),
+            MEDIA_INDEX,
+        ),
+        "learning day (func.date, before)": (
+            select(lr.id).where(lr.child_id == child_id, func.date(lr.created_at) == day.isoformat()),
+            None,
+        ),
+    }
+
+
+def explain(conn, stmt) -> list:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return [dict(r._mapping) for r in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+    return [dict(r._mapping) for r in conn.execute(text("EXPLAIN " + sql))]
+
+
+def is_range_scan(plan: list, index: str, dialect: str) -> bool:
+    if dialect == "sqlite":
+        # e.g. SEARCH learning_records USING INDEX ix_... (child_id=? AND created_at>? AND created_at<?)
+        return any(index in r["detail"] and ">" in r["detail"] for r in plan)
+    return any(r.get("key") == index and r.get("type") == "range" for r in plan)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="EXPLAIN the history filters on a real database and assert they are index range scans "
+        "(the SQLite plan is covered by api/tests/test_time_ranges.py)",
+    )
+    parser.add_argument("--database-url", default="sqlite://", help="Use a scratch database; tables are created in it")
+    parser.add_argument("--children", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    child_id = populate(engine, args.children, args.rows)
+
+    failures = []
+    with engine.connect() as conn:
+        for name, (stmt, index) in history_queries(child_id, date(2024, 4, 30)).items():
+            plan = explain(conn, stmt)
+            ok = is_range_scan(plan, index, engine.dialect.name) if index else None
+            print(f"\n== {name} ==")
+            for row in plan:
+                print("  ", row)
+            if ok is False:
+                failures.append(name)
+
+    assert not failures, f"not an index range scan: {failures}"
+    print("\nall range filters use their composite index")
+
+
+if __name__ == "__main__":
+    main()
@@ -101,6 +101,20 @@ def main() -> None:
             headers=parent_headers,
             params={"period": "week", "module": "video"},
         ),
+        dict(
+            name="media_report_summary_year_video",
+            method="GET",
+            url=f"{base}/api/media/report/summary",
+            headers=parent_headers,
+            params={"period": "year", "module": "video"},
+        ),
+        dict(
+            name="learning_history_dates",
+            method="GET",
+            url=f"{base}/api/learning/history/dates",
+            headers=parent_headers,
+            params=None,
+        ),
     ]
 
     for s in scenarios:
@@ -115,6 +129,14 @@ def main() -> None:
         )
         summarize(name, results)
 
+    # Parents refresh the dashboard far more often than the data changes; show how much the cache absorbed
+    stats = requests.get(f"{base}/api/learning/cache/stats", headers=parent_headers, timeout=10)
+    if stats.ok:
+        body = stats.json()
+        print(f"\n== response cache (redis={body['redis_enabled']}) hit_ratio={body['hit_ratio']} ==")
+        for route in body["routes"]:
+            print(f"{route['name']}: hits={route['hits']} misses={route['misses']} hit_ratio={route['hit_ratio']}")
+
 
 if __name__ == "__main__":
     main()
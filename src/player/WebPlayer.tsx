@@ -5,12 +5,15 @@ import { parseSRT } from './lib/srtParser';
 import { Play, Pause, FastForward, Rewind, Repeat, Upload, Loader2 } from 'lucide-react';
 import { usePlayerStore } from './store/usePlayerStore';
 import axios from 'axios';
+import useStore from '@/store/useStore';
+import type { UserState } from '@/store/useStore';
 
 const WebPlayer: React.FC = () => {
   const { 
     isPlaying, setIsPlaying, currentTime, duration, playbackRate, setPlaybackRate,
     videoSrc, setVideoSrc, transcript, setTranscript, isTranscribing, setIsTranscribing
   } = usePlayerStore();
+  const token = useStore((state: UserState) => state.token);
 
   const formatTime = (seconds: number) => {
     const mins = Math.floor(seconds / 60);
@@ -37,12 +40,23 @@ const WebPlayer: React.FC = () => {
     formData.append('file', file);
 
     try {
-      // Assuming backend runs on localhost:8001 (based on previous logs)
-      const response = await axios.post('/api/media/transcribe', formData, {
-        headers: { 'Content-Type': 'multipart/form-data' }
+      // The upload is queued; a transcription worker picks it up, so poll the job until it finishes
+      const { data: queued } = await axios.post('/api/media/transcribe', formData, {
+        headers: { 'Content-Type': 'multipart/form-data', Authorization: `Bearer ${token}` }
       });
-      
-      const srtString = response.data;
+
+      let job = queued;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = (await axios.get(`/api/media/transcribe/jobs/${job.id}`, {
+          headers: { Authorization: `Bearer ${token}` }
+        })).data;
+      }
+      if (job.status !== 'done' || !job.srt_url) {
+        throw new Error(job.last_error || `Transcription ${job.status}`);
+      }
+
+      const { data: srtString } = await axios.get(job.srt_url, { responseType: 'text' });
       const parsedTranscript = parseSRT(srtString);
       setTranscript(parsedTranscript);
     } catch (error) {